@@ -0,0 +1,111 @@
+""" Runs the source-build-package pipeline of packages in worker processes, so
+independent builds can overlap, each one in its own current directory, and a
+crashing recipe doesn't take down the whole install
+"""
+import multiprocessing
+import os
+import select
+import time
+from conans.client.output import ConanOutput, ScopedOutput
+from conans.errors import ConanException
+from conans.util.log import logger
+
+
+class BuildExecutor(object):
+    """ Executes build tasks in forked worker processes. The workers inherit the
+    already loaded conanfiles, and stream back their output through a pipe
+    """
+    def __init__(self, output, max_workers):
+        self._output = output
+        self._max_workers = max(max_workers, 1)
+
+    @staticmethod
+    def available():
+        return hasattr(os, "fork")
+
+    def run(self, tasks):
+        """ param tasks: list of (name, function), the function receives the ConanOutput
+        it has to write to. Tasks with the same name, the builds of the same reference
+        that share its source folder, are not run at the same time. Raises ConanException
+        with the failure of the first task in the list once the running ones have
+        finished, the pending ones are not started after a failure
+        return: {name: (wall time, cpu time)} of the finished tasks
+        """
+        pending = list(enumerate(tasks))
+        running = {}  # {connection: (index, name, process)}
+        accounting = {}
+        errors = []
+        while running or (pending and not errors):
+            while pending and not errors and len(running) < self._max_workers:
+                running_names = [name for _, name, _ in running.values()]
+                startable = [task for task in pending if task[1][0] not in running_names]
+                if not startable:
+                    break
+                pending.remove(startable[0])
+                index, (name, function) = startable[0]
+                parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=_run_task,
+                                                  args=(function, child_conn,
+                                                        self._output.color))
+                process.start()
+                child_conn.close()
+                running[parent_conn] = (index, name, process)
+
+            ready, _, _ = select.select(running.keys(), [], [])
+            for conn in ready:
+                index, name, process = running[conn]
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    message = None
+                if message is not None and message[0] == "write":
+                    self._output.write(message[1])
+                    continue
+
+                conn.close()
+                process.join()
+                del running[conn]
+                if message is None:
+                    errors.append((index, "%s: Build process finished unexpectedly with exit "
+                                          "code %s" % (name, process.exitcode)))
+                    continue
+                _, error, wall_time, cpu_time = message
+                accounting[name] = (wall_time, cpu_time)
+                logger.debug("Build of %s: %.2fs wall time, %.2fs CPU time"
+                             % (name, wall_time, cpu_time))
+                ScopedOutput(name, self._output).info("Build process time: %.2fs, CPU time: %.2fs"
+                                                      % (wall_time, cpu_time))
+                if error is not None:
+                    errors.append((index, error))
+
+        if errors:
+            raise ConanException(min(errors)[1])
+        return accounting
+
+
+class _PipeStream(object):
+    """ file-like object that sends what is written to the parent process
+    """
+    def __init__(self, conn):
+        self._conn = conn
+
+    def write(self, data):
+        self._conn.send(("write", data))
+
+    def flush(self):
+        pass
+
+
+def _run_task(function, conn, color):
+    """ entry point of the worker processes
+    """
+    start_time = time.time()
+    error = None
+    try:
+        function(ConanOutput(_PipeStream(conn), color))
+    except Exception as e:
+        error = str(e)
+    times = os.times()  # user and system time, of the worker and its finished children
+    cpu_time = sum(times[:4])
+    conn.send(("result", error, time.time() - start_time, cpu_time))
+    conn.close()
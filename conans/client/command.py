@@ -14,7 +14,8 @@ from conans.util.log import logger
 from conans.model.ref import ConanFileReference
 from conans.client.manager import ConanManager
 from conans.paths import CONANFILE
-import requests
+from conans.client.rest.pooled_requester import PooledRequester
+import conans.tools
 from conans.client.rest.version_checker import VersionCheckerRequester
 from conans import __version__ as CLIENT_VERSION
 from conans.client.conf import MIN_SERVER_COMPATIBLE_VERSION
@@ -170,6 +171,14 @@ class Command(object):
         parser.add_argument("--all", action='store_true', default=False,
                             help='Install all packages from the specified reference')
         parser.add_argument("--file", "-f", help="specify conanfile filename")
+        parser.add_argument("--no-graph-cache", action='store_true', default=False,
+                            help='Compute again the dependencies graph, instead of using the '
+                            'one cached from a previous install')
+        parser.add_argument("--jobs", "-j", type=int, default=1,
+                            help='Number of packages retrieved and built concurrently')
+        parser.add_argument("--verify-full", action='store_true', default=False,
+                            help='Check the integrity of the local exports and packages hashing '
+                            'all their files, not only the ones that changed')
         self._parse_args(parser)
 
         args = parser.parse_args(*args)
@@ -198,7 +207,10 @@ class Command(object):
                                   options=option_dict,
                                   settings=settings_dict,
                                   build_mode=args.build,
-                                  filename=args.file)
+                                  filename=args.file,
+                                  graph_cache=not args.no_graph_cache,
+                                  jobs=args.jobs,
+                                  verify_full=args.verify_full)
 
     def info(self, *args):
         """ Prints information about the requirements.
@@ -379,13 +391,16 @@ class Command(object):
         parser.add_argument('-v', '--verbose', default=False,
                             action='store_true', help='Show packages options and settings')
         parser.add_argument('-p', '--package', help='Package ID pattern. EX: 23*', default=None)
+        parser.add_argument('-q', '--query', default=None,
+                            help='Packages query. EX: "os=Linux AND options.shared=True"')
         args = parser.parse_args(*args)
 
         self._manager.search(args.pattern,
                              args.remote,
                              ignorecase=not args.case_sensitive,
                              verbose=args.verbose,
-                             package_pattern=args.package)
+                             package_pattern=args.package,
+                             packages_query=args.query)
 
     def upload(self, *args):
         """ uploads a conanfile or binary packages from the local store to any remote.
@@ -403,6 +418,8 @@ class Command(object):
         parser.add_argument("--force", action='store_true',
                             default=False,
                             help='Do not check conans date, override remote with local')
+        parser.add_argument("--jobs", "-j", type=int, default=1,
+                            help='Number of packages uploaded concurrently with --all')
 
         args = parser.parse_args(*args)
 
@@ -413,7 +430,8 @@ class Command(object):
             raise ConanException("Enter conans or package id")
 
         self._manager.upload(conan_ref, package_id,
-                             args.remote, all_packages=args.all, force=args.force)
+                             args.remote, all_packages=args.all, force=args.force,
+                             jobs=args.jobs)
 
     def _show_help(self):
         """ prints a summary of all commands
@@ -505,8 +523,11 @@ def main(args):
         out.error(str(e))
         sys.exit(True)
 
-    requester = requests.Session()
-    requester.proxies = paths.conan_config.proxies
+    conan_config = paths.conan_config
+    requester = PooledRequester(conan_config.proxies, conan_config.http("pool_size"),
+                                conan_config.http("retries"))
+    # The downloads of tools.download() reuse the same connections
+    conans.tools._global_requester = requester
     # Verify client version against remotes
     version_checker_requester = VersionCheckerRequester(requester, Version(CLIENT_VERSION),
                                                         Version(MIN_SERVER_COMPATIBLE_VERSION),
@@ -518,7 +539,8 @@ def main(args):
     # Wraps RestApiClient to add authentication support (same interface)
     auth_manager = ConanApiAuthManager(rest_api_client, user_io, localdb)
     # Handle remote connections
-    remote_manager = RemoteManager(paths, paths.conan_config.remotes, auth_manager, out)
+    remote_manager = RemoteManager(paths, paths.conan_config.remotes, auth_manager, out,
+                                   localdb)
 
     command = Command(paths, user_io, ConanRunner(), remote_manager, localdb)
     current_dir = os.getcwd()
@@ -533,4 +555,5 @@ def main(args):
         error = command.run(args)
     finally:
         os.chdir(current_dir)
+        remote_manager.close()
     sys.exit(error)
@@ -0,0 +1,95 @@
+""" Cache of the compressed files produced for uploads. Uploading the same package to
+several remotes, or retrying a failed upload, compresses again the same files, which
+is the most CPU expensive part of the upload. The compressed files are stored with a
+key computed from the manifest of the folder and the compression settings, and the
+least recently used ones are removed when the cache exceeds its maximum size
+"""
+import os
+import threading
+from conans.util.files import FileContents, SpooledContents, load, save, mkdir
+from conans.util.log import logger
+from conans.util.sha import sha1
+
+
+class CompressedCache(object):
+    """ Stores each compressed file as <key>.tgz, with its md5 in <key>.md5. The
+    modification time of the files is used as the last time they were used
+    """
+    def __init__(self, cache_folder, max_size):
+        """ param max_size: maximum size in bytes of the stored compressed files
+        """
+        self._cache_folder = cache_folder
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(manifest, name, compresslevel):
+        """ param manifest: contents of the conanmanifest.txt of the compressed folder,
+        it has the md5 of all the files
+        """
+        return sha1("\n".join([manifest, name, "compresslevel=%s" % compresslevel]))
+
+    def spool(self, name):
+        """ returns a SpooledContents in the cache folder, so it can be stored without
+        copying it
+        """
+        mkdir(self._cache_folder)
+        return SpooledContents(suffix=name, folder=self._cache_folder)
+
+    def get(self, key):
+        """ returns the FileContents stored for the key, or None
+        """
+        tgz_path, md5_path = self._entry_paths(key)
+        with self._lock:
+            try:
+                md5 = load(md5_path)
+                size = os.path.getsize(tgz_path)
+                os.utime(tgz_path, None)
+            except (IOError, OSError):
+                logger.debug("Compressed cache miss: %s" % key)
+                return None
+        logger.debug("Compressed cache hit: %s" % key)
+        return FileContents(tgz_path, size, md5)
+
+    def store(self, key, contents):
+        """ param contents: closed SpooledContents returned by spool()
+        returns the stored FileContents, or the given contents if it's bigger than the
+        cache, which is not stored
+        """
+        if contents.size > self._max_size:
+            return contents
+        tgz_path, md5_path = self._entry_paths(key)
+        with self._lock:
+            save(md5_path, contents.md5)
+            os.rename(contents.path, tgz_path)
+            self._evict(keep=tgz_path)
+        logger.debug("Compressed cache stored: %s" % key)
+        return FileContents(tgz_path, contents.size, contents.md5)
+
+    def _evict(self, keep):
+        entries = []
+        for filename in os.listdir(self._cache_folder):
+            if filename.endswith(".tgz") and len(filename) == 44:  # <sha1>.tgz
+                path = os.path.join(self._cache_folder, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # Evicted by another upload
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            if path == keep:
+                continue
+            logger.debug("Compressed cache evicting: %s" % path)
+            for entry_path in (path, path[:-len(".tgz")] + ".md5"):
+                try:
+                    os.remove(entry_path)
+                except OSError:
+                    pass
+            total_size -= size
+
+    def _entry_paths(self, key):
+        path = os.path.join(self._cache_folder, key)
+        return path + ".tgz", path + ".md5"
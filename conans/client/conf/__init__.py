@@ -6,8 +6,12 @@ from conans.util.files import save, load
 from ConfigParser import NoSectionError, ConfigParser
 from conans.model.values import Values
 import urllib
+import multiprocessing
 
 MIN_SERVER_COMPATIBLE_VERSION = '0.6.0'
+DEFAULT_COMPRESSED_CACHE_SIZE = 1024  # MB
+DEFAULT_REMOTE_LOOKUP = {"missing_ttl": 300, "max_failures": 3, "retry_after": 60}
+DEFAULT_HTTP = {"pool_size": 10, "retries": 3}
 
 default_settings_yml = """
 os: [Windows, Linux, Macos, Android]
@@ -31,11 +35,34 @@ default_client_conf = '''
 [storage]
 # This is the default path, but you can write your own
 path: ~/.conan/data
+# Maximum size in MB of the compressed files kept to be reused by uploads, 0 disables it
+compressed_cache_size: 1024
 
 [remotes]
 conan.io: https://server.conan.io
 local: http://localhost:9300
 
+[compression]
+# gzip level (1-9) of the files uploaded, faster but bigger with lower levels
+export_level: 9
+package_level: 9
+# Number of threads compressing, 0 to use all the CPUs
+threads: 0
+
+[remote_lookup]
+# Seconds a reference not found in a remote is looked up there after the other remotes,
+# 0 disables it
+missing_ttl: 300
+# A remote that fails to connect these times in a row is skipped for retry_after seconds
+max_failures: 3
+retry_after: 60
+
+[http]
+# Connections kept alive to each remote
+pool_size: 10
+# Retries of the downloads and other idempotent requests that fail to connect
+retries: 3
+
 [proxies]
 # Empty section will try to use system proxies.
 # If don't want proxy at all, remove section [proxies]
@@ -82,6 +109,80 @@ class ConanClientConfigParser(ConfigParser):
         result = get_env('CONAN_STORAGE_PATH', result)
         return result
 
+    @property
+    def compressed_cache_size(self):
+        """ optional field, might not exist. Maximum size in bytes
+        """
+        try:
+            size = self.storage.get("compressed_cache_size", DEFAULT_COMPRESSED_CACHE_SIZE)
+        except ConanException:
+            size = DEFAULT_COMPRESSED_CACHE_SIZE
+        size = get_env('CONAN_COMPRESSED_CACHE_SIZE', str(size))
+        try:
+            return int(size) * 1024 * 1024
+        except ValueError:
+            raise ConanException("Invalid compressed_cache_size '%s', it should be an "
+                                 "integer number of MB" % size)
+
+    def compression_level(self, operation):
+        """ optional field, might not exist. gzip level used to compress the files of an
+        operation, "export" or "package"
+        """
+        try:
+            level = dict(self.get_conf("compression")).get("%s_level" % operation, 9)
+        except ConanException:
+            level = 9
+        try:
+            level = int(level)
+            if not 1 <= level <= 9:
+                raise ValueError()
+        except ValueError:
+            raise ConanException("Invalid %s_level '%s' in [compression], it should be a "
+                                 "number from 1 to 9" % (operation, level))
+        return level
+
+    @property
+    def compression_threads(self):
+        """ optional field, might not exist
+        """
+        try:
+            threads = dict(self.get_conf("compression")).get("threads", 0)
+        except ConanException:
+            threads = 0
+        try:
+            threads = int(threads)
+        except ValueError:
+            raise ConanException("Invalid threads '%s' in [compression], it should be an "
+                                 "integer number" % threads)
+        return threads if threads > 0 else multiprocessing.cpu_count()
+
+    def remote_lookup(self, name):
+        """ optional field, might not exist. Settings of the lookup of references in the
+        remotes: "missing_ttl", "max_failures" or "retry_after"
+        """
+        return self._optional_int("remote_lookup", name, DEFAULT_REMOTE_LOOKUP[name])
+
+    def http(self, name):
+        """ optional field, might not exist. Settings of the connections to the remotes:
+        "pool_size" or "retries"
+        """
+        minimum = 1 if name == "pool_size" else 0
+        return self._optional_int("http", name, DEFAULT_HTTP[name], minimum)
+
+    def _optional_int(self, section, name, default, minimum=0):
+        try:
+            value = dict(self.get_conf(section)).get(name, default)
+        except ConanException:
+            value = default
+        try:
+            value = int(value)
+            if value < minimum:
+                raise ValueError()
+        except ValueError:
+            raise ConanException("Invalid %s '%s' in [%s], it should be an integer number "
+                                 "not lower than %d" % (name, value, section, minimum))
+        return value
+
     @property
     def remotes(self):
         return self.get_conf("remotes")
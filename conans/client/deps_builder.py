@@ -33,6 +33,11 @@ class DepsGraph(object):
     def __init__(self):
         self.nodes = set()
         self.edges = set()
+        # adjacency maps {node: [node]}, so neighbors lookups do not scan all the edges
+        self._neighbors = {}
+        self._inverse_neighbors = {}
+        # by_levels() result, computed lazily and invalidated when the graph changes
+        self._levels = None
 
     def get_nodes(self, name):
         """ return all the nodes matching a particular name. Could be >1 in case
@@ -41,21 +46,30 @@ class DepsGraph(object):
         return [n for n in self.nodes if n.conanfile.name == name]
 
     def add_node(self, node):
-        self.nodes.add(node)
+        if node not in self.nodes:
+            self.nodes.add(node)
+            self._neighbors[node] = []
+            self._inverse_neighbors[node] = []
+            self._levels = None
 
     def add_edge(self, src, dst):
         assert src in self.nodes and dst in self.nodes
-        self.edges.add(Edge(src, dst))
+        edge = Edge(src, dst)
+        if edge not in self.edges:
+            self.edges.add(edge)
+            self._neighbors[src].append(dst)
+            self._inverse_neighbors[dst].append(src)
+            self._levels = None
 
     def neighbors(self, node):
         """ return all connected nodes (directionally) to the parameter one
         """
-        return [edge.dst for edge in self.edges if edge.src == node]
+        return list(self._neighbors[node])
 
     def inverse_neighbors(self, node):
         """ return all the nodes which has param node has dependency
         """
-        return [edge.src for edge in self.edges if edge.dst == node]
+        return list(self._inverse_neighbors[node])
 
     def public_neighbors(self, node):
         """ return nodes with direct reacheability by public dependencies
@@ -170,22 +184,33 @@ class DepsGraph(object):
         first level nodes, and so on
         return [[node1, node34], [node3], [node23, node8],...]
         """
-        current_level = []
-        result = [current_level]
-        opened = self.nodes.copy()
-        while opened:
-            current = opened.copy()
-            for o in opened:
-                if not any(o == edge.src and edge.dst in opened for edge in self.edges):
-                    current_level.append(o)
-                    current.discard(o)
+        if self._levels is None:
+            self._levels = self._compute_levels()
+        return [list(level) for level in self._levels]
+
+    def _compute_levels(self):
+        """ Kahn-like topological sort, processing a whole level at a time, so each
+        node and edge is visited just once
+        """
+        pending = {node: len(neighbors) for node, neighbors in self._neighbors.iteritems()}
+        current_level = [node for node, count in pending.iteritems() if count == 0]
+        result = []
+        processed = 0
+        while current_level:
             current_level.sort()
-            # now initialize new level
-            opened = current
-            if opened:
-                current_level = []
-                result.append(current_level)
-        return result
+            result.append(current_level)
+            processed += len(current_level)
+            next_level = []
+            for node in current_level:
+                for src in self._inverse_neighbors[node]:
+                    pending[src] -= 1
+                    if pending[src] == 0:
+                        next_level.append(src)
+            current_level = next_level
+
+        if processed != len(self.nodes):
+            raise ConanException("Loop detected in the dependencies graph")
+        return result or [[]]
 
     def private_nodes(self):
         """ computes a list of nodes living in the private zone of the deps graph,
@@ -214,11 +239,17 @@ class DepsBuilder(object):
     """ Responsible for computing the dependencies graph DepsGraph
     """
     def __init__(self, retriever, output):
-        """ param retriever: something that implements retrieve_conanfile for installed conans
+        """ param retriever: something that implements retrieve_conanfile for installed conans,
+        and optionally prefetch_conanfiles to retrieve in advance a list of them
         param loader: helper ConanLoader to be able to load user space conanfile
         """
         self._retriever = retriever
         self._output = output
+        # expansion cache, {node: (signature, generation)} of the last expansion of each node
+        self._expanded = {}
+        # {node: generation} when each node was last expanded
+        self._changed = {}
+        self._generation = 0
 
     def load(self, conan_ref, conanfile):
         """ compute the dependencies graph for:
@@ -226,6 +257,9 @@ class DepsBuilder(object):
                          might be None for user conanfile.py or .txt
         """
         dep_graph = DepsGraph()
+        self._expanded = {}
+        self._changed = {}
+        self._generation = 0
         # compute the conanfile entry point for this dependency graph
         root_node = Node(conan_ref, conanfile)
         dep_graph.add_node(root_node)
@@ -246,11 +280,26 @@ class DepsBuilder(object):
                            in graph
         param down_ref: ConanFileReference of who is depending on current node for this expansion
         """
+        # A node already expanded with the same upstream values, and whose upstream
+        # subgraph has not been expanded again since then, would produce the same result
+        closure = self._upstream_closure(node, dep_graph)
+        signature = self._expansion_signature(node, closure, down_reqs, down_options)
+        previous = self._expanded.get(node)
+        if previous is not None:
+            previous_signature, done_generation = previous
+            if (previous_signature == signature and
+                    all(self._changed[n] <= done_generation for n in closure)):
+                return
+
+        self._generation += 1
+        self._changed[node] = self._generation
+
         # basic node configuration
         conanref, conanfile = node
 
         new_reqs, new_options = self._config_node(conanfile, conanref, down_reqs, down_ref,
                                                   down_options)
+        self._prefetch_requirements(conanfile, public_deps)
 
         # Expand each one of the current requirements
         for name, require in conanfile.requires.iteritems():
@@ -276,6 +325,59 @@ class DepsBuilder(object):
                 self._load_deps(previous_node, new_reqs, dep_graph, public_deps, conanref,
                                 new_options.copy())
 
+        # The signature is computed again, the upstream closure might have grown
+        closure = self._upstream_closure(node, dep_graph)
+        signature = self._expansion_signature(node, closure, down_reqs, down_options)
+        self._expanded[node] = (signature, self._generation)
+
+    def _prefetch_requirements(self, conanfile, public_deps):
+        """ the requirements that will become new nodes are known after the node configuration,
+        so they can be retrieved all together before expanding them one by one
+        """
+        prefetch = getattr(self._retriever, "prefetch_conanfiles", None)
+        if not prefetch:
+            return
+        references = [require.conan_reference
+                      for name, require in conanfile.requires.iteritems()
+                      if not require.override and require.conan_reference is not None and
+                      (require.private or name not in public_deps)]
+        if references:
+            prefetch(references)
+
+    @staticmethod
+    def _upstream_closure(node, dep_graph):
+        """ returns the set of nodes reachable from the given one, including itself
+        """
+        closure = set([node])
+        open_nodes = [node]
+        while open_nodes:
+            current = open_nodes.pop()
+            for neighbor in dep_graph.neighbors(current):
+                if neighbor not in closure:
+                    closure.add(neighbor)
+                    open_nodes.append(neighbor)
+        return closure
+
+    @staticmethod
+    def _expansion_signature(node, closure, down_reqs, down_options):
+        """ computes a hashable value of the downstream requirements and options that
+        can affect the expansion of a node. Only the names of the upstream closure
+        are relevant, the rest are just passed through and discarded later
+        """
+        names = set()
+        for conan_ref, conanfile in closure:
+            if conan_ref:
+                names.add(conan_ref.name)
+            names.update(conanfile.requires.iterkeys())
+
+        reqs = tuple(sorted((name, req.conan_reference, req.private, req.override)
+                            for name, req in down_reqs.iteritems() if name in names))
+        options = None
+        if down_options is not None:
+            options = tuple((key, value) for key, value in down_options.as_list()
+                            if ":" in key and key.split(":")[0] in names)
+        return reqs, options
+
     def _config_node(self, conanfile, conanref, down_reqs, down_ref, down_options):
         """ update settings and option in the current ConanFile, computing actual
         requirement values, cause they can be overriden by downstream requires
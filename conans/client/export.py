@@ -5,7 +5,7 @@ to the local store, as an initial step before building or uploading to remotes
 import shutil
 import os
 from conans.util.files import save, load, rmdir
-from conans.paths import CONAN_MANIFEST, CONANFILE
+from conans.paths import CONAN_MANIFEST, CONANFILE, remove_stat_cache
 from conans.errors import ConanException
 from conans.client.file_copier import FileCopier
 from conans.model.manifest import FileTreeManifest
@@ -20,6 +20,9 @@ def export_conanfile(output, paths, file_patterns, origin_folder, conan_ref, kee
 
     digest = FileTreeManifest.create(destination_folder)
     save(os.path.join(destination_folder, CONAN_MANIFEST), str(digest))
+    partial_path = paths.export_partial(conan_ref)
+    if os.path.exists(partial_path):  # Exported again, now with all its files
+        os.remove(partial_path)
 
     if previous_digest and previous_digest.file_sums == digest.file_sums:
         digest = previous_digest
@@ -41,6 +44,7 @@ def _init_export_folder(destination_folder):
                 previous_digest = FileTreeManifest.loads(manifest_content)
             # Maybe here we want to invalidate cache
             rmdir(destination_folder)
+            remove_stat_cache(destination_folder)
         os.makedirs(destination_folder)
     except Exception as e:
         raise ConanException("Unable to create folder %s\n%s" % (destination_folder, str(e)))
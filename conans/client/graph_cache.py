@@ -0,0 +1,228 @@
+""" Persistent cache of resolved dependencies graphs. Computing the graph loads every
+conanfile, checks its export digest and runs its config() and requirements() methods,
+which is repeated for every install even if nothing changed. The resolved values of
+each node are stored, and reapplied to the freshly loaded conanfiles while the
+root conanfile, the settings, options and the manifests of all the exports are the same.
+The least recently used entries are removed when the cache exceeds its maximum size
+"""
+import json
+import os
+from conans.client.deps_builder import DepsGraph, Node
+from conans.client.output import ScopedOutput
+from conans.model.info import ConanInfo, RequirementsInfo, RequirementInfo, RequirementsList
+from conans.model.options import OptionsValues
+from conans.model.ref import ConanFileReference, PackageReference
+from conans.model.requires import Requirements, Requirement
+from conans.model.values import Values
+from conans.errors import ConanException
+from conans.util.files import load, save
+from conans.util.log import logger
+from conans.util.sha import sha1
+
+
+# Maximum size in bytes of the stored graphs
+MAX_SIZE = 16 * 1024 * 1024
+
+
+class GraphCache(object):
+    """ Stores one resolved graph per entry point and configuration, in json files
+    named with the key of the entry. The modification time of the files is used as the
+    last time they were used
+    """
+    def __init__(self, cache_folder, paths, loader, output, max_size=MAX_SIZE):
+        """ param loader: ConanFileLoader used to load the conanfiles of the cached nodes
+        param max_size: maximum size in bytes of the stored graphs
+        """
+        self._cache_folder = cache_folder
+        self._paths = paths
+        self._loader = loader
+        self._output = output
+        self._max_size = max_size
+
+    def key(self, root_content, conan_ref, filename=None, remote=None):
+        """ computes the key of an entry point. The manifests of the nodes are not part of
+        it, as the nodes are not known before resolving, they are checked on load()
+        param root_content: text of the root conanfile.py or conanfile.txt
+        """
+        items = [sha1(root_content),
+                 str(conan_ref),
+                 str(filename),
+                 str(remote),
+                 self._loader.configuration()]
+        return sha1("\n".join(items))
+
+    def load(self, key, conan_ref, conanfile):
+        """ returns the DepsGraph stored for the given key, with the given root conanfile,
+        or None if there is no valid entry
+        """
+        entry_path = self._entry_path(key)
+        try:
+            entry = json.loads(load(entry_path))
+        except (IOError, ValueError):
+            logger.debug("Graph cache miss: %s" % key)
+            return None
+
+        nodes_data = entry["nodes"]
+        for node_data in nodes_data:
+            if node_data["ref"] is None:
+                continue
+            ref = ConanFileReference.loads(node_data["ref"])
+            if self._manifest(ref) != node_data["manifest"]:
+                logger.debug("Graph cache miss: %s, export of %s changed" % (key, ref))
+                return None
+            # As retrieve_conanfile() does, so a corrupted export is retrieved again
+            if not self._paths.valid_conan_digest(ref):
+                logger.debug("Graph cache miss: %s, export of %s is not valid" % (key, ref))
+                return None
+
+        dep_graph = DepsGraph()
+        nodes = []
+        try:
+            for index, node_data in enumerate(nodes_data):
+                if index == 0:
+                    node_ref, node_conanfile = conan_ref, conanfile
+                else:
+                    node_ref = ConanFileReference.loads(node_data["ref"])
+                    output = ScopedOutput(str(node_ref), self._output)
+                    node_conanfile = self._loader.load_conan(self._paths.conanfile(node_ref),
+                                                             output)
+                _restore_conanfile(node_conanfile, node_data)
+                node = Node(node_ref, node_conanfile)
+                dep_graph.add_node(node)
+                nodes.append(node)
+        except (ConanException, KeyError) as e:
+            logger.debug("Graph cache miss: %s, %s" % (key, str(e)))
+            return None
+
+        for src, dst in entry["edges"]:
+            dep_graph.add_edge(nodes[src], nodes[dst])
+        try:
+            os.utime(entry_path, None)
+        except OSError:  # Removed by another install, still valid
+            pass
+        logger.debug("Graph cache hit: %s" % key)
+        return dep_graph
+
+    def store(self, key, dep_graph, conanfile):
+        """ saves the resolved DepsGraph, whose root node is the one of the given conanfile
+        """
+        root = [node for node in dep_graph.nodes if node.conanfile is conanfile][0]
+        nodes = [root]
+        for level in dep_graph.by_levels():
+            nodes.extend(node for node in level if node is not root)
+        indexes = {node: index for index, node in enumerate(nodes)}
+
+        nodes_data = []
+        edges = []
+        for node in nodes:
+            conan_ref, node_conanfile = node
+            node_data = _serialize_conanfile(node_conanfile)
+            node_data["ref"] = str(conan_ref) if conan_ref else None
+            node_data["manifest"] = self._manifest(conan_ref) if conan_ref else None
+            nodes_data.append(node_data)
+            edges.extend([indexes[node], indexes[neighbor]]
+                         for neighbor in dep_graph.neighbors(node))
+
+        entry_path = self._entry_path(key)
+        save(entry_path, json.dumps({"nodes": nodes_data, "edges": edges}))
+        self._evict(keep=entry_path)
+        logger.debug("Graph cache stored: %s" % key)
+
+    def _evict(self, keep):
+        entries = []
+        for filename in os.listdir(self._cache_folder):
+            if filename.endswith(".json") and len(filename) == 45:  # <sha1>.json
+                path = os.path.join(self._cache_folder, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # Evicted by another install
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            if path == keep:
+                continue
+            logger.debug("Graph cache evicting: %s" % path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self._cache_folder, "%s.json" % key)
+
+    def _manifest(self, conan_ref):
+        try:
+            return load(self._paths.digestfile_conanfile(conan_ref))
+        except IOError:
+            return None
+
+
+def _serialize_conanfile(conanfile):
+    requires = [[name, str(req.conan_reference) if req.conan_reference else None,
+                 req.private, req.override]
+                for name, req in conanfile.requires.iteritems()]
+    return {"settings": conanfile.settings.values.as_list(),
+            "options": conanfile.options.values.serialize(),
+            "requires": requires,
+            "info": _serialize_info(conanfile.info)}
+
+
+def _restore_conanfile(conanfile, data):
+    """ applies to a just loaded conanfile the values it had after the graph resolution,
+    including the fields removed by its config() method
+    """
+    settings = Values.from_list(_str_pairs(data["settings"]))
+    conanfile.settings.remove([field for field in conanfile.settings.fields
+                               if field not in settings.fields])
+    conanfile.settings.values = settings
+
+    options = OptionsValues.deserialize(data["options"])
+    conanfile.options.remove([field for field in conanfile.options.fields
+                              if field not in options._options.fields])
+    conanfile.options.values = options
+
+    requires = Requirements()
+    for name, ref, private, override in data["requires"]:
+        ref = ConanFileReference.loads(str(ref)) if ref else None
+        requires[str(name)] = Requirement(ref, private, override)
+    conanfile.requires = requires
+    conanfile.info = _deserialize_info(data["info"])
+
+
+def _serialize_info(info):
+    """ ConanInfo.serialize() doesn't keep the indirect requirements, nor the values
+    narrowed by conan_info(), both needed for the package_id. Options keep the empty
+    values of the indirect requirements, also part of the package_id
+    """
+    requires = {str(ref): [req.name, req.version, req.user, req.channel, req.package_id]
+                for ref, req in info.requires._data.iteritems()}
+    return {"settings": info.settings.as_list(),
+            "full_settings": info.full_settings.as_list(),
+            "options": info.options.serialize(),
+            "full_options": info.full_options.serialize(),
+            "requires": requires,
+            "full_requires": info.full_requires.serialize()}
+
+
+def _deserialize_info(data):
+    info = ConanInfo()
+    info.settings = Values.from_list(_str_pairs(data["settings"]))
+    info.full_settings = Values.from_list(_str_pairs(data["full_settings"]))
+    info.options = OptionsValues.deserialize(data["options"])
+    info.full_options = OptionsValues.deserialize(data["full_options"])
+    info.full_requires = RequirementsList.deserialize([str(r) for r in data["full_requires"]])
+    info.requires = RequirementsInfo([])
+    for ref, fields in data["requires"].iteritems():
+        req = RequirementInfo(str(ref))
+        (req.name, req.version, req.user, req.channel,
+         req.package_id) = [str(field) if field is not None else None for field in fields]
+        info.requires._data[PackageReference.loads(str(ref))] = req
+    return info
+
+
+def _str_pairs(pairs):
+    return [(str(key), str(value)) for key, value in pairs]
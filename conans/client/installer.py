@@ -1,6 +1,6 @@
 import os
-from conans.paths import CONANINFO, BUILD_INFO
-from conans.util.files import save, rmdir, path_exists
+from conans.paths import CONANINFO, BUILD_INFO, remove_stat_cache
+from conans.util.files import save, rmdir, path_exists, chdir
 from conans.model.ref import PackageReference
 from conans.util.log import logger
 from conans.errors import ConanException
@@ -9,17 +9,27 @@ import shutil
 from conans.client.generators import write_generators, TXTGenerator
 from conans.model.build_info import CppInfo
 import fnmatch
-from conans.client.output import Color, ScopedOutput
+from conans.client.output import Color, ScopedOutput, ConanOutput
+from conans.client.build_executor import BuildExecutor
+from multiprocessing.pool import ThreadPool
+from functools import partial
+from cStringIO import StringIO
+import threading
 
 
 class ConanInstaller(object):
     """ main responsible of retrieving binary packages or building them from source
     locally in case they are not found in remotes
     """
-    def __init__(self, paths, user_io, remote_proxy):
+    def __init__(self, paths, user_io, remote_proxy, jobs=1):
+        """ param jobs: number of packages of the same level retrieved concurrently
+        """
         self._paths = paths
         self._out = user_io.out
         self._remote_proxy = remote_proxy
+        self._jobs = jobs
+        # system_requirements() of different packages might use the same package manager
+        self._system_reqs_lock = threading.Lock()
 
     def install(self, deps_graph, build_mode=False):
         """ given a DepsGraph object, build necessary nodes or retrieve them
@@ -27,6 +37,7 @@ class ConanInstaller(object):
         self._deps_graph = deps_graph  # necessary for _build_package
         self._out.writeln("\nInstalling requirements", Color.BRIGHT_YELLOW)
         nodes_by_level = self._process_buildinfo(deps_graph)
+        self._prefetch_metadata(deps_graph, build_mode)
         skip_private_nodes = self._compute_private_nodes(deps_graph, build_mode)
         self._build(nodes_by_level, skip_private_nodes, build_mode)
 
@@ -56,6 +67,19 @@ class ConanInstaller(object):
         nodes_by_level = deps_graph.propagate_buildinfo()
         return nodes_by_level
 
+    def _prefetch_metadata(self, deps_graph, build_mode):
+        """ the remote metadata of all the packages that are not installed is requested
+        at once, instead of with several requests for each one when it is retrieved
+        """
+        package_references = []
+        for conan_ref, conan_file in deps_graph.nodes:
+            if conan_ref is None or self._force_build(conan_ref, build_mode):
+                continue
+            package_reference = PackageReference(conan_ref, conan_file.info.package_id())
+            if not os.path.exists(self._paths.package(package_reference)):
+                package_references.append(package_reference)
+        self._remote_proxy.prefetch_metadata(package_references)
+
     def _compute_private_nodes(self, deps_graph, build_mode):
         """ computes a list of nodes that are not required to be built, as they are
         private requirements of already available shared libraries as binaries
@@ -93,6 +117,10 @@ class ConanInstaller(object):
                            for pattern in build_mode])
         return force_build
 
+    def _build_allowed(self, conan_ref, build_mode):
+        # Can we build? Only if we are forced or build_mode missing and package not exists
+        return self._force_build(conan_ref, build_mode) or build_mode is True
+
     def _build(self, nodes_by_level, skip_private_nodes, build_mode):
         """ The build assumes an input of conans ordered by degree, first level
         should be indpendent from each other, the next-second level should have
@@ -101,33 +129,109 @@ class ConanInstaller(object):
         """
         # Now build each level, starting from the most independent one
         for level in nodes_by_level:
-            for node in level:
-                if node in skip_private_nodes:
-                    continue
-                conan_ref, conan_file = node
-                # it is possible that the root conans
-                # is not inside the storage but in a user folder, and thus its
-                # treatment is different
-                if not conan_ref:
-                    continue
+            # it is possible that the root conans
+            # is not inside the storage but in a user folder, and thus its
+            # treatment is different
+            nodes = [node for node in level
+                     if node not in skip_private_nodes and node.conan_ref]
+            if self._jobs > 1 and len(nodes) > 1:
+                self._build_level(nodes, build_mode)
+                continue
+            for conan_ref, conan_file in nodes:
                 logger.debug("Building node %s" % repr(conan_ref))
                 self._build_node(conan_ref, conan_file, build_mode)
 
+    def _build_level(self, nodes, build_mode):
+        """ The nodes of a level are independent, so their binaries are retrieved
+        concurrently, each one reporting to its own buffered output, written in order
+        when all of them finished. The ones that have to be built from sources are built
+        afterwards, each one in a worker process, as their conanfile methods work in the
+        current directory. Where worker processes are not available, they are built one
+        by one
+        """
+        def retrieve(node):
+            conan_ref, conan_file = node
+            logger.debug("Retrieving node %s" % repr(conan_ref))
+            buffer = StringIO()
+            node_out = ConanOutput(buffer, self._out.color)
+            output = ScopedOutput(str(conan_ref), node_out)
+            try:
+                retrieved = self._retrieve_node(conan_ref, conan_file, build_mode, output,
+                                                node_out)
+                return retrieved, buffer.getvalue(), None
+            except Exception as exc:
+                return False, buffer.getvalue(), exc
+
+        pool = ThreadPool(min(len(nodes), self._jobs))
+        try:
+            results = pool.map(retrieve, nodes)
+        finally:
+            pool.close()
+            pool.join()
+
+        to_build = []
+        error = None
+        for node, (retrieved, text, exc) in zip(nodes, results):
+            self._out.write(text)
+            if exc is not None:
+                error = error or exc
+            elif not retrieved:
+                to_build.append(node)
+        if error is not None:
+            raise error
+
+        for conan_ref, conan_file in to_build:
+            if not self._build_allowed(conan_ref, build_mode):
+                self._raise_package_not_found_error(conan_ref, conan_file)
+
+        if len(to_build) > 1 and BuildExecutor.available():
+            # Retrieved before forking, the workers must not share the connections
+            for conan_ref, _ in to_build:
+                if self._build_allowed(conan_ref, build_mode):
+                    output = ScopedOutput(str(conan_ref), self._out)
+                    self._remote_proxy.get_export_sources(conan_ref, output, self._out)
+            tasks = [(str(conan_ref), partial(self._isolated_build, conan_ref, conan_file,
+                                              build_mode))
+                     for conan_ref, conan_file in to_build]
+            BuildExecutor(self._out, self._jobs).run(tasks)
+            return
+
+        for conan_ref, conan_file in to_build:
+            logger.debug("Building node %s" % repr(conan_ref))
+            output = ScopedOutput(str(conan_ref), self._out)
+            self._build_from_source(conan_ref, conan_file, build_mode, output)
+
+    def _isolated_build(self, conan_ref, conan_file, build_mode, node_out):
+        """ runs in a worker process of the BuildExecutor, a copy of this one, so changing
+        the current directory or the installer output doesn't affect the others. The
+        output of the conanfile and of its commands is sent to the parent too
+        """
+        logger.debug("Building node %s in process %d" % (repr(conan_ref), os.getpid()))
+        self._out = node_out
+        output = ScopedOutput(str(conan_ref), node_out)
+        conan_file.output = output
+        conan_file._runner = _OutputRunner(conan_file._runner, output)
+        self._build_from_source(conan_ref, conan_file, build_mode, output)
+
     def _build_node(self, conan_ref, conan_file, build_mode):
         # Compute conan_file package from local (already compiled) or from remote
         output = ScopedOutput(str(conan_ref), self._out)
+        if not self._retrieve_node(conan_ref, conan_file, build_mode, output, self._out):
+            self._build_from_source(conan_ref, conan_file, build_mode, output)
+
+    def _retrieve_node(self, conan_ref, conan_file, build_mode, output, node_out):
+        """ returns True if the binary package is already installed or could be retrieved
+        from remotes, False if it has to be built from sources
+        param node_out: the output stream of the node, where output writes to
+        """
         package_id = conan_file.info.package_id()
-        self._out.writeln("")
+        node_out.writeln("")
         output.info("Installing package %s" % package_id)
         package_reference = PackageReference(conan_ref, package_id)
-
-        conan_ref = package_reference.conan
         package_folder = self._paths.package(package_reference)
-        build_folder = self._paths.build(package_reference)
-        src_folder = self._paths.source(conan_ref)
-        export_folder = self._paths.export(conan_ref)
 
-        self._handle_system_requirements(conan_ref, package_reference, conan_file, output)
+        with self._system_reqs_lock:
+            self._handle_system_requirements(conan_ref, package_reference, conan_file, output)
 
         # Check if package is corrupted
         valid_package_digest = self._paths.valid_package_digest(package_reference)
@@ -136,27 +240,33 @@ class ConanInstaller(object):
             output.warn("Bad package '%s' detected! Removing "
                         "package directory... " % str(package_id))
             rmdir(package_folder)
+            remove_stat_cache(package_folder)
 
         # Check if any only_source pattern matches with package
-        force_build = self._force_build(conan_ref, build_mode)
+        if self._force_build(conan_ref, build_mode):
+            return False
 
-        if not force_build:
-            local_package = os.path.exists(package_folder)
-            if local_package:
-                output.info('Package installed in %s' % package_folder)
-                return
+        local_package = os.path.exists(package_folder)
+        if local_package:
+            output.info('Package installed in %s' % package_folder)
+            return True
 
-            output.info('Package not installed')
-            remote_package = self._remote_proxy.retrieve_remote_package(package_reference, output)
-            if remote_package:
-                return
+        output.info('Package not installed')
+        return self._remote_proxy.retrieve_remote_package(package_reference, output, node_out)
 
-        # Can we build? Only if we are forced or build_mode missing and package not exists
-        build_allowed = force_build or build_mode is True
+    def _build_from_source(self, conan_ref, conan_file, build_mode, output):
+        package_reference = PackageReference(conan_ref, conan_file.info.package_id())
+        package_folder = self._paths.package(package_reference)
+        build_folder = self._paths.build(package_reference)
+        src_folder = self._paths.source(conan_ref)
+        export_folder = self._paths.export(conan_ref)
 
-        if build_allowed:
+        force_build = self._force_build(conan_ref, build_mode)
+        if self._build_allowed(conan_ref, build_mode):
+            self._remote_proxy.get_export_sources(conan_ref, output, self._out)
             rmdir(build_folder)
             rmdir(package_folder)
+            remove_stat_cache(package_folder)
             if force_build:
                 output.warn('Forced build from source')
 
@@ -169,8 +279,8 @@ class ConanInstaller(object):
                                                                       conan_file.cpp_info).content)
             output.info("Generated %s" % BUILD_INFO)
 
-            os.chdir(build_folder)
-            create_package(conan_file, build_folder, package_folder, output)
+            with chdir(build_folder):
+                create_package(conan_file, build_folder, package_folder, output)
         else:
             self._raise_package_not_found_error(conan_ref, conan_file)
 
@@ -223,14 +333,13 @@ Package configuration:
         if not os.path.exists(src_folder):
             output.info('Configuring sources in %s' % src_folder)
             shutil.copytree(export_folder, src_folder)
-            os.chdir(src_folder)
             try:
-                conan_file.source()
+                with chdir(src_folder):
+                    conan_file.source()
             except Exception as e:
                 output.error("Error while executing source(): %s" % str(e))
                 # in case source() fails (user error, typically), remove the src_folder
                 # and raise to interrupt any other processes (build, package)
-                os.chdir(export_folder)
                 try:
                     rmdir(src_folder)
                 except Exception as e_rm:
@@ -249,7 +358,10 @@ Package configuration:
             self._config_source(export_folder, src_folder, conan_file, output)
             output.info('Copying sources to build folder')
             shutil.copytree(src_folder, build_folder, symlinks=True)
-        os.chdir(build_folder)
+        with chdir(build_folder):
+            self._build_in_folder(export_folder, build_folder, conan_file, output)
+
+    def _build_in_folder(self, export_folder, build_folder, conan_file, output):
         conan_file._conanfile_directory = build_folder
         # Read generators from conanfile and generate the needed files
         write_generators(conan_file, build_folder, output)
@@ -271,7 +383,6 @@ Package configuration:
             output.success("Package '%s' built" % os.path.basename(build_folder))
             output.info("Build folder %s" % build_folder)
         except Exception as e:
-            os.chdir(src_folder)
             self._out.writeln("")
             output.error("Package '%s' build failed" % os.path.basename(build_folder))
             output.warn("Build folder %s" % build_folder)
@@ -284,3 +395,18 @@ Package configuration:
                     os.remove(f)
                 except Exception:
                     self._out.warn("Unable to remove imported file from build: %s" % f)
+
+
+class _OutputRunner(object):
+    """ runner of the conanfiles built in worker processes, writes the output of the
+    commands to the given stream, instead of the standard output shared with the rest
+    of the builds
+    """
+    def __init__(self, runner, output):
+        self._runner = runner
+        self._output = output
+
+    def __call__(self, command, output=True, cwd=None):
+        if output is True:
+            output = self._output
+        return self._runner(command, output, cwd)
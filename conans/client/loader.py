@@ -25,6 +25,12 @@ class ConanFileLoader(object):
         self._settings = settings
         self._options = options
 
+    def configuration(self):
+        """ returns the text of the settings and options given to the conanfiles, the
+        same for all the loads done with the same configuration
+        """
+        return "\n".join([self._settings.values.dumps(), self._options.dumps()])
+
     def _create_check_conan(self, conan_file, consumer, conan_file_path, output, filename):
         """ Check the integrity of a given conanfile
         """
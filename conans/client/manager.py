@@ -1,5 +1,6 @@
 import os
-from conans.paths import (CONANFILE, CONANINFO, CONANFILE_TXT, BUILD_INFO)
+from conans.paths import (CONANFILE, CONANINFO, CONANFILE_TXT, BUILD_INFO,
+                          remove_stat_cache)
 from conans.client.loader import ConanFileLoader
 from conans.client.export import export_conanfile
 from conans.client.deps_builder import DepsBuilder
@@ -21,12 +22,13 @@ from conans.server.store.file_manager import FileManager
 from conans.model.values import Values
 from conans.model.options import OptionsValues
 import re
-from conans.info import SearchInfo
+from conans.model.package_query import PackageQuery
 from conans.model.build_info import DepsCppInfo
 from conans.client import packager
 from conans.client.package_copier import PackageCopier
 from conans.client.output import ScopedOutput
 from conans.client.proxy import ConanfileRemoteProxy, ConanRemoteProxy
+from conans.client.graph_cache import GraphCache
 
 
 def get_user_channel(text):
@@ -122,13 +124,18 @@ class ConanManager(object):
             remote_proxy.download_packages(reference, info[reference].keys())
 
     def install(self, reference, current_path, remote=None, options=None, settings=None,
-                build_mode=False, info=None, filename=None):
+                build_mode=False, info=None, filename=None, graph_cache=True, jobs=1,
+                verify_full=False):
         """ Fetch and build all dependencies for the given reference
         @param reference: ConanFileReference or path to user space conanfile
         @param current_path: where the output files will be saved
         @param remote: install only from that remote
         @param options: written in JSON, e.g. {"compiler": "Visual Studio 12", ...}
+        @param graph_cache: use a previously resolved graph if nothing changed since then
+        @param jobs: number of packages of the same level installed concurrently
+        @param verify_full: hash all the files of exports and packages to check them
         """
+        self._paths.verify_full = verify_full
         reference_given = True
         if not isinstance(reference, ConanFileReference):
             conanfile_path = reference
@@ -142,6 +149,7 @@ class ConanManager(object):
         if reference_given:
             project_reference = None
             conanfile = remote_proxy.retrieve_conanfile(reference, consumer=True)
+            root_path = self._paths.conanfile(reference)
         else:
             project_reference = "PROJECT"
             output = ScopedOutput(project_reference, self._user_io.out)
@@ -150,6 +158,7 @@ class ConanManager(object):
                     raise NotFoundException()
                 conan_file_path = os.path.join(conanfile_path, filename or CONANFILE)
                 conanfile = loader.load_conan(conan_file_path, output, consumer=True)
+                root_path = conan_file_path
                 is_txt = False
 
                 if conanfile.name is not None and conanfile.version is not None:
@@ -162,18 +171,25 @@ class ConanManager(object):
             except NotFoundException:  # Load requirements.txt
                 conan_path = os.path.join(conanfile_path, filename or CONANFILE_TXT)
                 conanfile = loader.load_conan_txt(conan_path, output)
+                root_path = conan_path
                 is_txt = True
 
-        # build deps graph and install it
-        builder = DepsBuilder(remote_proxy, self._user_io.out)
-        deps_graph = builder.load(reference, conanfile)
+        # build deps graph and install it, unless an equal one was already computed
+        cache = GraphCache(self._paths.graph_cache, self._paths, loader, self._user_io.out)
+        cache_key = cache.key(load(root_path), reference, filename, remote)
+        use_cache = graph_cache and not verify_full  # a full verification checks exports too
+        deps_graph = cache.load(cache_key, reference, conanfile) if use_cache else None
+        if deps_graph is None:
+            builder = DepsBuilder(remote_proxy, self._user_io.out)
+            deps_graph = builder.load(reference, conanfile)
+            cache.store(cache_key, deps_graph, conanfile)
         if info:
             Printer(self._user_io.out).print_info(deps_graph, project_reference, info)
             return
         Printer(self._user_io.out).print_graph(deps_graph)
 
         remote_proxy = ConanRemoteProxy(self._paths, self._user_io, self._remote_manager, remote)
-        installer = ConanInstaller(self._paths, self._user_io, remote_proxy)
+        installer = ConanInstaller(self._paths, self._user_io, remote_proxy, jobs)
         installer.install(deps_graph, build_mode)
 
         if not reference_given:
@@ -205,8 +221,9 @@ class ConanManager(object):
                 packages_dir = self._paths.builds(reference)
             if not os.path.exists(packages_dir):
                 raise NotFoundException('%s does not exist' % str(reference))
-            packages = [PackageReference(reference, packid)
-                        for packid in os.listdir(packages_dir)]
+            package_ids = (self._paths.conan_packages(reference) if only_manifest
+                           else self._paths.conan_builds(reference))
+            packages = [PackageReference(reference, packid) for packid in package_ids]
         else:
             packages = [PackageReference(reference, package_id)]
 
@@ -219,6 +236,7 @@ class ConanManager(object):
                 loader = self._loader(build_folder)
                 conanfile = loader.load_conan(conan_file_path, self._user_io.out)
                 rmdir(package_folder)
+                remove_stat_cache(package_folder)
                 packager.create_package(conanfile, build_folder, package_folder, self._user_io.out)
             else:
                 self._user_io.out.info("Creating manifest for %s" % package_reference.package_id)
@@ -270,13 +288,14 @@ class ConanManager(object):
             raise ConanException("Unable to build it successfully\n%s" % '\n'.join(trace[3:]))
 
     def upload(self, conan_reference, package_id=None, remote=None, all_packages=None,
-               force=False):
-
+               force=False, jobs=1):
+        """ @param jobs: number of packages uploaded concurrently with all_packages
+        """
         if not remote:
             remote = self._remote_manager.default_remote  # Not iterate in remotes, just current
 
         remote_proxy = ConanRemoteProxy(self._paths, self._user_io, self._remote_manager, remote)
-        uploader = ConanUploader(self._paths, self._user_io, remote_proxy)
+        uploader = ConanUploader(self._paths, self._user_io, remote_proxy, jobs)
 
         if package_id:  # Upload package
             uploader.upload_package(PackageReference(conan_reference, package_id))
@@ -284,20 +303,28 @@ class ConanManager(object):
             uploader.upload_conan(conan_reference, all_packages=all_packages, force=force)
 
     def search(self, pattern=None, remote=None, ignorecase=True,
-               verbose=False, package_pattern=None):
+               verbose=False, package_pattern=None, packages_query=None):
         """ Print the single information saved in conan.vars about all the packages
             or the packages which match with a pattern
 
             Attributes:
                 pattern = string to match packages
                 remote = search on another origin to get packages info
+                packages_query = query of the settings, options and requirements of the
+                                 packages, e.g. "os=Linux AND options.shared=True"
         """
+        query = PackageQuery.loads(packages_query) if packages_query else None
         if remote:
-            info = self._remote_manager.search(pattern, remote, ignorecase)
+            # The full_settings and full_options are not printed. The results are printed
+            # as they are received
+            results = self._remote_manager.search_iter(pattern, remote, ignorecase,
+                                                       packages_query,
+                                                       fields=SEARCH_PRINTED_FIELDS)
+            if query:  # Remotes that don't support queries return all the packages
+                results = _filter_packages(results, query)
         else:
-            info = self.file_manager.search(pattern, ignorecase)
-
-        filtered_info = info
+            info = self.file_manager.search(pattern, ignorecase, packages_query=query)
+            results = sorted(info.iteritems())
 
         # Filter packages if package_pattern
         if package_pattern:
@@ -308,17 +335,12 @@ class ConanManager(object):
 
                 # Compile expression
                 package_pattern = re.compile(package_pattern, re.IGNORECASE)
-                filtered_info = SearchInfo()
-                for conan_ref, packages in sorted(info.iteritems()):
-                    filtered_packages = {pid: data for pid, data in packages.iteritems()
-                                         if package_pattern.match(pid)}
-                    if filtered_packages:
-                        filtered_info[conan_ref] = filtered_packages
             except Exception:  # Invalid pattern
                 raise ConanException("Invalid package pattern")
+            results = _filter_package_ids(results, package_pattern)
 
         printer = Printer(self._user_io.out)
-        printer.print_search(filtered_info, pattern, verbose)
+        printer.print_search(results, pattern, verbose)
 
     @property
     def file_manager(self):
@@ -338,7 +360,7 @@ class ConanManager(object):
         @param remote: install only from that remote
         """
         copier = PackageCopier(self._paths, self._user_io)
-        package_ids = package_ids or os.listdir(self._paths.packages(reference))
+        package_ids = package_ids or self._paths.conan_packages(reference)
         copier.copy(reference, package_ids, username, channel, force)
 
     def remove(self, pattern, src=False, build_ids=None, package_ids_filter=None, force=False,
@@ -372,3 +394,29 @@ class ConanManager(object):
             else:
                 self._user_io.out.info('Change user from %s to %s %s' % (user, name, anon))
             self._localdb.set_login((name, token))
+
+
+# The fields of the packages printed by the search, and needed by the package queries
+SEARCH_PRINTED_FIELDS = ["settings", "options", "requires", "full_requires"]
+
+
+def _filter_packages(results, query):
+    """ yields the (conan_ref, packages) of the results with only the packages that match
+    the PackageQuery
+    """
+    for conan_ref, packages in results:
+        packages = {package_id: conan_info for package_id, conan_info in packages.iteritems()
+                    if query.matches(conan_info)}
+        if packages:
+            yield conan_ref, packages
+
+
+def _filter_package_ids(results, package_pattern):
+    """ yields the (conan_ref, packages) of the results with only the packages whose id
+    matches the compiled package_pattern
+    """
+    for conan_ref, packages in results:
+        filtered_packages = {pid: data for pid, data in packages.iteritems()
+                             if package_pattern.match(pid)}
+        if filtered_packages:
+            yield conan_ref, filtered_packages
@@ -40,6 +40,10 @@ class ConanOutput(object):
         self._stream = stream
         self._color = color
 
+    @property
+    def color(self):
+        return self._color
+
     def writeln(self, data, front=None, back=None):
         self.write(data, front, back, True)
 
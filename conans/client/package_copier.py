@@ -1,6 +1,7 @@
 from conans.model.ref import ConanFileReference, PackageReference
 import os
 from conans.util.files import rmdir
+from conans.paths import remove_stat_cache
 import shutil
 from conans.errors import ConanException
 
@@ -26,7 +27,15 @@ class PackageCopier(object):
                                                                % str(dest_ref)):
                 return
             rmdir(export_dest)
+            remove_stat_cache(export_dest)
         shutil.copytree(export_origin, export_dest)
+        # An export downloaded without its sources is copied without them too
+        partial_dest = self._paths.export_partial(dest_ref)
+        partial_origin = self._paths.export_partial(reference)
+        if os.path.exists(partial_origin):
+            shutil.copy(partial_origin, partial_dest)
+        elif os.path.exists(partial_dest):
+            os.remove(partial_dest)
         self._user_io.out.info("Copied %s to %s" % (str(reference), str(dest_ref)))
 
         # Copy packages
@@ -41,5 +50,6 @@ class PackageCopier(object):
                                                                    % str(package_id)):
                     continue
                 rmdir(package_path_dest)
+                remove_stat_cache(package_path_dest)
             shutil.copytree(package_path_origin, package_path_dest)
             self._user_io.out.info("Copied %s to %s" % (str(package_id), str(dest_ref)))
@@ -1,7 +1,7 @@
 from conans.util.files import mkdir, save, rmdir
 import os
 from conans.util.log import logger
-from conans.paths import CONANINFO, CONAN_MANIFEST
+from conans.paths import CONANINFO, CONAN_MANIFEST, remove_stat_cache
 from conans.errors import ConanException
 from conans.model.build_info import DEFAULT_RES, DEFAULT_BIN, DEFAULT_LIB, DEFAULT_INCLUDE
 import shutil
@@ -36,6 +36,7 @@ def create_package(conanfile, build_folder, package_folder, output):
         os.chdir(build_folder)
         try:
             rmdir(package_folder)
+            remove_stat_cache(package_folder)
         except Exception as e_rm:
             output.error("Unable to remove package folder %s\n%s"
                                     % (package_folder, str(e_rm)))
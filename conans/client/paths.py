@@ -9,6 +9,8 @@ from conans.client.detect import detect_defaults_settings
 CONAN_CONF = 'conan.conf'
 CONAN_SETTINGS = "settings.yml"
 LOCALDB = ".conan.db"
+GRAPH_CACHE = "graph_cache"
+COMPRESSED_CACHE = "compressed_cache"
 
 
 class ConanPaths(StorePaths):
@@ -43,6 +45,14 @@ class ConanPaths(StorePaths):
     def localdb(self):
         return os.path.join(self.conan_folder, LOCALDB)
 
+    @property
+    def graph_cache(self):
+        return os.path.join(self.conan_folder, GRAPH_CACHE)
+
+    @property
+    def compressed_cache(self):
+        return os.path.join(self.conan_folder, COMPRESSED_CACHE)
+
     @property
     def conan_conf_path(self):
         return os.path.join(self.conan_folder, CONAN_CONF)
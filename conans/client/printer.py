@@ -74,18 +74,17 @@ class Printer(object):
                 for d in depends:
                     self._out.writeln("        %s" % repr(d.conan_ref), Color.BRIGHT_YELLOW)
 
-    def print_search(self, info, pattern=None, verbose=False):
+    def print_search(self, results, pattern=None, verbose=False):
         """ Print all the exported conans information
+        param results: iterable of (ConanFileReference, {package_id: ConanInfo}), printed in
+        its order as they are consumed
         param pattern: wildcards, e.g., "opencv/*"
         """
-        if not info:
-            warn_msg = "There are no packages"
-            pattern_msg = " matching the %s pattern" % pattern
-            self._out.info(warn_msg + pattern_msg if pattern else warn_msg)
-            return
-
-        self._out.info("Existing packages info:\n")
-        for conan_ref, packages in sorted(info.iteritems()):
+        found = False
+        for conan_ref, packages in results:
+            if not found:
+                self._out.info("Existing packages info:\n")
+                found = True
             self._print_colored_line(str(conan_ref), indent=0)
             if not packages:
                 self._out.writeln('    There are no packages', Color.RED)
@@ -116,6 +115,11 @@ class Printer(object):
                         settings_line = "(%s)" % ", ".join(settings_line)
                         self._print_colored_line(settings_line, indent=3)
 
+        if not found:
+            warn_msg = "There are no packages"
+            pattern_msg = " matching the %s pattern" % pattern
+            self._out.info(warn_msg + pattern_msg if pattern else warn_msg)
+
     def _print_colored_line(self, text, value=None, indent=0):
         """ Print a colored line depending on its indentation level
             Attributes:
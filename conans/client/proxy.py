@@ -1,19 +1,25 @@
-from conans.client.output import ScopedOutput
+from conans.client.output import ScopedOutput, ConanOutput
 from conans.util.files import path_exists, rmdir
+from conans.paths import remove_stat_cache
 from conans.model.ref import PackageReference
 from conans.errors import ConanException
+from conans.util.log import logger
+from multiprocessing.pool import ThreadPool
+from cStringIO import StringIO
 
 
 class ConanfileRemoteProxy(object):
     """ A Remote proxy just for loading conanfiles. It is needed by the DepsBuilder,
     when it has to build the transitive graph of dependencies
     """
-    def __init__(self, paths, user_io, conan_loader, remote_manager, remote):
+    def __init__(self, paths, user_io, conan_loader, remote_manager, remote,
+                 prefetch_threads=8):
         self._paths = paths
         self._loader = conan_loader
         self._out = user_io.out
         self._remote_manager = remote_manager
         self._remote = remote
+        self._prefetch_threads = prefetch_threads
 
     def retrieve_conanfile(self, conan_reference, consumer=False):
         """ returns the requested conanfile object, retrieving it from
@@ -21,18 +27,59 @@ class ConanfileRemoteProxy(object):
         """
         output = ScopedOutput(str(conan_reference), self._out)
         conanfile_path = self._paths.conanfile(conan_reference)
+        self._retrieve_remote_conanfile(conan_reference, output)
+        conanfile = self._loader.load_conan(conanfile_path, output, consumer)
+        return conanfile
+
+    def prefetch_conanfiles(self, conan_references):
+        """ retrieves concurrently the conanfiles not available in the local store, so
+        they are already there when retrieve_conanfile() is called for each one. Failures
+        are ignored here, retrieve_conanfile() will report them in order
+        """
+        missing = [conan_reference for conan_reference in conan_references
+                   if not self._paths.valid_conan_digest(conan_reference)]
+        if missing:
+            self._remote_manager.prefetch_metadata(missing, [], self._remote)
+        if len(missing) < 2 or self._prefetch_threads < 2:
+            return
+
+        pool = ThreadPool(min(len(missing), self._prefetch_threads))
+        try:
+            outputs = pool.map(self._prefetch_conanfile, missing)
+        finally:
+            pool.close()
+            pool.join()
+        # Output is buffered per reference and written in order, so it doesn't interleave
+        for output in outputs:
+            self._out.write(output)
+
+    def _prefetch_conanfile(self, conan_reference):
+        """ returns the output of the retrieval, or an empty one if it failed
+        """
+        buffer = StringIO()
+        buffered_output = ConanOutput(buffer, self._out.color)
+        output = ScopedOutput(str(conan_reference), buffered_output)
+        try:
+            self._retrieve_remote_conanfile(conan_reference, output, buffered_output)
+        except Exception as exc:
+            logger.debug("Prefetch of %s failed: %s" % (str(conan_reference), str(exc)))
+            export_folder = self._paths.export(conan_reference)
+            rmdir(export_folder)
+            remove_stat_cache(export_folder)
+            return ""
+        return buffer.getvalue()
 
+    def _retrieve_remote_conanfile(self, conan_reference, output, remote_output=None):
         if not self._paths.valid_conan_digest(conan_reference):
             conan_dir_path = self._paths.export(conan_reference)
             if path_exists(conan_dir_path, self._paths.store):
                 # If not valid conanfile, ensure empty folder
                 output.warn("Bad conanfile detected! Removing export directory... ")
                 rmdir(conan_dir_path)
+                remove_stat_cache(conan_dir_path)
             output.info("Conanfile not found, retrieving from server")
             # If not in localhost, download it. Will raise if not found
-            self._remote_manager.get_conanfile(conan_reference, self._remote)
-        conanfile = self._loader.load_conan(conanfile_path, output, consumer)
-        return conanfile
+            self._remote_manager.get_conanfile(conan_reference, self._remote, remote_output)
 
 
 class ConanRemoteProxy(object):
@@ -51,14 +98,15 @@ class ConanRemoteProxy(object):
     def upload_conan(self, conan_reference):
         return self._remote_manager.upload_conan(conan_reference, self._remote)
 
-    def upload_package(self, package_reference):
-        return self._remote_manager.upload_package(package_reference, self._remote)
+    def upload_package(self, package_reference, output=None):
+        return self._remote_manager.upload_package(package_reference, self._remote, output)
 
     def get_conan_digest(self, conan_ref):
         return self._remote_manager.get_conan_digest(conan_ref, self._remote)
 
-    def search(self, pattern=None, ignorecase=True):
-        return self._remote_manager.search(pattern, self._remote, ignorecase)
+    def search(self, pattern=None, ignorecase=True, packages_query=None, fields=None):
+        return self._remote_manager.search(pattern, self._remote, ignorecase, packages_query,
+                                           fields)
 
     def remove(self, conan_ref):
         return self._remote_manager.remove(conan_ref, self._remote)
@@ -66,6 +114,21 @@ class ConanRemoteProxy(object):
     def remove_packages(self, conan_ref, remove_ids):
         return self._remote_manager.remove_packages(conan_ref, remove_ids, self._remote)
 
+    def prefetch_metadata(self, package_references):
+        """ requests at once the metadata of the packages that might be retrieved
+        """
+        if package_references:
+            self._remote_manager.prefetch_metadata([], package_references, self._remote)
+
+    def get_export_sources(self, conan_reference, output, remote_output=None):
+        """ retrieves the sources of an export whose conanfile was downloaded alone,
+        when it has to be built
+        """
+        if self._paths.is_partial_export(conan_reference):
+            output.info("Retrieving the exported sources from server")
+            self._remote_manager.get_export_sources(conan_reference, self._remote,
+                                                    remote_output)
+
     def download_packages(self, reference, package_ids):
         assert(isinstance(package_ids, list))
         self._remote_manager.get_conanfile(reference, self._remote)
@@ -74,12 +137,15 @@ class ConanRemoteProxy(object):
             package_reference = PackageReference(reference, package_id)
             self.retrieve_remote_package(package_reference, output)
 
-    def retrieve_remote_package(self, package_reference, output):
+    def retrieve_remote_package(self, package_reference, output, remote_output=None):
+        """ param remote_output: where the download progress is reported, by default
+        the RemoteManager one
+        """
         package_id = str(package_reference.package_id)
         try:
             output.info("Looking for package %s in remotes" % package_id)
             # Will raise if not found NotFoundException
-            self._remote_manager.get_package(package_reference, self._remote)
+            self._remote_manager.get_package(package_reference, self._remote, remote_output)
             output.success('Package installed %s' % package_id)
             return True
         except ConanException as e:
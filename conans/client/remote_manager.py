@@ -1,30 +1,55 @@
 from conans.errors import ConanException, NotFoundException, ConanConnectionError
-from requests.exceptions import ConnectionError
-from conans.util.files import build_files_set, save, tar_extract
+from requests.exceptions import ConnectionError, RetryError, ChunkedEncodingError
+from conans.util.files import build_files_set, tar_extract, save_chunks, rmdir, md5, load, save
+from conans.client.compressed_cache import CompressedCache
 from conans.util.log import logger
 import traceback
 from conans.errors import ConanOutdatedClient
 import os
 from conans.paths import PACKAGE_TGZ_NAME, CONANINFO, CONAN_MANIFEST, CONANFILE, EXPORT_TGZ_NAME
+from conans.paths import remove_stat_cache
 from cStringIO import StringIO
 import tarfile
-from conans.util.files import gzopen_without_timestamps
+import stat
+from conans.util.files import gzopen_without_timestamps, SpooledContents
+from conans.model.ref import ConanFileReference, PackageReference
+from multiprocessing.pool import ThreadPool
+from functools import partial
+import threading
+import time
 
 
 class RemoteManager(object):
     """ Will handle the remotes to get conans, packages etc """
 
-    def __init__(self, paths, remotes, remote_client, output):
+    def __init__(self, paths, remotes, remote_client, output, localdb=None):
         """
         remotes is a list of tuples of remotename: url EX: [('default', 'http://www.conans.com')]
-        client_factory: Factory for generate remote clients, can be replaced if needed for
-                        testing purpose or handle different adapter than rest.
-
+        remote_client: client whose for_remote(url) returns the client of each remote,
+                       can be replaced if needed for testing purpose or handle different
+                       adapter than rest.
+        localdb: LocalDB where the references not found in each remote and the
+                 connection failures of the remotes are stored, if given
         """
         self._paths = paths
         self._output = output
         self._remotes = remotes
         self._remote_client = remote_client
+        self._remote_clients = {}  # {remote name: client of that remote}
+        self._remote_clients_lock = threading.Lock()
+        self._localdb = localdb
+        self._compressed_cache = None
+        self._probes_pool = None  # Created the first time a reference is probed
+        self._probes_pool_lock = threading.Lock()
+
+    def close(self):
+        """ waits for the lookups still running in the remotes
+        """
+        with self._probes_pool_lock:
+            pool, self._probes_pool = self._probes_pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
 
     @property
     def remote_names(self):
@@ -48,21 +73,106 @@ class RemoteManager(object):
         basedir = self._paths.export(conan_reference)
         rel_files = self._paths.export_paths(conan_reference)
 
-        the_files = build_files_set(basedir, rel_files)
-        the_files = compress_export_files(the_files)
-        return self._call_without_remote_selection(remote,
-                                                   "upload_conan", conan_reference, the_files)
-
-    def upload_package(self, package_reference, remote=None):
-        """Will upload the package to the first remote"""
+        remote_snapshot = self._call_without_remote_selection(remote, "get_conan_snapshot",
+                                                              conan_reference)
+        self._remove_missing(conan_reference, remote)
+        valid_manifest = _valid_manifest(lambda: self._paths.valid_conan_digest(conan_reference))
+        if self._paths.is_partial_export(conan_reference):
+            manifest = load(os.path.join(basedir, CONAN_MANIFEST))
+            if valid_manifest and remote_snapshot.get(CONAN_MANIFEST) == md5(manifest):
+                return
+            # The sources are needed to upload it to other remote
+            self.get_export_sources(conan_reference)
+            rel_files = self._paths.export_paths(conan_reference)
+        if valid_manifest and is_up_to_date(basedir, rel_files, remote_snapshot,
+                                            EXPORT_TGZ_NAME, excluded=EXPORT_EXCLUDED,
+                                            compressed_md5=self._compressed_md5(
+                                                basedir, EXPORT_TGZ_NAME, "export")):
+            return
+        the_files = self._compress(basedir, rel_files, EXPORT_TGZ_NAME, EXPORT_EXCLUDED,
+                                   valid_manifest, "export")
+        try:
+            return self._call_without_remote_selection(remote, "upload_conan",
+                                                       conan_reference, the_files,
+                                                       remote_snapshot=remote_snapshot)
+        finally:
+            remove_spooled_files(the_files)
+
+    def upload_package(self, package_reference, remote=None, output=None):
+        """Will upload the package to the first remote
+        param output: where to report progress, by default the RemoteManager one"""
         basedir = self._paths.package(package_reference)
         rel_files = self._paths.package_paths(package_reference)
 
-        the_files = build_files_set(basedir, rel_files)
-        self._output.rewrite_line("Compressing package...")
-        the_files = compress_package_files(the_files)
-        return self._call_without_remote_selection(remote, "upload_package",
-                                                   package_reference, the_files)
+        output = output or self._output
+        remote_snapshot = self._call_without_remote_selection(remote, "get_package_snapshot",
+                                                              package_reference)
+        self._remove_missing(package_reference, remote)
+        valid_manifest = _valid_manifest(
+            lambda: self._paths.valid_package_digest(package_reference))
+        if valid_manifest and is_up_to_date(basedir, rel_files, remote_snapshot,
+                                            PACKAGE_TGZ_NAME, excluded=PACKAGE_EXCLUDED,
+                                            compressed_md5=self._compressed_md5(
+                                                basedir, PACKAGE_TGZ_NAME, "package")):
+            output.rewrite_line("Package is up to date.")
+            output.writeln("")
+            return
+        output.rewrite_line("Compressing package...")
+        the_files = self._compress(basedir, rel_files, PACKAGE_TGZ_NAME, PACKAGE_EXCLUDED,
+                                   valid_manifest, "package")
+        try:
+            return self._call_without_remote_selection(remote, "upload_package",
+                                                       package_reference, the_files,
+                                                       output=output,
+                                                       remote_snapshot=remote_snapshot)
+        finally:
+            remove_spooled_files(the_files)
+
+    @property
+    def compressed_cache(self):
+        if self._compressed_cache is None:
+            self._compressed_cache = CompressedCache(self._paths.compressed_cache,
+                                                     self._paths.conan_config.compressed_cache_size)
+        return self._compressed_cache
+
+    def _compress(self, basedir, rel_files, name, excluded, valid_manifest, operation):
+        """ Compresses the files, reusing the compressed file of a previous upload with
+        the same manifest. Only if the manifest matches the files, not to reuse an outdated
+        compressed file
+        param valid_manifest: if the manifest matches the files. If not, they are
+        compressed without the cache, and uploaded with the local manifest, so the
+        consumers detect the mismatch
+        param operation: "export" or "package", to get its compression settings
+        """
+        conan_config = self._paths.conan_config
+        compresslevel = conan_config.compression_level(operation)
+        threads = conan_config.compression_threads
+        if not valid_manifest:
+            return compress_folder_files(basedir, rel_files, name, excluded, compresslevel,
+                                         threads)
+
+        cache = self.compressed_cache
+        key = cache.key(load(os.path.join(basedir, CONAN_MANIFEST)), name, compresslevel)
+        cached = cache.get(key)
+        if cached is not None:
+            the_files = build_files_set(basedir, [e for e in excluded if e in rel_files])
+            the_files[name] = cached
+            return the_files
+
+        the_files = compress_folder_files(basedir, rel_files, name, excluded, compresslevel,
+                                          threads, spool=lambda: cache.spool(name))
+        the_files[name] = cache.store(key, the_files[name])
+        return the_files
+
+    def _compressed_md5(self, basedir, name, operation):
+        """ the md5 of the compressed file of the folder stored in the cache for its
+        manifest, or None if it's not there
+        """
+        compresslevel = self._paths.conan_config.compression_level(operation)
+        key = self.compressed_cache.key(load(os.path.join(basedir, CONAN_MANIFEST)), name,
+                                        compresslevel)
+        cached = self.compressed_cache.get(key)
+        return cached.md5 if cached is not None else None
 
     def get_conan_digest(self, conan_reference, remote=None):
         """
@@ -72,33 +182,110 @@ class RemoteManager(object):
         returns (ConanDigest, remote_name)"""
         return self._call_with_remote_selection(remote, "get_conan_digest", conan_reference)
 
-    def get_conanfile(self, conan_reference, remote=None):
+    def prefetch_metadata(self, conan_references, package_references, remote=None):
+        """
+        Requests in a single call per remote the metadata of the conanfiles and packages
+        that are going to be retrieved, so get_conanfile() and get_package() don't have
+        to request it for each one. Iterates the remotes like them unless remote was
+        specified, asking each one for the references not found in the previous ones.
+        Failures are ignored, the references are requested on their own then
+        """
+        pending = {str(reference): reference
+                   for reference in list(conan_references) + list(package_references)}
+        for remote_name in [remote] if remote else self.remote_names:
+            if not pending:
+                return
+            conan_refs = [ref for ref in pending.values() if isinstance(ref, ConanFileReference)]
+            package_refs = [ref for ref in pending.values() if isinstance(ref, PackageReference)]
+            try:
+                found = self._call_without_remote_selection(remote_name, "get_metadata",
+                                                            conan_refs, package_refs)
+            except ConanException as exc:
+                logger.debug("Metadata of remote %s not available: %s"
+                             % (remote_name, str(exc)))
+                continue
+            for key, value in (found or {}).iteritems():
+                if value:
+                    pending.pop(key, None)
+
+    def get_conanfile(self, conan_reference, remote=None, output=None):
         """
         Read the conans from remotes
         Will iterate the remotes to find the conans unless remote was specified
+        param output: where to report progress, by default the RemoteManager one
 
-        returns (dict relative_filepath:content , remote_name)"""
-        export_files = self._call_with_remote_selection(remote, "get_conanfile", conan_reference)
+        Only the conanfile and the manifest are downloaded, enough to resolve the graph.
+        The rest of the export is retrieved by get_export_sources() if it has to be built
+        """
+        output = output or self._output
         export_folder = self._paths.export(conan_reference)
-        uncompress_files(export_files, export_folder, EXPORT_TGZ_NAME)
-#       TODO: Download only the CONANFILE file and only download the rest of files
-#       in install if needed (not found remote package)
-
-    def get_package(self, package_reference, remote=None):
+        uncompress = partial(uncompress_files, folder=export_folder, name=EXPORT_TGZ_NAME)
+        self._call_with_remote_selection(remote, "get_conanfile", conan_reference,
+                                         output=output, part_prefix=export_folder,
+                                         files_subset=EXPORT_EXCLUDED,
+                                         consumer=uncompress)
+        partial_path = self._paths.export_partial(conan_reference)
+        try:
+            sources = [filename for filename in self._paths.load_digest(conan_reference).file_sums
+                       if filename != CONANFILE]
+        except IOError:  # Without manifest, it won't be valid anyway
+            sources = []
+        if sources:
+            save(partial_path, "")
+        elif os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    def get_export_sources(self, conan_reference, remote=None, output=None):
+        """
+        Completes an export retrieved by get_conanfile(), downloading the compressed
+        sources, if it was not done yet
+        param output: where to report progress, by default the RemoteManager one
+        """
+        if not self._paths.is_partial_export(conan_reference):
+            return
+        output = output or self._output
+        export_folder = self._paths.export(conan_reference)
+        uncompress = partial(uncompress_files, folder=export_folder, name=EXPORT_TGZ_NAME)
+        self._call_with_remote_selection(remote, "get_conanfile", conan_reference,
+                                         output=output, part_prefix=export_folder,
+                                         files_subset=[EXPORT_TGZ_NAME],
+                                         consumer=uncompress)
+        os.remove(self._paths.export_partial(conan_reference))
+        if not self._paths.valid_conan_digest(conan_reference):
+            raise ConanException("%s sources don't match its manifest" % str(conan_reference))
+
+    def get_package(self, package_reference, remote=None, output=None):
         """
         Read the conans package from remotes
         Will iterate the remotes to find the conans unless remote was specified
+        param output: where to report progress, by default the RemoteManager one
 
         returns (dict relative_filepath:content , remote_name)"""
-        package_files = self._call_with_remote_selection(remote, "get_package", package_reference)
-        uncompress_files(package_files, self._paths.package(package_reference), PACKAGE_TGZ_NAME)
-
-    def search(self, pattern=None, remote=None, ignorecase=True):
+        output = output or self._output
+        package_folder = self._paths.package(package_reference)
+        uncompress = partial(uncompress_files, folder=package_folder, name=PACKAGE_TGZ_NAME)
+        self._call_with_remote_selection(remote, "get_package", package_reference,
+                                         output=output, part_prefix=package_folder,
+                                         consumer=uncompress)
+
+    def search(self, pattern=None, remote=None, ignorecase=True, packages_query=None,
+               fields=None):
         """
         Search exported conans information from remotes
+        param packages_query: text of a PackageQuery of the packages to return
+        param fields: ConanInfo fields to retrieve, all if None
 
         returns (dict str(conan_ref): {packages_info}"""
-        return self._call_without_remote_selection(remote, "search", pattern, ignorecase)
+        return self._call_without_remote_selection(remote, "search", pattern, ignorecase,
+                                                   packages_query, fields)
+
+    def search_iter(self, pattern=None, remote=None, ignorecase=True, packages_query=None,
+                    fields=None):
+        """ Same as search, but returns a generator of the (ConanFileReference,
+        {package_id: ConanInfo}) as they are received from the remote, ordered by reference
+        """
+        return self._iter_without_remote_selection(remote, "search_iter", pattern, ignorecase,
+                                                   packages_query, fields)
 
     def remove(self, conan_ref, remote):
         """
@@ -122,74 +309,249 @@ class RemoteManager(object):
     def authenticate(self, remote, name, password):
         return self._call_without_remote_selection(remote, 'authenticate', name, password)
 
+    def _client(self, remote):
+        """ the client of the remote, created the first time it is used
+        """
+        with self._remote_clients_lock:
+            client = self._remote_clients.get(remote)
+            if client is None:
+                client = self._remote_client.for_remote(self.remote_url(remote))
+                self._remote_clients[remote] = client
+        return client
+
     def _call_without_remote_selection(self, remote, method, *argc, **argv):
 
         if not remote:
             remote = self.default_remote
 
-        self._remote_client.remote_url = self.remote_url(remote)
+        client = self._client(remote)
         try:
-            return getattr(self._remote_client, method)(*argc, **argv)
-        except ConnectionError as exc:
-            raise ConanConnectionError("Unable to connect to %s=%s"
-                                       % (remote, self._remote_client.remote_url))
-        except ConanException:
-            raise
+            return getattr(client, method)(*argc, **argv)
         except Exception as exc:
-            logger.error(traceback.format_exc())
-            raise ConanException(exc)
+            _raise_conan_exception(exc, remote, client.remote_url)
+
+    def _iter_without_remote_selection(self, remote, method, *argc, **argv):
+        """ as _call_without_remote_selection(), for the methods returning a generator
+        that keeps requesting the remote while it is consumed, with the same errors
+        """
+        remote = remote or self.default_remote
+        results = self._call_without_remote_selection(remote, method, *argc, **argv)
+        remote_url = self.remote_url(remote)
+        while True:
+            try:
+                item = next(results)
+            except StopIteration:
+                return
+            except Exception as exc:
+                _raise_conan_exception(exc, remote, remote_url)
+            yield item
 
     def _call_with_remote_selection(self, remote, method, *argc, **argv):
         """
-        Iterates in remotes until a response is found
+        Calls the method in the first remote, in the configured order, that has the
+        reference. For lookups, if the first remote doesn't have it, the rest of candidate
+        remotes are asked concurrently if they have it, so a reference in the last remote
+        doesn't wait for the misses of the previous ones, and the remotes where it was
+        recently not found are asked last. Remotes that failed to connect several times in
+        a row are skipped for a while
         """
         if remote:
             return self._call_without_remote_selection(remote, method, *argc, **argv)
-
-        for remote in self.remote_names:
+        if not self._remotes:
+            raise ConanException("No remote defined")
+
+        output = argv.get("output") or self._output
+        reference = argc[0]
+        lookup = method in LOOKUP_METHODS
+        remotes = self._lookup_remotes(reference) if lookup else self.remote_names
+        probes = {}
+        error = None
+        for index, remote in enumerate(remotes):
             logger.debug("Trying with remote %s" % self.remote_url(remote))
-            self._remote_client.remote_url = self.remote_url(remote)
+            probe = probes[remote].get() if remote in probes else None
             try:
+                if isinstance(probe, Exception):
+                    raise probe
+                if probe is False:
+                    raise NotFoundException("%s not found in remote %s"
+                                            % (str(reference), remote))
                 result = self._call_without_remote_selection(remote, method, *argc, **argv)
-                self._output.success("Found in remote '%s'" % remote)
-                return result
             # If exception continue with the next
             except (ConanOutdatedClient, ConanConnectionError) as exc:
-                self._output.warn(str(exc))
-                if remote == self._remotes[-1][0]:  # Last element not found
-                    raise ConanConnectionError("All remotes failed")
+                output.warn(str(exc))
+                self._remote_failed(remote)
+                error = ConanConnectionError("All remotes failed")
             except NotFoundException as exc:
-                if remote == self._remotes[-1][0]:  # Last element not found
-                    logger.debug("Not found in any remote, raising...%s" % exc)
-                    raise
-
-        raise ConanException("No remote defined")
-
-
-def compress_package_files(files):
-    return compress_files(files, PACKAGE_TGZ_NAME, excluded=(CONANINFO, CONAN_MANIFEST))
-
+                logger.debug("Not found in remote %s: %s" % (remote, exc))
+                if lookup:
+                    self._set_missing(reference, remote)
+                self._remote_succeeded(remote)
+                error = exc
+            else:
+                self._remote_succeeded(remote)
+                output.success("Found in remote '%s'" % remote)
+                return result
+            if lookup and index == 0 and len(remotes) > 2:
+                probes = self._probe(remotes[1:], reference)
+        raise error
+
+    def _probe(self, remotes, reference):
+        """ asks all the remotes concurrently if they have the reference
+        returns {remote: AsyncResult}, whose result is True or False, the ConanException
+        of a failed connection, or None if it couldn't be determined
+        """
+        def probe(remote):
+            try:
+                return self._call_without_remote_selection(remote, "exists", reference)
+            except (ConanOutdatedClient, ConanConnectionError) as exc:
+                return exc
+            except Exception as exc:  # Authentication is only requested from the main thread
+                logger.debug("Lookup of %s in remote %s failed: %s" % (str(reference), remote,
+                                                                     str(exc)))
+                return None
+
+        with self._probes_pool_lock:
+            if self._probes_pool is None:
+                self._probes_pool = ThreadPool(PROBE_THREADS)
+            pool = self._probes_pool
+        # The ones not needed finish on their own, close() waits for them
+        return {remote: pool.apply_async(probe, (remote, )) for remote in remotes}
+
+    def _lookup_remotes(self, reference):
+        """ the remotes where the reference could be, in the configured order, but the
+        ones where it was recently not found last. They are not skipped, it could have been
+        uploaded since then by another client
+        """
+        remotes = self.remote_names
+        if self._localdb is None:
+            return remotes
+        conan_config = self._paths.conan_config
+        if self._missing_ttl and len(remotes) > 1:
+            misses = self._localdb.get_remote_misses(str(reference), self._missing_ttl)
+            remotes = ([remote for remote in remotes if self._remote_key(remote) not in misses] +
+                       [remote for remote in remotes if self._remote_key(remote) in misses])
+        max_failures = conan_config.remote_lookup("max_failures")
+        retry_after = conan_config.remote_lookup("retry_after")
+        available = []
+        for remote in remotes:
+            failures, last_time = self._localdb.get_remote_failures(self._remote_key(remote))
+            if (max_failures and failures >= max_failures and
+                    time.time() - last_time < retry_after):
+                logger.debug("Skipping remote %s, it failed %d times" % (remote, failures))
+            else:
+                available.append(remote)
+        # If none of them is available, they are tried anyway
+        return available or remotes
 
-def compress_export_files(files):
-    return compress_files(files, EXPORT_TGZ_NAME, excluded=(CONANFILE, CONAN_MANIFEST))
+    @property
+    def _missing_ttl(self):
+        return self._paths.conan_config.remote_lookup("missing_ttl")
 
+    def _set_missing(self, reference, remote):
+        if self._localdb is not None and self._missing_ttl:
+            self._localdb.set_remote_miss(str(reference), self._remote_key(remote))
 
-def compress_files(files, name, excluded):
+    def _remove_missing(self, reference, remote):
+        """ the reference is going to be in the remote, uploaded
+        """
+        if self._localdb is not None:
+            remote_key = self._remote_key(remote or self.default_remote)
+            self._localdb.remove_remote_miss(str(reference), remote_key)
+
+    def _remote_failed(self, remote):
+        if self._localdb is not None:
+            remote_key = self._remote_key(remote)
+            failures, _ = self._localdb.get_remote_failures(remote_key)
+            self._localdb.set_remote_failures(remote_key, failures + 1)
+
+    def _remote_succeeded(self, remote):
+        if self._localdb is not None:
+            remote_key = self._remote_key(remote)
+            failures, _ = self._localdb.get_remote_failures(remote_key)
+            if failures:
+                self._localdb.set_remote_failures(remote_key, 0)
+
+    def _remote_key(self, remote):
+        """ the remotes are stored in the LocalDB by url, the same name could be
+        used for other remote later
+        """
+        return str(self.remote_url(remote))
+
+def _raise_conan_exception(exc, remote, remote_url):
+    """ raises the ConanException of the exception being handled, raised by the client
+    of the remote
+    """
+    if isinstance(exc, (ConnectionError, ChunkedEncodingError)):
+        raise ConanConnectionError("Unable to connect to %s=%s" % (remote, remote_url))
+    if isinstance(exc, RetryError):  # Temporary errors of the remote, already retried
+        raise ConanConnectionError("Remote %s=%s unavailable: %s"
+                                   % (remote, remote_url, str(exc)))
+    if isinstance(exc, ConanException):
+        raise
+    logger.error(traceback.format_exc())
+    raise ConanException(exc)
+
+
+# Methods that look up a reference, done concurrently in the remotes
+LOOKUP_METHODS = ("get_conan_digest", "get_conanfile", "get_package")
+# Concurrent lookups of the references in the remotes
+PROBE_THREADS = 8
+COMPRESSLEVEL = 9
+PACKAGE_EXCLUDED = (CONANINFO, CONAN_MANIFEST)
+EXPORT_EXCLUDED = (CONANFILE, CONAN_MANIFEST)
+
+
+def compress_package_files(basedir, rel_files):
+    return compress_folder_files(basedir, rel_files, PACKAGE_TGZ_NAME, PACKAGE_EXCLUDED)
+
+
+def compress_export_files(basedir, rel_files):
+    return compress_folder_files(basedir, rel_files, EXPORT_TGZ_NAME, EXPORT_EXCLUDED)
+
+
+def _valid_manifest(valid_digest):
+    """ param valid_digest: function that checks if the manifest matches the files
+    """
+    try:
+        return valid_digest()
+    except (ValueError, IOError, ConanException) as e:  # Missing or malformed manifest
+        logger.debug("Invalid manifest: %s" % str(e))
+        return False
+
+
+def is_up_to_date(basedir, rel_files, remote_snapshot, name, excluded, compressed_md5=None):
+    """ Checks, before compressing anything, if the remote files are the same as the
+    local ones. The manifest has the md5 of all the files, so the same manifest and
+    uncompressed files mean the same contents. Only valid if the local manifest matches
+    the files of the folder, checked by the caller. The manifest is uploaded the last one,
+    so if it exists the compressed file was uploaded completely too
+    param compressed_md5: md5 of the compressed file of the local files, if known. The
+    remote one could have been uploaded with other files, that didn't match the manifest
+    """
+    if CONAN_MANIFEST not in rel_files:
+        return False
+    local_files = build_files_set(basedir, [e for e in excluded if e in rel_files])
+    if any(remote_snapshot.get(filename) != md5(content)
+           for filename, content in local_files.iteritems()):
+        return False
+    compressed = any(f not in excluded for f in rel_files)
+    if compressed and compressed_md5 is not None and \
+            remote_snapshot.get(name) != compressed_md5:
+        return False
+    return compressed == (name in remote_snapshot)
+
+
+def compress_files(files, name, excluded, compresslevel=COMPRESSLEVEL, threads=1):
     """Compress the package and returns the new dict (name => content) of files,
     only with the conanXX files and the compressed file"""
 
     tgz_contents = StringIO()
-    tgz = gzopen_without_timestamps(name, mode="w", fileobj=tgz_contents)
+    tgz = gzopen_without_timestamps(name, mode="w", fileobj=tgz_contents,
+                                    compresslevel=compresslevel, threads=threads)
 
-    def addfile(name, contents, tar):
-        info = tarfile.TarInfo(name=name)
-        string = StringIO(contents)
-        info.size = len(contents)
-        tar.addfile(tarinfo=info, fileobj=string)
-
-    for the_file, content in files.iteritems():
+    for the_file, content in sorted(files.iteritems()):
         if the_file not in excluded:
-            addfile(the_file, content, tgz)
+            _add_tgz_member(tgz, the_file, StringIO(content), len(content))
 
     tgz.close()
     ret = {}
@@ -201,10 +563,86 @@ def compress_files(files, name, excluded):
     return ret
 
 
+def compress_folder_files(basedir, rel_files, name, excluded, compresslevel=COMPRESSLEVEL,
+                          threads=1, spool=None):
+    """Same as compress_files, but the files are read from basedir while compressed,
+    and the compressed file is written to a SpooledContents, so the memory used doesn't
+    depend on the size of the files. The returned SpooledContents has to be removed
+    param spool: function returning the SpooledContents to write to, a temporary one
+    by default"""
+
+    tgz_contents = spool() if spool else SpooledContents(suffix=name)
+    try:
+        tgz = gzopen_without_timestamps(name, mode="w", fileobj=tgz_contents,
+                                        compresslevel=compresslevel, threads=threads)
+        for the_file in sorted(rel_files):
+            if the_file not in excluded:
+                abs_path = os.path.join(basedir, the_file)
+                mode = 0755 if os.stat(abs_path).st_mode & stat.S_IXUSR else 0644
+                with open(abs_path, "rb") as handle:
+                    _add_tgz_member(tgz, the_file, handle, os.path.getsize(abs_path), mode)
+        tgz.close()
+        tgz_contents.close()
+    except:
+        tgz_contents.close()
+        tgz_contents.remove()
+        raise
+
+    ret = build_files_set(basedir, [e for e in excluded if e in rel_files])
+    ret[name] = tgz_contents
+    return ret
+
+
+def remove_spooled_files(files):
+    for content in files.itervalues():
+        if isinstance(content, SpooledContents):
+            content.remove()
+
+
+def _add_tgz_member(tgz, name, fileobj, size, mode=0644):
+    """ members are added with normalized metadata, for the same contents to give the
+    same md5 regardless of the machine, user or time they were compressed
+    """
+    info = tarfile.TarInfo(name=name)
+    info.size = size
+    info.mode = mode
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    tgz.addfile(tarinfo=info, fileobj=fileobj)
+
+
 def uncompress_files(files, folder, name):
-    for file_name, content in files:
-        if os.path.basename(file_name) != name:
-            save(os.path.join(folder, file_name), content)
-        else:
-            #  Unzip the file
-            tar_extract(StringIO(content), folder)
+    """ param files: iterable of (filename, chunks), the compressed one is extracted while
+    its chunks are consumed, the rest are written as they arrive. If anything fails,
+    the folder is removed, not to leave an incomplete one
+    """
+    try:
+        for file_name, chunks in files:
+            if os.path.basename(file_name) != name:
+                save_chunks(os.path.join(folder, file_name), chunks)
+            else:
+                #  Unzip the file
+                stream = ChunksFileAdapter(chunks)
+                tar_extract(stream, folder, streaming=True)
+                stream.drain()
+    except Exception:
+        rmdir(folder)
+        remove_stat_cache(folder)
+        raise
+
+
+class ChunksFileAdapter(object):
+    """ read-only file-like object over an iterable of chunks
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def read(self, size=-1):  # @UnusedVariable
+        return next(self._chunks, b'')
+
+    def drain(self):
+        """ consumes the remaining chunks, as the tar padding, so the iterable completes
+        """
+        for _ in self._chunks:
+            pass
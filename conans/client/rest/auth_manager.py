@@ -18,6 +18,7 @@ from conans.errors import AuthenticationException, ForbiddenException,\
 from uuid import getnode as get_mac
 import hashlib
 from conans.util.log import logger
+import threading
 
 
 def input_credentials_if_unauthorized(func):
@@ -26,12 +27,18 @@ def input_credentials_if_unauthorized(func):
     LOGIN_RETRIES = 3
 
     def wrapper(self, *args, **kwargs):
+        # The token could have been refreshed by the manager of another remote
+        self.load_login()
         try:
             # Set custom headers of mac_digest and username
             self.set_custom_headers(self.user)
             ret = func(self, *args, **kwargs)
             return ret
         except ForbiddenException as e:
+            if not _is_main_thread():
+                # Concurrent calls cannot ask the user, the caller has to retry from
+                # the main thread
+                raise
             # User valid but not enough permissions
             if self.user is None or self.rest_client.token is None:
                 # token is None when you change user with user command
@@ -46,6 +53,8 @@ def input_credentials_if_unauthorized(func):
                 # log with other user
                 raise e
         except AuthenticationException:
+            if not _is_main_thread():
+                raise
             # Token expired or not valid, so clean the token and repeat the call
             # (will be anonymous call but exporting who is calling)
             self._store_login((self.user, None))
@@ -84,21 +93,31 @@ def input_credentials_if_unauthorized(func):
     return wrapper
 
 
+def _is_main_thread():
+    return threading.current_thread().name == "MainThread"
+
+
 class ConanApiAuthManager(object):
 
     def __init__(self, rest_client, user_io, localdb):
         self.user_io = user_io
         self.rest_client = rest_client
         self.localdb = localdb
-        self.user, self.rest_client.token = localdb.get_login()
+        self.load_login()
 
     @property
     def remote_url(self):
         return self.rest_client.remote_url
 
-    @remote_url.setter
-    def remote_url(self, url):
-        self.rest_client.remote_url = url
+    def load_login(self):
+        """reads the user and token from the localdb, shared by the managers of all the
+        remotes"""
+        self.user, self.rest_client.token = self.localdb.get_login()
+
+    def for_remote(self, remote_url):
+        """returns a new manager of the given remote, with its own RestApiClient"""
+        return ConanApiAuthManager(self.rest_client.for_remote(remote_url), self.user_io,
+                                   self.localdb)
 
     def _store_login(self, login):
         try:
@@ -124,28 +143,51 @@ class ConanApiAuthManager(object):
     # ######### CONAN API METHODS ##########
 
     @input_credentials_if_unauthorized
-    def upload_conan(self, conan_reference, the_files):
-        return self.rest_client.upload_conan(conan_reference, the_files)
+    def upload_conan(self, conan_reference, the_files, remote_snapshot=None):
+        return self.rest_client.upload_conan(conan_reference, the_files, remote_snapshot)
+
+    @input_credentials_if_unauthorized
+    def upload_package(self, package_reference, the_files, output=None, remote_snapshot=None):
+        return self.rest_client.upload_package(package_reference, the_files, output,
+                                               remote_snapshot)
+
+    @input_credentials_if_unauthorized
+    def get_conan_snapshot(self, conan_reference):
+        return self.rest_client.get_conan_snapshot(conan_reference)
 
     @input_credentials_if_unauthorized
-    def upload_package(self, package_reference, the_files):
-        return self.rest_client.upload_package(package_reference, the_files)
+    def get_package_snapshot(self, package_reference):
+        return self.rest_client.get_package_snapshot(package_reference)
+
+    @input_credentials_if_unauthorized
+    def exists(self, reference):
+        return self.rest_client.exists(reference)
+
+    @input_credentials_if_unauthorized
+    def get_metadata(self, conan_references, package_references):
+        return self.rest_client.get_metadata(conan_references, package_references)
 
     @input_credentials_if_unauthorized
     def get_conan_digest(self, conan_reference):
         return self.rest_client.get_conan_digest(conan_reference)
 
     @input_credentials_if_unauthorized
-    def get_conanfile(self, conan_reference):
-        return self.rest_client.get_conanfile(conan_reference)
+    def get_conanfile(self, conan_reference, output=None, part_prefix=None, files_subset=None,
+                      consumer=None):
+        return self.rest_client.get_conanfile(conan_reference, output, part_prefix,
+                                              files_subset, consumer)
+
+    @input_credentials_if_unauthorized
+    def get_package(self, package_reference, output=None, part_prefix=None, consumer=None):
+        return self.rest_client.get_package(package_reference, output, part_prefix, consumer)
 
     @input_credentials_if_unauthorized
-    def get_package(self, package_reference):
-        return self.rest_client.get_package(package_reference)
+    def search(self, pattern, ignorecase, packages_query=None, fields=None):
+        return self.rest_client.search(pattern, ignorecase, packages_query, fields)
 
     @input_credentials_if_unauthorized
-    def search(self, pattern, ignorecase):
-        return self.rest_client.search(pattern, ignorecase)
+    def search_iter(self, pattern, ignorecase, packages_query=None, fields=None):
+        return self.rest_client.search_iter(pattern, ignorecase, packages_query, fields)
 
     @input_credentials_if_unauthorized
     def remove(self, conan_refernce):
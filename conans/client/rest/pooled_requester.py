@@ -0,0 +1,67 @@
+""" HTTP transport with a pool of kept alive connections for each remote host, so the
+many requests of an install or upload don't open a new TCP connection and negotiate TLS
+again each time. Safe to use from several threads
+"""
+import threading
+import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+
+# Requests without a body that can be repeated safely. Uploads are not retried here,
+# their body is a stream that cannot be sent again
+IDEMPOTENT_METHODS = frozenset(["HEAD", "GET", "OPTIONS", "DELETE"])
+RETRY_STATUS = frozenset([502, 503, 504])
+BACKOFF_FACTOR = 0.5
+
+
+class PooledRequester(object):
+    """ requests-like object with one requests.Session for each remote host, whose
+    HTTPAdapter keeps up to pool_size connections alive. Failed connections and
+    temporary errors of the idempotent requests are retried up to retries times,
+    waiting 0.5, 1, 2... seconds
+    """
+    def __init__(self, proxies=None, pool_size=10, retries=3):
+        self._proxies = proxies
+        self._pool_size = pool_size
+        self._retries = retries
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, url):
+        scheme, netloc = urlparse.urlsplit(url)[:2]
+        with self._lock:
+            session = self._sessions.get((scheme, netloc))
+            if session is None:
+                session = requests.Session()
+                if self._proxies is not None:
+                    session.proxies = self._proxies
+                retries = Retry(total=self._retries, method_whitelist=IDEMPOTENT_METHODS,
+                                status_forcelist=RETRY_STATUS, backoff_factor=BACKOFF_FACTOR)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size,
+                                      max_retries=retries)
+                session.mount("%s://" % scheme, adapter)
+                self._sessions[(scheme, netloc)] = session
+        return session
+
+    def get(self, url, **kwargs):
+        return self._session(url).get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self._session(url).head(url, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self._session(url).put(url, data=data, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self._session(url).post(url, data=data, json=json, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._session(url).delete(url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
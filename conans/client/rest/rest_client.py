@@ -2,15 +2,22 @@ from conans.errors import EXCEPTION_CODE_MAPPING, NotFoundException,\
     ConanException
 from requests.auth import AuthBase, HTTPBasicAuth
 from conans.util.log import logger
-from conans.info import SearchInfo
+from conans.info import SearchInfo, NDJSON_CONTENT_TYPE, deserialize_packages
 import json
 from conans.paths import CONANFILE, CONAN_MANIFEST
 import time
 from conans.client.rest.differ import diff_snapshots
-from conans.util.files import md5
+from conans.util.files import contents_md5
 import os
 from conans.model.manifest import FileTreeManifest
+from conans.model.ref import ConanFileReference, PackageReference
 from conans.client.rest.uploader_downloader import Uploader, Downloader
+import hashlib
+import urllib
+
+
+# Conanfiles requested in each page of the searches
+SEARCH_PAGE_SIZE = 100
 
 
 def handle_return_deserializer(deserializer=None):
@@ -56,6 +63,10 @@ class JWTAuth(AuthBase):
         return request
 
 
+# The signed download urls of conan_server expire in 30 minutes by default
+METADATA_TTL = 600
+
+
 class RestApiClient(object):
     """
         Rest Api Client for handle remote.
@@ -65,14 +76,26 @@ class RestApiClient(object):
     # It should not be necessary anymore the own conan.io certificate (fixed in server)
     VERIFY_SSL = cacert.file_path
 
-    def __init__(self, output, requester):
+    def __init__(self, output, requester, remote_url=None):
         # Set to instance
         self.token = None
-        self.remote_url = None
+        self._remote_url = remote_url
         self.custom_headers = {}  # Can set custom headers to each request
+        self._metadata = {}  # {str(reference): (time, metadata)}
         self._output = output
         self.requester = requester
 
+    def for_remote(self, remote_url):
+        """returns a new client of the given remote, sharing the requester and its
+        connections. Each remote has its own client, so they can be used concurrently"""
+        client = RestApiClient(self._output, self.requester, remote_url)
+        client.token = self.token
+        return client
+
+    @property
+    def remote_url(self):
+        return self._remote_url
+
     @property
     def auth(self):
         return JWTAuth(self.token)
@@ -89,49 +112,116 @@ class RestApiClient(object):
         contents = dict(contents)  # Unroll generator
         return FileTreeManifest.loads(contents[CONAN_MANIFEST])
 
-    def get_conanfile(self, conan_reference):
-        """Gets a dict of filename:contents from conans"""
-        # Get the conanfile snapshot first
-        url = "%s/conans/%s/download_urls" % (self._remote_api_url, "/".join(conan_reference))
-        urls = self._get_json(url)
+    def get_conanfile(self, conan_reference, output=None, part_prefix=None, files_subset=None,
+                      consumer=None):
+        """Gets a generator of (filename, chunks) from conans
+        part_prefix: prefix of the files where the partial downloads are kept
+        files_subset: if given, only these files are downloaded
+        consumer: if given, function called with the generator, whose result is returned,
+                  so the download fails inside this call"""
+        urls, snapshot = self._cached_metadata(conan_reference, "Conan '%s' not found!"
+                                               % str(conan_reference))
+        if urls is None:
+            url = "%s/conans/%s/download_urls" % (self._remote_api_url,
+                                                  "/".join(conan_reference))
+            urls = self._get_json(url)
 
         if CONANFILE not in urls.keys():
             raise NotFoundException("Conan '%s' doesn't have a %s!" % (conan_reference, CONANFILE))
+        if files_subset is not None:
+            urls = {filename: url for filename, url in urls.iteritems()
+                    if filename in files_subset}
 
         # TODO: Get fist an snapshot and compare files and download only required?
+        if snapshot is None:
+            snapshot = self.get_conan_snapshot(conan_reference)
 
         # Download the resources
-        contents = self.download_files(urls, self._output)
-        return contents
-
-    def get_package(self, package_reference):
-        """Gets a dict of filename:contents from package"""
-        url = "%s/conans/%s/packages/%s/download_urls" % (self._remote_api_url,
-                                                          "/".join(package_reference.conan),
-                                                          package_reference.package_id)
-        urls = self._get_json(url)
+        contents = self.stream_files(urls, snapshot, output or self._output, part_prefix)
+        return consumer(contents) if consumer else contents
+
+    def get_package(self, package_reference, output=None, part_prefix=None, consumer=None):
+        """Gets a generator of (filename, chunks) from package
+        part_prefix: prefix of the files where the partial downloads are kept
+        consumer: as the one of get_conanfile()"""
+        urls, snapshot = self._cached_metadata(package_reference, "Package not found!")
+        if urls is None:
+            url = "%s/conans/%s/packages/%s/download_urls" % (self._remote_api_url,
+                                                              "/".join(package_reference.conan),
+                                                              package_reference.package_id)
+            urls = self._get_json(url)
         if not urls:
             raise NotFoundException("Package not found!")
         # TODO: Get fist an snapshot and compare files and download only required?
+        if snapshot is None:
+            snapshot = self.get_package_snapshot(package_reference)
 
         # Download the resources
-        contents = self.download_files(urls, self._output)
-        return contents
-
-    def upload_conan(self, conan_reference, the_files):
+        contents = self.stream_files(urls, snapshot, output or self._output, part_prefix)
+        return consumer(contents) if consumer else contents
+
+    def get_metadata(self, conan_references, package_references):
+        """Requests in a single call the snapshots and download urls of several
+        conanfiles and packages, kept for get_conanfile() and get_package() during
+        METADATA_TTL seconds.
+        returns {str(reference): found} or None if the remote doesn't support it"""
+        url = "%s/conans/metadata" % self._remote_api_url
+        data = {"conans": [str(reference) for reference in conan_references],
+                "packages": [str(reference) for reference in package_references]}
+        try:
+            metadata = self._get_json(url, data=data)
+        except NotFoundException:  # Older remote, each reference is requested on its own
+            return None
+        now = time.time()
+        for key, value in metadata.iteritems():
+            self._metadata[key] = (now, value)
+        return {key: value is not None for key, value in metadata.iteritems()}
+
+    def _cached_metadata(self, reference, not_found_message):
+        """returns the (urls, snapshot) of the reference from get_metadata(), or
+        (None, None) if they are not available. Raises NotFoundException if the remote
+        answered that the reference doesn't exist"""
+        entry = self._metadata.get(str(reference))
+        if entry is None or time.time() - entry[0] > METADATA_TTL:
+            return None, None
+        metadata = entry[1]
+        if metadata is None:
+            raise NotFoundException(not_found_message)
+        snapshot = {os.path.normpath(filename): the_md5
+                    for filename, the_md5 in metadata["snapshot"].iteritems()}
+        return metadata["urls"], snapshot
+
+    def exists(self, reference):
+        """Checks if the remote has the conanfile or package, without downloading it"""
+        try:
+            urls, _ = self._cached_metadata(reference, "")
+        except NotFoundException:
+            return False
+        if urls is not None:
+            return True
+        if isinstance(reference, PackageReference):
+            return bool(self.get_package_snapshot(reference))
+        return bool(self.get_conan_snapshot(reference))
+
+    def upload_conan(self, conan_reference, the_files, remote_snapshot=None):
         """
         the_files: dict with relative_path: content
+        remote_snapshot: the one already requested, if any
         """
         self.check_credentials()
 
         # Get the remote snapshot
-        remote_snapshot = self._get_conan_snapshot(conan_reference)
-        local_snapshot = {filename: md5(content) for filename, content in the_files.iteritems()}
+        if remote_snapshot is None:
+            remote_snapshot = self.get_conan_snapshot(conan_reference)
+        local_snapshot = {filename: contents_md5(content) for filename, content in the_files.iteritems()}
 
         # Get the diff
         new, modified, deleted = diff_snapshots(local_snapshot, remote_snapshot)
 
         files_to_upload = {filename.replace("\\", "/"): the_files[filename] for filename in new + modified}
+        if files_to_upload:
+            url = "%s/conans/%s/link_blobs" % (self._remote_api_url, "/".join(conan_reference))
+            self._link_blobs(url, files_to_upload, self._output)
         if files_to_upload:
             # Get the upload urls
             url = "%s/conans/%s/upload_urls" % (self._remote_api_url, "/".join(conan_reference))
@@ -141,37 +231,65 @@ class RestApiClient(object):
         if deleted:
             self.remove_conanfile_files(conan_reference, deleted)
 
-    def upload_package(self, package_reference, the_files):
+    def upload_package(self, package_reference, the_files, output=None, remote_snapshot=None):
         """
         basedir: Base directory with the files to upload (for read the files in disk)
         relative_files: relative paths to upload
+        output: where to report progress, by default the client one
+        remote_snapshot: the one already requested, if any
         """
         self.check_credentials()
+        output = output or self._output
 
         # Get the remote snapshot
-        remote_snapshot = self._get_package_snapshot(package_reference)
-        local_snapshot = {filename: md5(content) for filename, content in the_files.iteritems()}
+        if remote_snapshot is None:
+            remote_snapshot = self.get_package_snapshot(package_reference)
+        local_snapshot = {filename: contents_md5(content) for filename, content in the_files.iteritems()}
 
         # Get the diff
         new, modified, deleted = diff_snapshots(local_snapshot, remote_snapshot)
 
         files_to_upload = {filename: the_files[filename] for filename in new + modified}
+        if files_to_upload:
+            url = "%s/conans/%s/packages/%s/link_blobs" % (self._remote_api_url,
+                                                           "/".join(package_reference.conan),
+                                                           package_reference.package_id)
+            self._link_blobs(url, files_to_upload, output)
         if files_to_upload:        # Obtain upload urls
             url = "%s/conans/%s/packages/%s/upload_urls" % (self._remote_api_url,
                                                             "/".join(package_reference.conan),
                                                             package_reference.package_id)
             filesizes = {filename: len(content) for filename, content in files_to_upload.iteritems()}
-            self._output.rewrite_line("Requesting upload permissions...")
+            output.rewrite_line("Requesting upload permissions...")
             urls = self._get_json(url, data=filesizes)
-            self._output.rewrite_line("Requesting upload permissions...Done!")
-            self._output.writeln("")
-            self.upload_files(urls, files_to_upload, self._output)
+            output.rewrite_line("Requesting upload permissions...Done!")
+            output.writeln("")
+            self.upload_files(urls, files_to_upload, output)
         else:
-            self._output.rewrite_line("Package is up to date.")
-            self._output.writeln("")
+            output.rewrite_line("Package is up to date.")
+            output.writeln("")
         if deleted:
             self.remove_package_files(package_reference, deleted)
 
+    def _link_blobs(self, url, files_to_upload, output):
+        """Asks the remote to link the files it already stores with the same contents,
+        like the same binary uploaded to other channel, which are removed from
+        files_to_upload. The manifest is always uploaded, the last one"""
+        names = {filename.replace("\\", "/"): filename for filename in files_to_upload
+                 if filename != CONAN_MANIFEST}
+        if not names:
+            return
+        files_md5s = {name: contents_md5(files_to_upload[filename])
+                      for name, filename in names.iteritems()}
+        try:
+            linked = self._get_json(url, data=files_md5s)
+        except NotFoundException:  # Remote without content addressed storage
+            return
+        for name, the_md5 in linked.iteritems():
+            if name in names and files_md5s[name] == the_md5:
+                files_to_upload.pop(names[name])
+                output.writeln("Already in the remote, not uploaded: %s" % name)
+
     @handle_return_deserializer()
     def authenticate(self, user, password):
         '''Sends user + password to get a token'''
@@ -190,24 +308,68 @@ class RestApiClient(object):
                                  verify=self.VERIFY_SSL)
         return ret
 
-    @handle_return_deserializer(SearchInfo.deserialize)
-    def search(self, pattern=None, ignorecase=True):
+    def search(self, pattern=None, ignorecase=True, packages_query=None, fields=None):
         """
-        the_files: dict with relative_path: content
+        packages_query: text of a PackageQuery, evaluated by the remote
+        fields: list of the ConanInfo fields to receive, all if None
         """
-        query = ''
+        return SearchInfo(self.search_iter(pattern, ignorecase, packages_query, fields))
+
+    def search_iter(self, pattern=None, ignorecase=True, packages_query=None, fields=None,
+                    page_size=None):
+        """ Same as search, but returns a generator of the (ConanFileReference,
+        {package_id: ConanInfo}) as they are received, ordered by str(reference). They are
+        requested in pages of page_size conanfiles, each one streamed as JSON lines.
+        The first page is requested here, so its errors are raised by this call
+        """
+        params = []
         if pattern:
-            case_sensitive = "&ignorecase=False" if not ignorecase else ''
-            pattern = "q=%s" % pattern
-            query = "?%s%s" % (pattern, case_sensitive)
-
-        url = "%s/conans/search%s" % (self._remote_api_url, query)
+            params.append(("q", pattern))
+            if not ignorecase:
+                params.append(("ignorecase", "False"))
+        if packages_query:
+            params.append(("packages_query", packages_query))
+        if fields:
+            params.append(("fields", ",".join(fields)))
+        params.append(("limit", page_size or SEARCH_PAGE_SIZE))
+        response = self._search_page(params)
+        return self._search_results(response, params)
+
+    def _search_page(self, params, cursor=None):
+        if cursor:
+            params = params + [("cursor", cursor)]
+        url = "%s/conans/search?%s" % (self._remote_api_url, urllib.urlencode(params))
+        headers = dict(self.custom_headers)
+        headers["Accept"] = NDJSON_CONTENT_TYPE
         response = self.requester.get(url,
                                       auth=self.auth,
-                                      headers=self.custom_headers,
-                                      verify=self.VERIFY_SSL)
+                                      headers=headers,
+                                      verify=self.VERIFY_SSL,
+                                      stream=True)
+        if response.status_code != 200:
+            raise get_exception_from_error(response.status_code)(response.content)
         return response
 
+    def _search_results(self, response, params):
+        while response is not None:
+            if NDJSON_CONTENT_TYPE not in response.headers.get("Content-Type", ""):
+                # Servers without streamed searches return everything in a JSON document
+                for item in sorted(SearchInfo.deserialize(response.content).iteritems(),
+                                   key=lambda item: str(item[0])):
+                    yield item
+                return
+            next_cursor = None
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if "next_cursor" in data:
+                    next_cursor = data["next_cursor"]
+                else:
+                    yield (ConanFileReference.loads(data["reference"]),
+                           deserialize_packages(data["packages"]))
+            response = self._search_page(params, next_cursor) if next_cursor else None
+
     @handle_return_deserializer()
     def remove_conanfile(self, conan_reference):
         """ Remove any conans
@@ -263,7 +425,8 @@ class RestApiClient(object):
                                        json=payload)
         return response
 
-    def _get_conan_snapshot(self, reference):
+    def get_conan_snapshot(self, reference):
+        """Gets a dict of {filename: md5} of the remote export, empty if it doesn't exist"""
         url = "%s/conans/%s" % (self._remote_api_url, '/'.join(reference))
         try:
             snapshot = self._get_json(url)
@@ -273,7 +436,8 @@ class RestApiClient(object):
                          for filename, the_md5 in snapshot.iteritems()}
         return norm_snapshot
 
-    def _get_package_snapshot(self, package_reference):
+    def get_package_snapshot(self, package_reference):
+        """Gets a dict of {filename: md5} of the remote package, empty if it doesn't exist"""
         url = "%s/conans/%s/packages/%s" % (self._remote_api_url,
                                             "/".join(package_reference.conan),
                                             package_reference.package_id)
@@ -319,11 +483,47 @@ class RestApiClient(object):
             output.writeln("")
             yield os.path.normpath(filename), contents
 
+    def stream_files(self, file_urls, snapshot, output, part_prefix=None):
+        """
+        :param: file_urls is a dict with {filename: url}
+        :param: snapshot is a dict with {filename: md5} of the remote files
+        :param: part_prefix, if given, the contents are also written to
+                <part_prefix>.<filename>.part until each file completes, so an
+                interrupted download can be resumed later
+
+        Its a generator of (filename, chunks), being chunks a generator too, of the
+        contents as they are downloaded. Each file has to be consumed before the next one.
+        When the chunks of a file are exhausted, their md5 is checked against the snapshot
+        """
+        downloader = Downloader(self.requester, output, self.VERIFY_SSL)
+        for filename, resource_url in file_urls.iteritems():
+            output.writeln("Downloading %s" % filename)
+            filename = os.path.normpath(filename)
+            part_path = None
+            if part_prefix is not None:
+                part_path = "%s.%s.part" % (part_prefix, os.path.basename(filename))
+            chunks = downloader.iter_download(resource_url, part_path=part_path)
+            yield filename, self._checked_chunks(chunks, filename, snapshot.get(filename),
+                                                 output)
+
+    @staticmethod
+    def _checked_chunks(chunks, filename, expected_md5, output):
+        checksum = hashlib.md5()
+        for chunk in chunks:
+            checksum.update(chunk)
+            yield chunk
+        output.writeln("")
+        if expected_md5 is not None and checksum.hexdigest() != expected_md5:
+            raise ConanException("Bad md5 of downloaded file %s: %s, expected %s"
+                                 % (filename, checksum.hexdigest(), expected_md5))
+
     def upload_files(self, file_urls, files, output):
         t1 = time.time()
         failed = {}
         uploader = Uploader(self.requester, output, self.VERIFY_SSL)
-        for filename, resource_url in file_urls.iteritems():
+        # The manifest goes last, so a remote manifest guarantees the rest of files are there
+        for filename, resource_url in sorted(file_urls.iteritems(),
+                                             key=lambda item: item[0] == CONAN_MANIFEST):
             output.rewrite_line("Uploading %s" % filename)
             response = uploader.post(resource_url, files[filename])
             output.writeln("")
@@ -1,21 +1,36 @@
-from conans.errors import ConanException
+from conans.errors import ConanException, ConanConnectionError
+from conans.util.files import FileContents, mkdir
+from conans.util.log import logger
+from requests.exceptions import ConnectionError, ChunkedEncodingError, Timeout, RetryError
+import os
+import time
 
 
 class Uploader(object):
 
-    def __init__(self, requester, output, verify, chunk_size=1000):
+    def __init__(self, requester, output, verify, chunk_size=65536):
         self.chunk_size = chunk_size
         self.output = output
         self.requester = requester
         self.verify = verify
 
     def post(self, url, content):
+        """ param content: string or FileContents, which is read from disk as sent
+        """
         self.output.info("")
         it = upload_in_chunks(content, self.chunk_size, self.output)
         return self.requester.put(url, data=IterableToFileAdapter(it), verify=self.verify)
 
 
 class Downloader(object):
+    """ Downloads resuming the transfer with Range requests after connection errors
+    while receiving the file, waiting RETRY_WAIT seconds before the first retry, doubled
+    in each one. The requests themselves are not retried here, the requester already
+    retries the failed connections and temporary errors
+    """
+    RETRIES = 5
+    RETRY_WAIT = 1
+    MAX_RETRY_WAIT = 30
 
     def __init__(self, requester, output, verify, chunk_size=1000):
         self.chunk_size = chunk_size
@@ -24,28 +39,100 @@ class Downloader(object):
         self.verify = verify
 
     def download(self, url):
-        ret = []
-        response = self.requester.get(url, stream=True, verify=self.verify)
+        return "".join(self.iter_download(url))
+
+    def iter_download(self, url, chunk_size=65536, part_path=None):
+        """ generator of the chunks of the file as they arrive, so they can be processed
+        without keeping the whole file in memory
+        param part_path: file where the received contents are written. If it exists, its
+        contents are yielded first and only the rest is requested. Removed when the
+        download completes
+        """
+        offset = 0
+        part_file = None
+        if part_path is not None and os.path.exists(part_path):
+            offset = os.path.getsize(part_path)
+            logger.debug("Resuming download of %s from %d" % (url, offset))
+            for data in FileContents(part_path, offset, None).chunks(chunk_size):
+                yield data
+
+        try:
+            validator = None
+            retry = 0
+            while True:
+                response = self._request(url, offset, validator)
+                validator = response.headers.get("etag") or \
+                    response.headers.get("last-modified")
+                try:
+                    for data in self._response_chunks(response, offset, chunk_size):
+                        if part_path is not None:
+                            part_file = part_file or _open_part_file(part_path)
+                            part_file.write(data)
+                        offset += len(data)
+                        yield data
+                    break
+                except (ConnectionError, ChunkedEncodingError, Timeout) as exc:
+                    retry += 1
+                    if retry > self.RETRIES:
+                        raise ConanConnectionError("Download of %s failed after %d retries: %s"
+                                                   % (url, self.RETRIES, str(exc)))
+                    wait = min(self.RETRY_WAIT * 2 ** (retry - 1), self.MAX_RETRY_WAIT)
+                    self.output.warn("Connection error downloading, retrying in %ss: %s"
+                                     % (wait, str(exc)))
+                    time.sleep(wait)
+        finally:
+            if part_file is not None:
+                part_file.close()
+
+        if part_path is not None and os.path.exists(part_path):
+            os.remove(part_path)
+
+    def _request(self, url, offset, validator):
+        headers = {}
+        if offset:
+            headers["Range"] = "bytes=%d-" % offset
+            if validator:
+                headers["If-Range"] = validator
+        try:
+            response = self.requester.get(url, stream=True, verify=self.verify,
+                                          headers=headers or None)
+        except RetryError as exc:
+            raise ConanConnectionError("Error downloading file %s: %s" % (url, str(exc)))
         if not response.ok:
             raise ConanException("Error %d downloading file %s" % (response.status_code, url))
-
+        return response
+
+    def _response_chunks(self, response, offset, chunk_size):
+        """ the chunks of the response from offset. A server not supporting ranges, or
+        whose file changed, returns the whole file, and the already received part is
+        skipped. If the file changed, the md5 check will fail
+        """
+        partial = response.status_code == 206
+        skip = 0 if partial else offset
+        received = offset if partial else 0
         total_length = response.headers.get('content-length')
-
-        if total_length is None:  # no content length header
-            ret.append(response.content)
-        else:
-            dl = 0
-            total_length = int(total_length)
-            last_progress = None
-            for data in response.iter_content(chunk_size=1024):
-                dl += len(data)
-                ret.append(data)
-                units = progress_units(dl, total_length)
+        if total_length is not None:
+            total_length = int(total_length) + (offset if partial else 0)
+        last_progress = None
+        for data in response.iter_content(chunk_size=chunk_size):
+            received += len(data)
+            if skip:
+                skipped = min(skip, len(data))
+                data = data[skipped:]
+                skip -= skipped
+                if not data:
+                    continue
+            yield data
+            if total_length:
+                units = progress_units(received, total_length)
                 if last_progress != units:  # Avoid screen refresh if nothing has change
                     print_progress(self.output, units)
                     last_progress = units
 
-        return "".join(ret)
+
+def _open_part_file(part_path):
+    mkdir(os.path.dirname(part_path))
+    return open(part_path, "ab")
 
 
 class upload_in_chunks(object):
@@ -53,7 +140,10 @@ class upload_in_chunks(object):
         self.totalsize = len(content)
         self.output = output
         self.aprox_chunks = self.totalsize * 1.0 / chunksize
-        self.groups = chunker(content, chunksize)
+        if isinstance(content, FileContents):
+            self.groups = content.chunks(chunksize)
+        else:
+            self.groups = chunker(content, chunksize)
 
     def __iter__(self):
         last_progress = None
@@ -1,13 +1,18 @@
 from conans.client.store.sqlite import SQLiteDB
 from conans.errors import ConanException
+import threading
+import time
 
 USER_TABLE = "users"
+REMOTE_MISSES_TABLE = "remote_misses"
+REMOTE_FAILURES_TABLE = "remote_failures"
 
 
 class LocalDB(SQLiteDB):
 
     def __init__(self, dbfile):
         self.dbfile = dbfile
+        self._lock = threading.RLock()
         super(LocalDB, self).__init__(dbfile)
         self.connect()
         self.init()
@@ -21,6 +26,13 @@ class LocalDB(SQLiteDB):
             # To avoid multiple usernames in the login table, use always "login" as id
             cursor.execute("create table if not exists %s (id TEXT UNIQUE, "
                            "username TEXT UNIQUE, token TEXT)" % USER_TABLE)
+            # References not found in a remote, not to look them up again for a while
+            cursor.execute("create table if not exists %s (reference TEXT, remote TEXT, "
+                           "time REAL, PRIMARY KEY (reference, remote))"
+                           % REMOTE_MISSES_TABLE)
+            # Connection failures in a row of each remote
+            cursor.execute("create table if not exists %s (remote TEXT PRIMARY KEY, "
+                           "failures INTEGER, time REAL)" % REMOTE_FAILURES_TABLE)
 
         except Exception as e:
             message = "Could not initalize local cache"
@@ -33,28 +45,90 @@ class LocalDB(SQLiteDB):
         '''Returns login credentials.
         This method is also in charge of expiring them.
         '''
-        try:
-            statement = self.connection.cursor()
-            statement.execute('select * from %s where id="login"' % USER_TABLE)
-            rs = statement.fetchone()
-            if not rs:
-                return None, None
-            name = rs[1]
-            token = rs[2]
-            return name, token
-        except Exception:
-            raise ConanException("Could read login\n Try removing '%s' file" % self.dbfile)
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                statement.execute('select * from %s where id="login"' % USER_TABLE)
+                rs = statement.fetchone()
+                if not rs:
+                    return None, None
+                name = rs[1]
+                token = rs[2]
+                return name, token
+            except Exception:
+                raise ConanException("Could read login\n Try removing '%s' file" % self.dbfile)
 
     def get_username(self):
         return self.get_login()[0]
 
     def set_login(self, login):
         """Login is a tuple of (login, token)"""
-        try:
-            statement = self.connection.cursor()
-            statement.execute("INSERT OR REPLACE INTO %s (id, username, token) "
-                              "VALUES (?, ?, ?)" % USER_TABLE,
-                              ("login", login[0], login[1]))
-            self.connection.commit()
-        except Exception as e:
-            raise ConanException("Could not store credentials", e)
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                statement.execute("INSERT OR REPLACE INTO %s (id, username, token) "
+                                  "VALUES (?, ?, ?)" % USER_TABLE,
+                                  ("login", login[0], login[1]))
+                self.connection.commit()
+            except Exception as e:
+                raise ConanException("Could not store credentials", e)
+
+    def get_remote_misses(self, reference, max_age):
+        """Returns the set of remote urls where the reference was not found in the last
+        max_age seconds"""
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                statement.execute("select remote from %s where reference=? and time>?"
+                                  % REMOTE_MISSES_TABLE, (reference, time.time() - max_age))
+                return set(row[0] for row in statement.fetchall())
+            except Exception as e:
+                raise ConanException("Could not read remote misses", e)
+
+    def set_remote_miss(self, reference, remote):
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                statement.execute("INSERT OR REPLACE INTO %s (reference, remote, time) "
+                                  "VALUES (?, ?, ?)" % REMOTE_MISSES_TABLE,
+                                  (reference, remote, time.time()))
+                self.connection.commit()
+            except Exception as e:
+                raise ConanException("Could not store remote miss", e)
+
+    def remove_remote_miss(self, reference, remote):
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                statement.execute("DELETE FROM %s where reference=? and remote=?"
+                                  % REMOTE_MISSES_TABLE, (reference, remote))
+                self.connection.commit()
+            except Exception as e:
+                raise ConanException("Could not remove remote miss", e)
+
+    def get_remote_failures(self, remote):
+        """Returns (failures in a row, time of the last one) of the remote url"""
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                statement.execute("select failures, time from %s where remote=?"
+                                  % REMOTE_FAILURES_TABLE, (remote, ))
+                row = statement.fetchone()
+                return (row[0], row[1]) if row else (0, None)
+            except Exception as e:
+                raise ConanException("Could not read remote failures", e)
+
+    def set_remote_failures(self, remote, failures):
+        with self._lock:
+            try:
+                statement = self.connection.cursor()
+                if failures:
+                    statement.execute("INSERT OR REPLACE INTO %s (remote, failures, time) "
+                                      "VALUES (?, ?, ?)" % REMOTE_FAILURES_TABLE,
+                                      (remote, failures, time.time()))
+                else:
+                    statement.execute("DELETE FROM %s where remote=?" % REMOTE_FAILURES_TABLE,
+                                      (remote, ))
+                self.connection.commit()
+            except Exception as e:
+                raise ConanException("Could not store remote failures", e)
@@ -23,8 +23,10 @@ class SQLiteDB(object):
 
     def connect(self):
         try:
+            # Used from the threads of concurrent downloads, serialized by the callers
             self.connection = sqlite3.connect(self.dbfile,
-                                              detect_types=sqlite3.PARSE_DECLTYPES)
+                                              detect_types=sqlite3.PARSE_DECLTYPES,
+                                              check_same_thread=False)
             self.connection.text_factory = str
             statement = None
             try:
@@ -1,14 +1,21 @@
 import os
 from conans.errors import ConanException, NotFoundException
 from conans.model.ref import PackageReference
+from conans.client.output import ConanOutput
+from conans.util.log import logger
+from multiprocessing.pool import ThreadPool
+from cStringIO import StringIO
 
 
 class ConanUploader(object):
 
-    def __init__(self, paths, user_io, remote_proxy):
+    def __init__(self, paths, user_io, remote_proxy, jobs=1):
+        """ param jobs: number of packages uploaded concurrently
+        """
         self._paths = paths
         self._user_io = user_io
         self._remote_proxy = remote_proxy
+        self._jobs = jobs
 
     def upload_conan(self, conan_ref, force=False, all_packages=False):
         """Uploads the conans identified by conan_ref"""
@@ -21,18 +28,66 @@ class ConanUploader(object):
             self._remote_proxy.upload_conan(conan_ref)
 
             if all_packages:
-                for index, package_id in enumerate(self._paths.conan_packages(conan_ref)):
-                    total = len(self._paths.conan_packages(conan_ref))
-                    self.upload_package(PackageReference(conan_ref, package_id), index + 1, total)
+                package_ids = self._paths.conan_packages(conan_ref)
+                total = len(package_ids)
+                if self._jobs > 1 and total > 1:
+                    self._upload_packages_concurrently(conan_ref, package_ids)
+                else:
+                    for index, package_id in enumerate(package_ids):
+                        self.upload_package(PackageReference(conan_ref, package_id),
+                                            index + 1, total)
         else:
             self._user_io.out.error("There is no local conanfile exported as %s"
                                     % str(conan_ref))
 
-    def upload_package(self, package_ref, index=1, total=1):
+    def upload_package(self, package_ref, index=1, total=1, output=None):
         """Uploads the package identified by package_id"""
+        output = output or self._user_io.out
         msg = ("Uploading package %d/%d: %s" % (index, total, str(package_ref.package_id)))
-        self._user_io.out.info(msg)
-        self._remote_proxy.upload_package(package_ref)
+        output.info(msg)
+        self._remote_proxy.upload_package(package_ref, output)
+
+    def _upload_packages_concurrently(self, conan_ref, package_ids):
+        """ Uploads the packages in a pool of threads, each one reporting to its own
+        buffered output, written in order when all of them finished. The failed ones are
+        retried once, one by one from this thread, so the user can be asked for
+        credentials if necessary
+        """
+        out = self._user_io.out
+        total = len(package_ids)
+
+        def upload(index_package_id):
+            index, package_id = index_package_id
+            buffer = StringIO()
+            package_out = ConanOutput(buffer, out.color)
+            package_ref = PackageReference(conan_ref, package_id)
+            try:
+                self.upload_package(package_ref, index + 1, total, package_out)
+                return buffer.getvalue(), None
+            except Exception as exc:
+                logger.debug("Upload of %s failed: %s" % (str(package_ref), str(exc)))
+                return buffer.getvalue(), exc
+
+        pool = ThreadPool(min(total, self._jobs))
+        try:
+            results = pool.map(upload, list(enumerate(package_ids)))
+        finally:
+            pool.close()
+            pool.join()
+
+        failed = []
+        for index, (package_id, (text, exc)) in enumerate(zip(package_ids, results)):
+            out.write(text)
+            if exc is not None:
+                out.warn("Upload of package %s failed: %s" % (package_id, str(exc)))
+                failed.append((index, package_id))
+            else:
+                out.success("Uploaded package %d/%d: %s" % (index + 1, total, package_id))
+
+        if failed:
+            out.info("Retrying the upload of %d failed package(s)" % len(failed))
+            for index, package_id in failed:
+                self.upload_package(PackageReference(conan_ref, package_id), index + 1, total)
 
     def _check_package_date(self, conan_ref):
         try:
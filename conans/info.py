@@ -3,14 +3,25 @@ from conans.model.info import ConanInfo
 import json
 
 
+# The fields of each ConanInfo that can be requested in a search
+SEARCH_FIELDS = ("settings", "full_settings", "options", "full_options", "requires",
+                 "full_requires")
+
+# Streamed search responses: one JSON line {"reference": ..., "packages": ...} per conanfile,
+# and a last {"next_cursor": ...} one if there are more pages
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
 class SearchInfo(dict):
     """ {ConanFileReference: dict{package_id: ConanInfo}
     """
 
-    def serialize(self):
+    def serialize(self, fields=None):
+        """ param fields: the SEARCH_FIELDS serialized of each ConanInfo, all if None
+        """
         serialize_info = {}
         for ref, conan_info in self.iteritems():
-            serialize_info[repr(ref)] = {k: v.serialize() for k, v in conan_info.iteritems()}
+            serialize_info[repr(ref)] = serialize_packages(conan_info, fields)
         return serialize_info
 
     @staticmethod
@@ -19,8 +30,22 @@ class SearchInfo(dict):
         ret = SearchInfo()
         for conan_ref, packages in tmp.iteritems():
             conan_ref = ConanFileReference.loads(conan_ref)
-            ret[conan_ref] = {}
-            for package_id, info in packages.iteritems():
-                ret[conan_ref][package_id] = ConanInfo.deserialize(info)
+            ret[conan_ref] = deserialize_packages(packages)
 
         return ret
+
+
+def serialize_packages(packages, fields=None):
+    """ param packages: {package_id: ConanInfo}
+    """
+    return {k: _projection(v.serialize(), fields) for k, v in packages.iteritems()}
+
+
+def deserialize_packages(data):
+    return {package_id: ConanInfo.deserialize(info) for package_id, info in data.iteritems()}
+
+
+def _projection(serialized, fields):
+    if fields is None:
+        return serialized
+    return {field: value for field, value in serialized.iteritems() if field in fields}
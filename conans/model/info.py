@@ -205,11 +205,14 @@ class ConanInfo(object):
 
     @staticmethod
     def deserialize(data):
+        """ the fields not in data, not requested in a search, are empty
+        """
+        empty_options = {"options": [], "req_options": {}}
         res = ConanInfo()
-        res.settings = Values.deserialize(data["settings"])
-        res.full_settings = Values.deserialize(data["full_settings"])
-        res.options = OptionsValues.deserialize(data["options"])
-        res.full_options = OptionsValues.deserialize(data["full_options"])
-        res.requires = RequirementsInfo.deserialize(data["requires"])
-        res.full_requires = RequirementsList.deserialize(data["full_requires"])
+        res.settings = Values.deserialize(data.get("settings", []))
+        res.full_settings = Values.deserialize(data.get("full_settings", []))
+        res.options = OptionsValues.deserialize(data.get("options", empty_options))
+        res.full_options = OptionsValues.deserialize(data.get("full_options", empty_options))
+        res.requires = RequirementsInfo.deserialize(data.get("requires", {}))
+        res.full_requires = RequirementsList.deserialize(data.get("full_requires", []))
         return res
@@ -31,18 +31,37 @@ class FileTreeManifest(object):
         return FileTreeManifest(time, file_sums)
 
     @classmethod
-    def create(cls, folder):
+    def create(cls, folder, stat_cache=None):
         """ Walks a folder and create a TreeDigest for it, reading file contents
         from disk, and capturing current time
+        param stat_cache: optional dict {relative_path: [size, mtime, inode, md5]}. Files
+        whose size, modification time and inode didn't change take the md5 from it, instead
+        of reading them again. It is updated with the current values
         """
         file_dict = {}
+        new_stat_cache = {}
         for root, _, files in os.walk(folder):
             relative_path = os.path.relpath(root, folder)
             for f in files:
                 abs_path = os.path.join(root, f)
                 rel_path = os.path.normpath(os.path.join(relative_path, f))
                 rel_path = rel_path.replace("\\", "/")
-                file_dict[rel_path] = md5sum(abs_path)
+                if stat_cache is None:
+                    file_dict[rel_path] = md5sum(abs_path)
+                    continue
+                stat = os.stat(abs_path)
+                stat_key = [stat.st_size, getattr(stat, "st_mtime_ns", stat.st_mtime),
+                            stat.st_ino]
+                cached = stat_cache.get(rel_path)
+                if cached is not None and cached[:3] == stat_key:
+                    file_dict[rel_path] = cached[3]
+                else:
+                    file_dict[rel_path] = md5sum(abs_path)
+                new_stat_cache[rel_path] = stat_key + [file_dict[rel_path]]
+
+        if stat_cache is not None:
+            stat_cache.clear()
+            stat_cache.update(new_stat_cache)
 
         date = calendar.timegm(time.gmtime())
         from conans.paths import CONAN_MANIFEST, CONANFILE
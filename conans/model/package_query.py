@@ -0,0 +1,122 @@
+""" Queries of packages by their settings, options and requirements, like:
+
+    os=Linux AND compiler.version=5.3 AND (options.shared=True OR options.fPIC!=False)
+
+Settings are named as in conaninfo.txt, options with the "options." prefix and the
+requirements, full references, with "requires". Values can be quoted, compiler="Visual Studio",
+and have fnmatch wildcards, requires=Boost/*. "!=" matches if no value of the field
+matches. AND has precedence over OR
+"""
+import re
+from fnmatch import fnmatchcase
+from conans.errors import ConanException
+
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|([\w.:+-]+)\s*(!=|=)\s*("[^"]*"|[^\s()"]+)|(\S+))')
+
+
+def package_properties(conan_info):
+    """ returns the list of (field, value) of the package that can be queried
+    """
+    result = list(conan_info.settings.as_list())
+    result.extend(("options.%s" % name, value) for name, value in conan_info.options.as_list())
+    result.extend(("requires", str(package_reference.conan))
+                  for package_reference in conan_info.full_requires)
+    return result
+
+
+class PackageQuery(object):
+    """ parsed query. The tree is made of tuples:
+        ("and", left, right), ("or", left, right) or (operator, field, pattern)
+    being operator "=" or "!="
+    """
+    def __init__(self, tree):
+        self.tree = tree
+
+    @staticmethod
+    def loads(text):
+        tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN_RE.match(text, position)
+            open_paren, close_paren, field, operator, value, word = match.groups()
+            if open_paren or close_paren:
+                tokens.append(open_paren or close_paren)
+            elif field:
+                tokens.append((operator, field, value.strip('"')))
+            elif word.upper() in ("AND", "OR"):
+                tokens.append(word.upper())
+            else:
+                raise ConanException("Invalid package query '%s', unexpected '%s'"
+                                     % (text, word))
+            position = match.end()
+        parser = _Parser(tokens, text)
+        tree = parser.expression()
+        if parser.next() is not None:
+            raise ConanException("Invalid package query '%s'" % text)
+        return PackageQuery(tree)
+
+    def matches(self, conan_info):
+        properties = {}
+        for field, value in package_properties(conan_info):
+            properties.setdefault(field, []).append(value)
+        return self._matches(self.tree, properties)
+
+    def _matches(self, node, properties):
+        if node[0] == "and":
+            return self._matches(node[1], properties) and self._matches(node[2], properties)
+        if node[0] == "or":
+            return self._matches(node[1], properties) or self._matches(node[2], properties)
+        operator, field, pattern = node
+        found = any(fnmatchcase(value, pattern) for value in properties.get(field, []))
+        return found if operator == "=" else not found
+
+
+class _Parser(object):
+    """ recursive descent parser of the tokens:
+        expression := term (OR term)*
+        term := factor (AND factor)*
+        factor := "(" expression ")" | condition
+    """
+    def __init__(self, tokens, text):
+        self._tokens = tokens
+        self._text = text
+        self._index = 0
+
+    def next(self):
+        if self._index < len(self._tokens):
+            return self._tokens[self._index]
+        return None
+
+    def _consume(self):
+        token = self.next()
+        if token is None:
+            raise ConanException("Invalid package query '%s', unexpected end" % self._text)
+        self._index += 1
+        return token
+
+    def expression(self):
+        tree = self._term()
+        while self.next() == "OR":
+            self._consume()
+            tree = ("or", tree, self._term())
+        return tree
+
+    def _term(self):
+        tree = self._factor()
+        while self.next() == "AND":
+            self._consume()
+            tree = ("and", tree, self._factor())
+        return tree
+
+    def _factor(self):
+        token = self._consume()
+        if token == "(":
+            tree = self.expression()
+            if self._consume() != ")":
+                raise ConanException("Invalid package query '%s', missing ')'" % self._text)
+            return tree
+        if isinstance(token, tuple):
+            return token
+        raise ConanException("Invalid package query '%s', unexpected '%s'" % (self._text, token))
@@ -1,7 +1,7 @@
 from conans.util.log import logger
 from conans.errors import ConanException
 from conans.model.ref import PackageReference
-from conans.paths import SYSTEM_REQS
+from conans.paths import SYSTEM_REQS, remove_stat_cache
 import os
 from conans.util.files import rmdir
 
@@ -46,6 +46,8 @@ class DiskRemover(object):
         else:
             for id_ in ids_filter:  # remove just the specified packages
                 package_ref = PackageReference(conan_ref, id_)
-                self._remove(self._paths.package(package_ref), conan_ref, "package:%s" % id_)
+                package_folder = self._paths.package(package_ref)
+                self._remove(package_folder, conan_ref, "package:%s" % id_)
+                remove_stat_cache(package_folder)
                 self._remove_file(self._paths.system_reqs_package(package_ref),
                                   conan_ref, "%s/%s" % (id_, SYSTEM_REQS))
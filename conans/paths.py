@@ -1,9 +1,11 @@
 import os
 from conans.model.ref import ConanFileReference, PackageReference
-from conans.util.files import load, relative_dirs, path_exists
+from conans.util.files import load, save, relative_dirs, path_exists
 from os.path import isfile
 from os.path import join, normpath
 from conans.model.manifest import FileTreeManifest
+from conans.util.log import logger
+import json
 
 
 EXPORT_FOLDER = "export"
@@ -29,6 +31,18 @@ SYSTEM_REQS = "system_reqs.txt"
 PACKAGE_TGZ_NAME = "conan_package.tgz"
 EXPORT_TGZ_NAME = "conan_export.tgz"
 
+STAT_CACHE_EXTENSION = ".stat"
+
+
+def remove_stat_cache(folder):
+    """ removes the stat data stored next to the folder by the cached digests, call it
+    wherever the folder is removed
+    """
+    try:
+        os.remove(folder + STAT_CACHE_EXTENSION)
+    except OSError:  # Never computed, or already removed
+        pass
+
 
 class SimplePaths(object):
     """
@@ -52,6 +66,13 @@ class SimplePaths(object):
         assert isinstance(conan_reference, ConanFileReference)
         return normpath(join(self.conan(conan_reference), EXPORT_FOLDER))
 
+    def export_partial(self, conan_reference):
+        """ marker of an export downloaded without its sources, only with the conanfile
+        and the manifest. It is next to the export folder, not inside
+        """
+        assert isinstance(conan_reference, ConanFileReference)
+        return normpath(join(self.conan(conan_reference), EXPORT_FOLDER + ".partial"))
+
     def source(self, conan_reference):
         assert isinstance(conan_reference, ConanFileReference)
         return normpath(join(self.conan(conan_reference), SRC_FOLDER))
@@ -104,6 +125,8 @@ class StorePaths(SimplePaths):
 
     def __init__(self, store_folder):
         super(StorePaths, self).__init__(store_folder)
+        # If False, valid_digest() only reads the files whose stat data changed
+        self.verify_full = False
 
     def export_paths(self, conan_reference):
         ''' Returns all file paths for a conans (relative to conans directory)'''
@@ -140,19 +163,56 @@ class StorePaths(SimplePaths):
         filename = os.path.join(self.export(conan_reference), CONAN_MANIFEST)
         return FileTreeManifest.loads(load(filename))
 
+    def is_partial_export(self, conan_reference):
+        """ True if the export was downloaded without its sources, that have to be
+        retrieved before building it
+        """
+        return os.path.exists(self.export_partial(conan_reference))
+
     def valid_conan_digest(self, conan_reference):
         digest_path = self.digestfile_conanfile(conan_reference)
         if not path_exists(digest_path, self.store):
             return False
-        return self.valid_digest(digest_path)
+        return self.valid_digest(digest_path, partial=self.is_partial_export(conan_reference))
 
     def valid_package_digest(self, package_reference):
         digest_path = self.digestfile_package(package_reference)
         return self.valid_digest(digest_path)
 
-    def valid_digest(self, digest_path):
+    def valid_digest(self, digest_path, partial=False):
+        """ param partial: only the files in the folder are checked, the manifest can
+        list more files that were not downloaded
+        """
         if not os.path.exists(digest_path):
             return False
-        expected_digest = FileTreeManifest.create(os.path.dirname(digest_path))
+        folder = os.path.dirname(digest_path)
+        if self.verify_full:
+            expected_digest = FileTreeManifest.create(folder)
+        else:
+            expected_digest = self._create_cached_digest(folder)
         readed_digest = FileTreeManifest.loads(load(digest_path))
+        if partial:
+            if CONANFILE not in expected_digest.file_sums:
+                return False
+            return all(readed_digest.file_sums.get(filename) == file_md5
+                       for filename, file_md5 in expected_digest.file_sums.iteritems())
         return readed_digest.file_sums == expected_digest.file_sums
+
+    def _create_cached_digest(self, folder):
+        """ creates the FileTreeManifest of the folder, hashing only the files whose
+        stat data changed since the previous time. The stat data and md5 of each file
+        is stored next to the folder, not inside, so it is not part of the manifest
+        """
+        stat_cache_path = folder + STAT_CACHE_EXTENSION
+        try:
+            stat_cache = json.loads(load(stat_cache_path))
+        except (IOError, ValueError):
+            stat_cache = {}
+        previous = dict(stat_cache)
+        digest = FileTreeManifest.create(folder, stat_cache)
+        if stat_cache != previous:
+            try:
+                save(stat_cache_path, json.dumps(stat_cache))
+            except (IOError, OSError) as e:  # Just an optimization, the digest is right
+                logger.debug("Unable to save %s: %s" % (stat_cache_path, str(e)))
+        return digest
@@ -13,10 +13,14 @@ from ConfigParser import ConfigParser, NoSectionError
 from conans.paths import SimplePaths
 from conans.server.store.disk_adapter import DiskAdapter
 from conans.server.store.file_manager import FileManager
+from conans.server.store.sqlite_search_engine import SQLiteSearchEngine, SEARCH_DB
 from conans.util.log import logger
 from conans.server.conf.default_server_conf import default_server_conf
+from conans.server.rest.wsgi_servers import SERVER_MODES, DEFAULT_SERVER_MODE
+from conans.server.rest.controllers.file_upload_download_controller import FILE_OFFLOAD_MODES
 
 MIN_CLIENT_COMPATIBLE_VERSION = '0.7.0'
+DEFAULT_FILE_OFFLOAD_PREFIX = "/conan_storage"
 
 
 class ConanServerConfigParser(ConfigParser):
@@ -42,7 +46,18 @@ class ConanServerConfigParser(ConfigParser):
                            "public_port": get_env("CONAN_SERVER_PUBLIC_PORT", None, environment),
                            "host_name": get_env("CONAN_HOST_NAME", None, environment),
                            # "user:pass,user2:pass2"
-                           "users": get_env("CONAN_SERVER_USERS", None, environment)}
+                           "users": get_env("CONAN_SERVER_USERS", None, environment),
+                           "search_index": get_env("CONAN_SEARCH_INDEX", None, environment),
+                           "server_mode": get_env("CONAN_SERVER_MODE", None, environment),
+                           "threads": get_env("CONAN_SERVER_THREADS", None, environment),
+                           "workers": get_env("CONAN_SERVER_WORKERS", None, environment),
+                           "request_timeout": get_env("CONAN_REQUEST_TIMEOUT", None,
+                                                      environment),
+                           "shutdown_timeout": get_env("CONAN_SHUTDOWN_TIMEOUT", None,
+                                                       environment),
+                           "file_offload": get_env("CONAN_FILE_OFFLOAD", None, environment),
+                           "file_offload_prefix": get_env("CONAN_FILE_OFFLOAD_PREFIX", None,
+                                                          environment)}
 
     def _get_file_conf(self, section, varname=None):
         """Gets the section from config file or raises an exception"""
@@ -168,6 +183,85 @@ class ConanServerConfigParser(ConfigParser):
                                  "in server.conf or set CONAN_UPDOWN_SECRET env value.")
         return self._get_conf_server_string("updown_secret")
 
+    @property
+    def search_index(self):
+        """ optional, if enabled the searches use a SQLite index instead of reading
+        the storage
+        """
+        try:
+            value = self._get_conf_server_string("search_index")
+        except ConanException:
+            return False
+        return str(value).lower() in ("true", "1")
+
+    @property
+    def server_mode(self):
+        """ optional, the server that serves the requests: "wsgiref" (single threaded),
+        "threaded" or "prefork" (several processes with threads)
+        """
+        try:
+            value = self._get_conf_server_string("server_mode")
+        except ConanException:
+            value = None
+        if not value:
+            return DEFAULT_SERVER_MODE
+        if value not in SERVER_MODES:
+            raise ConanException("Invalid server_mode '%s', it has to be one of: %s"
+                                 % (value, ", ".join(SERVER_MODES)))
+        return value
+
+    @property
+    def threads(self):
+        """ requests served at the same time by each process
+        """
+        return self._get_conf_server_int("threads", 10)
+
+    @property
+    def workers(self):
+        """ processes of the "prefork" server_mode
+        """
+        return self._get_conf_server_int("workers", 4)
+
+    @property
+    def request_timeout(self):
+        """ seconds a connection can be idle before it is closed
+        """
+        return self._get_conf_server_int("request_timeout", 300)
+
+    @property
+    def shutdown_timeout(self):
+        """ seconds the running requests have to finish when the server is stopped
+        """
+        return self._get_conf_server_int("shutdown_timeout", 30, minimum=0)
+
+    @property
+    def file_offload(self):
+        """ optional, "x-sendfile" or "x-accel-redirect" if a fronting web server sends the
+        files of the downloads, None if they are sent by conan_server
+        """
+        try:
+            value = self._get_conf_server_string("file_offload")
+        except ConanException:
+            value = None
+        if not value:
+            return None
+        value = value.lower()
+        if value not in FILE_OFFLOAD_MODES:
+            raise ConanException("Invalid file_offload '%s', it has to be one of: %s"
+                                 % (value, ", ".join(FILE_OFFLOAD_MODES)))
+        return value
+
+    @property
+    def file_offload_prefix(self):
+        """ location of the fronting web server that serves the storage folder, for the
+        "x-accel-redirect" file_offload
+        """
+        try:
+            value = self._get_conf_server_string("file_offload_prefix")
+        except ConanException:
+            value = None
+        return value or DEFAULT_FILE_OFFLOAD_PREFIX
+
     @property
     def store_adapter(self):
         return self._get_conf_server_string("store_adapter")
@@ -178,6 +272,23 @@ class ConanServerConfigParser(ConfigParser):
         else:
             return self._get_file_conf("server", keyname)
 
+    def _get_conf_server_int(self, keyname, default, minimum=1):
+        """ optional integer value, the default if it is not defined
+        """
+        try:
+            value = self._get_conf_server_string(keyname)
+        except ConanException:
+            value = None
+        if not value:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = None
+        if value is None or value < minimum:
+            raise ConanException("Invalid %s, it has to be an integer >= %d" % (keyname, minimum))
+        return value
+
     @property
     def authorize_timeout(self):
         if self.env_config["authorize_timeout"]:
@@ -204,9 +315,16 @@ def get_file_manager(config, public_url=None, updown_auth_manager=None):
             raise Exception("Updown auth manager needed for disk controller (not s3)")
         adapter = DiskAdapter(disk_controller_url, config.disk_storage_path, updown_auth_manager)
         paths = SimplePaths(config.disk_storage_path)
+        search_engine = None
+        if config.search_index:
+            search_engine = SQLiteSearchEngine(os.path.join(config.disk_storage_path,
+                                                            SEARCH_DB))
     else:
         # Want to develop new adapter? create a subclass of 
         # conans.server.store.file_manager.StorageAdapter and implement the abstract methods
         raise Exception("Store adapter not implemented! Change 'store_adapter' "
                         "variable in server.conf file to one of the available options: 'disk' ")
-    return FileManager(paths, adapter)
+    file_manager = FileManager(paths, adapter, search_engine)
+    if search_engine is not None and search_engine.needs_rebuild:
+        file_manager.rebuild_search_index()
+    return file_manager
@@ -21,6 +21,25 @@ authorize_timeout: 1800
 disk_storage_path: ~/.conan_server/data
 disk_authorize_timeout: 1800
 updown_secret: {updown_secret}
+# Searches use an index of the storage updated with the uploads, instead of reading it
+search_index: True
+
+# How the requests are served: "threaded", by a pool of threads, "prefork", by several
+# processes with a pool of threads each (not available in Windows), or "wsgiref", one at a time
+server_mode: threaded
+# Requests served at the same time by each process
+threads: 10
+# Processes of the "prefork" server_mode
+workers: 4
+# Seconds a connection can be idle before it is closed
+request_timeout: 300
+# Seconds the running requests have to finish when the server is stopped
+shutdown_timeout: 30
+# Let a fronting web server send the files of the downloads, after conan_server checks
+# the signed urls: "x-sendfile" (Apache mod_xsendfile, lighttpd) or "x-accel-redirect"
+# (nginx, with an internal location file_offload_prefix aliased to disk_storage_path)
+file_offload:
+file_offload_prefix: /conan_storage
 
 
 [write_permissions]
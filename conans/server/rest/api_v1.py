@@ -8,6 +8,7 @@ from conans.server.rest.controllers.conan_controller import ConanController
 from conans.server.rest.controllers.users_controller import UsersController
 from conans.server.rest.controllers.file_upload_download_controller import FileUploadDownloadController
 from conans.server.rest.bottle_plugins.version_checker import VersionCheckerPlugin
+from conans.server.rest.bottle_plugins.gzip_compression import GzipPlugin
 
 
 class ApiV1(Bottle):
@@ -41,6 +42,9 @@ class ApiV1(Bottle):
         self.install(VersionCheckerPlugin(self.server_version,
                                           self.min_client_compatible_version))
 
+        # Compress the JSON responses
+        self.install(GzipPlugin())
+
         # Second, check Http Basic Auth
         self.install(HttpBasicAuthentication())
 
@@ -0,0 +1,81 @@
+from bottle import request, response, json_dumps
+from conans.info import NDJSON_CONTENT_TYPE
+import types
+import zlib
+
+
+# zlib wbits of the gzip format, with its header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# Smaller bodies are not worth the CPU nor the gzip header
+MIN_SIZE = 1024
+
+
+class GzipPlugin(object):
+    ''' The GzipPlugin compresses the JSON responses, the dicts returned by the routes and
+        the streamed NDJSON ones, if the client accepts the gzip Content-Encoding. The
+        streamed ones are compressed line by line, so the client can decode them as they
+        arrive'''
+
+    name = 'GzipPlugin'
+    api = 2
+
+    def __init__(self, compress_level=6, min_size=MIN_SIZE):
+        self.compress_level = compress_level
+        self.min_size = min_size
+
+    def apply(self, callback, _):
+        '''Apply plugin'''
+        def wrapper(*args, **kwargs):
+            ret = callback(*args, **kwargs)  # kwargs has :xxx variables from url
+            if not accepts_gzip(request.headers.get("Accept-Encoding", "")):
+                return ret
+            if isinstance(ret, dict):
+                body = json_dumps(ret)
+                response.content_type = "application/json"
+                if len(body) < self.min_size:
+                    return body
+                self._set_headers()
+                compressor = self._compressor()
+                return compressor.compress(body) + compressor.flush()
+            if (isinstance(ret, types.GeneratorType) and
+                    response.content_type == NDJSON_CONTENT_TYPE):
+                self._set_headers()
+                return self._compress_lines(ret)
+            return ret
+        return wrapper
+
+    def _compressor(self):
+        return zlib.compressobj(self.compress_level, zlib.DEFLATED, GZIP_WBITS)
+
+    @staticmethod
+    def _set_headers():
+        response.set_header("Content-Encoding", "gzip")
+        response.add_header("Vary", "Accept-Encoding")
+
+    def _compress_lines(self, lines):
+        compressor = self._compressor()
+        for line in lines:
+            yield compressor.compress(line) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    ''' If the value of an Accept-Encoding header accepts gzip, by name or with "*", with
+        a q-value greater than 0'''
+    qualities = {}
+    for item in accept_encoding.split(","):
+        params = item.split(";")
+        coding = params[0].strip().lower()
+        quality = 1.0
+        for param in params[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
@@ -1,13 +1,20 @@
 from conans.server.rest.controllers.controller import Controller
-from bottle import request
+from bottle import request, response
 from conans.model.ref import ConanFileReference, PackageReference
 from conans.server.service.service import ConanService
-from conans.errors import NotFoundException
+from conans.errors import NotFoundException, RequestErrorException, ConanException
 import json
 from conans.paths import CONAN_MANIFEST
+from conans.model.package_query import PackageQuery
+from conans.info import SEARCH_FIELDS, NDJSON_CONTENT_TYPE, SearchInfo, serialize_packages
+import itertools
 import os
 
 
+# Header of the paginated JSON search responses with the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Conan-Next-Cursor"
+
+
 class ConanController(Controller):
     """
         Serve requests related with Conan
@@ -104,15 +111,93 @@ class ConanController(Controller):
             urls_norm = {filename.replace("\\", "/"): url for filename, url in urls.iteritems()}
             return urls_norm
 
+        @app.route("%s/link_blobs" % conan_route, method=["POST"])
+        def link_conanfile_blobs(conanname, version, username, channel, auth_user):
+            """
+            Link the files already stored with the same md5, return a dict with the linked
+            files and their md5s
+            """
+            conan_service = ConanService(app.authorizer, app.file_manager, auth_user)
+            reference = ConanFileReference(conanname, version, username, channel)
+            files_md5s = json.load(request.body)
+            linked = conan_service.link_conanfile_blobs(reference, files_md5s)
+            linked_norm = {filename.replace("\\", "/"): the_md5
+                           for filename, the_md5 in linked.iteritems()}
+            return linked_norm
+
+        @app.route('%s/packages/:package_id/link_blobs' % conan_route, method=["POST"])
+        def link_package_blobs(conanname, version, username, channel, package_id, auth_user):
+            """
+            Link the files already stored with the same md5, return a dict with the linked
+            files and their md5s
+            """
+            conan_service = ConanService(app.authorizer, app.file_manager, auth_user)
+            reference = ConanFileReference(conanname, version, username, channel)
+            package_reference = PackageReference(reference, package_id)
+            files_md5s = json.load(request.body)
+            linked = conan_service.link_package_blobs(package_reference, files_md5s)
+            linked_norm = {filename.replace("\\", "/"): the_md5
+                           for filename, the_md5 in linked.iteritems()}
+            return linked_norm
+
+        @app.route('%s/metadata' % self.route, method=["POST"])
+        def get_metadata(auth_user):
+            """
+            Get the snapshots and download urls of several conanfiles and packages at once.
+            The body has the lists of references and package references, as strings
+            """
+            conan_service = ConanService(app.authorizer, app.file_manager, auth_user)
+            payload = json.load(request.body)
+            try:
+                references = [ConanFileReference.loads(reference)
+                              for reference in payload.get("conans", [])]
+                package_references = [PackageReference.loads(package_reference)
+                                      for package_reference in payload.get("packages", [])]
+            except ConanException as exc:
+                raise RequestErrorException(str(exc))
+            metadata = conan_service.get_metadata(references, package_references)
+            for value in metadata.itervalues():
+                if value:
+                    for key in ("snapshot", "urls"):
+                        value[key] = {filename.replace("\\", "/"): item
+                                      for filename, item in value[key].iteritems()}
+            return metadata
+
         @app.route('%s/search' % self.route, method=["GET"])
         def search(auth_user):
             pattern = request.params.get("q", None)
             ignorecase = request.params.get("ignorecase", True)
             if isinstance(ignorecase, str):
                 ignorecase = False if 'false' == ignorecase.lower() else True
+            packages_query = request.params.get("packages_query", None)
+            fields = request.params.get("fields", None)
+            limit = request.params.get("limit", None)
+            cursor = request.params.get("cursor", None)
+            try:
+                if packages_query:
+                    packages_query = PackageQuery.loads(packages_query)
+                if fields:
+                    fields = fields.split(",")
+                    invalid = set(fields).difference(SEARCH_FIELDS)
+                    if invalid:
+                        raise ConanException("Invalid fields: %s" % ", ".join(sorted(invalid)))
+                if limit:
+                    if not limit.isdigit() or int(limit) < 1:
+                        raise ConanException("Invalid limit: %s" % limit)
+                    limit = int(limit)
+            except ConanException as exc:
+                raise RequestErrorException(str(exc))
             conan_service = ConanService(app.authorizer, app.file_manager, auth_user)
-            info = conan_service.search(pattern, ignorecase)
-            return info.serialize()
+            results = conan_service.iter_search(pattern, ignorecase, packages_query, cursor)
+            if NDJSON_CONTENT_TYPE in request.headers.get("Accept", ""):
+                response.content_type = NDJSON_CONTENT_TYPE
+                return _search_lines(results, fields, limit)
+            # A page of limit conanfiles, and the cursor of the next one in a header
+            page = list(itertools.islice(results, limit + 1 if limit else None))
+            if limit and len(page) > limit:
+                page = page[:limit]
+                response.set_header(NEXT_CURSOR_HEADER, str(page[-1][0]))
+            return SearchInfo(page).serialize(fields)
 
         @app.route(conan_route, method="DELETE")
         def remove_conanfile(conanname, version, username, channel, auth_user):
@@ -147,3 +232,17 @@ class ConanController(Controller):
             payload = json.load(request.body)
             files = [os.path.normpath(filename) for filename in payload["files"]]
             conan_service.remove_package_files(package_reference, files)
+
+
+def _search_lines(results, fields, limit):
+    """ yields the NDJSON lines of the search results, as they are read, up to limit
+    conanfiles and the cursor of the next page, if any
+    """
+    last_reference = None
+    for count, (conan_ref, packages) in enumerate(results):
+        if limit and count == limit:
+            yield json.dumps({"next_cursor": str(last_reference)}) + "\n"
+            return
+        last_reference = conan_ref
+        yield json.dumps({"reference": str(conan_ref),
+                          "packages": serialize_packages(packages, fields)}) + "\n"
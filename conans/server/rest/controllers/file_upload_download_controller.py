@@ -1,10 +1,19 @@
 from conans.server.rest.controllers.controller import Controller
-from bottle import request, static_file, FileUpload, cached_property
+from bottle import (request, static_file, FileUpload, cached_property, parse_date,
+                    HTTPResponse)
 from conans.server.service.service import FileUploadDownloadService
 import os
+import email.utils
+import hashlib
+import mimetypes
+import urllib
 from unicodedata import normalize
 
 
+# Modes of serving the files by a fronting web server, file_offload in server.conf
+FILE_OFFLOAD_MODES = ("x-sendfile", "x-accel-redirect")
+
+
 class FileUploadDownloadController(Controller):
     """
         Serve requests related with users
@@ -12,7 +21,8 @@ class FileUploadDownloadController(Controller):
     def attach_to(self, app):
 
         storage_path = app.file_manager.paths.store
-        service = FileUploadDownloadService(app.updown_auth_manager, storage_path)
+        service = FileUploadDownloadService(app.updown_auth_manager, storage_path,
+                                            app.file_manager)
 
         @app.route(self.route + '/<filepath:path>', method=["GET"])
         def get(filepath):
@@ -20,9 +30,20 @@ class FileUploadDownloadController(Controller):
             file_path = service.get_file_path(filepath, token)
             # https://github.com/kennethreitz/requests/issues/1586
             mimetype = "x-gzip" if filepath.endswith(".tgz") else "auto"
-            return static_file(os.path.basename(file_path),
-                               root=os.path.dirname(file_path),
-                               mimetype=mimetype)
+            etag = _file_etag(file_path)
+            if _check_if_none_match(etag):
+                return _not_modified_response(file_path, etag)
+            if app.file_offload and etag:
+                # The fronting web server sends the file, the signature is already checked
+                return _offload_response(app.file_offload, app.file_offload_prefix,
+                                         storage_path, file_path, mimetype, etag)
+            _check_if_range(file_path, etag)
+            response = static_file(os.path.basename(file_path),
+                                   root=os.path.dirname(file_path),
+                                   mimetype=mimetype)
+            if etag and response.status_code in (200, 206, 304):
+                response.set_header("ETag", etag)
+            return response
 
         @app.route(self.route + '/<filepath:path>', method=["PUT"])
         def put(filepath):
@@ -35,6 +56,75 @@ class FileUploadDownloadController(Controller):
             return
 
 
+def _file_etag(file_path):
+    """ validator of the current contents of the file, used by clients resuming downloads
+    """
+    try:
+        stats = os.stat(file_path)
+    except OSError:
+        return None
+    return '"%x-%x"' % (int(stats.st_mtime * 1000000), stats.st_size)
+
+
+def _check_if_none_match(etag):
+    """ True if the client has the current version of the file. If-None-Match takes
+    precedence over the If-Modified-Since handled by static_file(), that is removed
+    """
+    if_none_match = request.environ.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is None or etag is None:
+        return False
+    request.environ.pop("HTTP_IF_MODIFIED_SINCE", None)
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison, as the GET requests have to use
+    return "*" in candidates or etag in [candidate[2:] if candidate.startswith("W/")
+                                         else candidate for candidate in candidates]
+
+
+def _not_modified_response(file_path, etag):
+    headers = {"ETag": etag, "Last-Modified": _last_modified(file_path)}
+    return HTTPResponse(status=304, headers=headers)
+
+
+def _offload_response(offload, prefix, storage_path, file_path, mimetype, etag):
+    """ empty response with the header that makes the fronting web server send the file,
+    X-Sendfile (Apache, lighttpd) with its path or X-Accel-Redirect (nginx) with the
+    location of the storage, prefix, and its path in the storage
+    """
+    if mimetype == "auto":
+        mimetype = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    headers = {"Content-Type": mimetype,
+               "ETag": etag,
+               "Last-Modified": _last_modified(file_path)}
+    if offload == "x-sendfile":
+        headers["X-Sendfile"] = file_path
+    else:
+        relative_path = os.path.relpath(file_path, storage_path).replace("\\", "/")
+        headers["X-Accel-Redirect"] = "%s/%s" % (prefix.rstrip("/"), urllib.quote(relative_path))
+    return HTTPResponse(body="", status=200, headers=headers)
+
+
+def _last_modified(file_path):
+    return email.utils.formatdate(os.stat(file_path).st_mtime, usegmt=True)
+
+
+def _check_if_range(file_path, etag):
+    """ static_file() serves Range requests but ignores If-Range. If the file changed since
+    the client received the first part, the Range is removed, to send the whole file
+    """
+    if_range = request.environ.get("HTTP_IF_RANGE")
+    if if_range is None or "HTTP_RANGE" not in request.environ:
+        return
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        matches = if_range == etag
+    else:  # A date, compared as the Last-Modified sent by static_file()
+        try:
+            matches = parse_date(if_range) == int(os.stat(file_path).st_mtime)
+        except OSError:
+            matches = False
+    if not matches:
+        del request.environ["HTTP_RANGE"]
+
+
 class ConanFileUpload(FileUpload):
     """Code copied from bottle but removing filename normalizing
     FIXME: Review bottle.FileUpload and analyze possible security or general issues    """
@@ -56,3 +146,18 @@ class ConanFileUpload(FileUpload):
 #         fname = re.sub(r'[^a-zA-Z0-9-_.\s]', '', fname).strip()
 #         fname = re.sub(r'[-\s]+', '-', fname).strip('.-')
         return fname[:255] or 'empty'
+
+    def _copy_file(self, fp, chunk_size=2 ** 16):
+        """ as bottle's one, but computing the md5 of the contents while they are
+        written, so the file is not read again to index its checksum
+        """
+        read, write, offset = self.file.read, fp.write, self.file.tell()
+        checksum = hashlib.md5()
+        while True:
+            buf = read(chunk_size)
+            if not buf:
+                break
+            checksum.update(buf)
+            write(buf)
+        self.file.seek(offset)
+        self.md5 = checksum.hexdigest()
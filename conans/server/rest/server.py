@@ -1,6 +1,7 @@
 import bottle
 from conans.server.rest.api_v1 import ApiV1
 from conans.model.version import Version
+from conans.server.rest.wsgi_servers import SERVER_ADAPTERS
 
 
 class ConanServer(object):
@@ -14,7 +15,8 @@ class ConanServer(object):
 
     def __init__(self, run_port, ssl_enabled, credentials_manager,
                  updown_auth_manager, authorizer, authenticator,
-                 file_manager, server_version, min_client_compatible_version):
+                 file_manager, server_version, min_client_compatible_version,
+                 file_offload=None, file_offload_prefix=None):
 
         assert(isinstance(server_version, Version))
         assert(isinstance(min_client_compatible_version, Version))
@@ -29,11 +31,18 @@ class ConanServer(object):
         self.api_v1.authorizer = authorizer
         self.api_v1.authenticator = authenticator
         self.api_v1.file_manager = file_manager
+        # The files are sent by a fronting web server, if one of FILE_OFFLOAD_MODES
+        self.api_v1.file_offload = file_offload
+        self.api_v1.file_offload_prefix = file_offload_prefix
         self.api_v1.setup()
 
     def run(self, **kwargs):
+        """ param server_mode: one of SERVER_MODES, the other kwargs are the options of its
+        server: threads, workers, request_timeout and shutdown_timeout
+        """
         port = kwargs.pop("port", self.run_port)
         debug_set = kwargs.pop("debug", False)
         host = kwargs.pop("host", "localhost")
+        server = SERVER_ADAPTERS[kwargs.pop("server_mode", "wsgiref")]
         bottle.Bottle.run(self.root_app, host=host,
-                          port=port, debug=debug_set, reloader=False)
+                          port=port, debug=debug_set, reloader=False, server=server, **kwargs)
@@ -0,0 +1,302 @@
+""" Production servers of conan_server, as bottle server adapters. The bottle default one,
+wsgiref, serves a request at a time, so a slow download of a big package blocks every other
+client:
+
+- "threaded": a pool of threads serves the accepted connections
+- "prefork": several processes, each one with a pool of threads, accept the connections
+  of the same listening socket. A worker that dies is replaced
+
+The files are sent with sendfile, when available. Idle connections are closed after
+request_timeout seconds. On SIGTERM or SIGINT the servers stop accepting connections and the
+running requests have shutdown_timeout seconds to finish
+"""
+import Queue
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, ServerHandler
+import bottle
+from conans.errors import ConanException
+from conans.util.log import logger
+
+
+SERVER_MODES = ("wsgiref", "threaded", "prefork")
+DEFAULT_SERVER_MODE = "threaded"
+
+
+SENDFILE_CHUNK = 16 * 1024 * 1024
+
+
+def _get_sendfile():
+    """ returns a function like os.sendfile(out_fd, in_fd, offset, count), that copies the
+    file to the socket in the kernel, os.sendfile itself or the one of the libc in Linux.
+    None if not available
+    """
+    if hasattr(os, "sendfile"):
+        return os.sendfile
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc_sendfile = getattr(libc, "sendfile64", None) or libc.sendfile
+    except (OSError, AttributeError):
+        return None
+    libc_sendfile.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int64),
+                              ctypes.c_size_t]
+    libc_sendfile.restype = ctypes.c_ssize_t
+
+    def sendfile(out_fd, in_fd, offset, count):
+        offset = ctypes.c_int64(offset)
+        sent = libc_sendfile(out_fd, in_fd, ctypes.byref(offset), count)
+        if sent < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        return sent
+    return sendfile
+
+
+_sendfile = _get_sendfile()
+
+
+class _ServerHandler(ServerHandler):
+    """ sends the files returned by the application, wrapped with wsgi.file_wrapper as
+    bottle does with the ones of static_file(), with sendfile, without copying them
+    through the interpreter
+    """
+    def sendfile(self):
+        filelike = getattr(self.result, "filelike", None)
+        if _sendfile is None or not hasattr(filelike, "fileno"):
+            return False
+        try:
+            in_fd = filelike.fileno()
+            offset = filelike.tell()
+            remaining = os.fstat(in_fd).st_size - offset
+        except (IOError, OSError, ValueError):
+            return False
+        content_length = self.headers.get("Content-Length")
+        if content_length is not None:
+            remaining = min(remaining, int(content_length))
+
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        connection = self.request_handler.connection
+        while remaining > 0:
+            try:
+                sent = _sendfile(connection.fileno(), in_fd, offset,
+                                 min(remaining, SENDFILE_CHUNK))
+            except OSError as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+                # The connections have a timeout, so their sockets are non blocking
+                if not select.select([], [connection], [], connection.gettimeout())[1]:
+                    raise socket.timeout("timed out")
+                continue
+            if sent == 0:  # The file was truncated
+                break
+            offset += sent
+            remaining -= sent
+            self.bytes_sent += sent
+        return True
+
+
+class _RequestHandler(WSGIRequestHandler):
+
+    def handle(self):
+        """ as WSGIRequestHandler's one, with the _ServerHandler
+        """
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+
+        if not self.parse_request():  # An error code has been sent, just exit
+            return
+
+        handler = _ServerHandler(self.rfile, self.wfile, self.get_stderr(), self.get_environ())
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+    def log_message(self, format_, *args):
+        logger.debug("%s - %s" % (self.client_address[0], format_ % args))
+
+
+class ThreadPoolWSGIServer(WSGIServer):
+    """ WSGIServer that serves the accepted connections in a pool of threads, started
+    by serve_forever, so the server can be created before forking the workers
+    """
+    request_queue_size = 128  # listen backlog
+
+    def __init__(self, server_address, threads=10, request_timeout=300):
+        WSGIServer.__init__(self, server_address, _RequestHandler)
+        # A non blocking accept, the connection could be taken by another process
+        self.socket.setblocking(0)
+        self.threads = threads
+        self.request_timeout = request_timeout
+        self._connections = Queue.Queue()
+        self._workers = []
+
+    def serve_forever(self, poll_interval=0.5):
+        for _ in range(self.threads):
+            worker = threading.Thread(target=self._serve_connections)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        WSGIServer.serve_forever(self, poll_interval)
+
+    def get_request(self):
+        try:
+            connection, address = self.socket.accept()
+        except socket.error as exc:
+            if exc.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise socket.error("Connection taken by another worker")
+            raise
+        connection.settimeout(self.request_timeout)
+        return connection, address
+
+    def process_request(self, request, client_address):
+        self._connections.put((request, client_address))
+
+    def _serve_connections(self):
+        while True:
+            item = self._connections.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def handle_error(self, request, client_address):
+        logger.error("Error serving %s" % client_address[0])
+        logger.error(traceback.format_exc())
+
+    def stop(self, timeout):
+        """ call after serve_forever returns. Waits up to timeout seconds for the queued
+        and running requests
+        """
+        for _ in self._workers:
+            self._connections.put(None)
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.time()))
+        if any(worker.is_alive() for worker in self._workers):
+            logger.warn("Stopped with requests still running")
+        self.server_close()
+
+
+def _serve(server, shutdown_timeout):
+    """ serves until SIGTERM or SIGINT, then stops gracefully
+    """
+    def shutdown(*_):
+        # shutdown() waits for serve_forever, that is running in this same thread
+        threading.Thread(target=server.shutdown).start()
+    if isinstance(threading.current_thread(), threading._MainThread):
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+    server.serve_forever()
+    server.stop(shutdown_timeout)
+
+
+class ThreadedServer(bottle.ServerAdapter):
+
+    def run(self, handler):
+        server = ThreadPoolWSGIServer((self.host, self.port),
+                                      self.options.get("threads", 10),
+                                      self.options.get("request_timeout", 300))
+        server.set_app(handler)
+        _serve(server, self.options.get("shutdown_timeout", 30))
+
+
+class PreforkServer(bottle.ServerAdapter):
+    """ the master process binds the socket and forks the workers, that serve it
+    """
+    def run(self, handler):
+        if not hasattr(os, "fork"):
+            raise ConanException("The prefork server_mode is not available in this platform, "
+                                 "use the threaded one")
+        server = ThreadPoolWSGIServer((self.host, self.port),
+                                      self.options.get("threads", 10),
+                                      self.options.get("request_timeout", 300))
+        server.set_app(handler)
+        shutdown_timeout = self.options.get("shutdown_timeout", 30)
+        workers = {}
+        stopping = []
+
+        def stop(*_):
+            stopping.append(True)
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            while len(workers) < self.options.get("workers", 4):
+                pid = os.fork()
+                if pid == 0:
+                    self._run_worker(server, shutdown_timeout)
+                workers[pid] = time.time()
+            try:
+                pid, _ = os.wait()
+            except OSError as exc:
+                if exc.errno != errno.EINTR:
+                    raise
+                continue
+            started = workers.pop(pid, None)
+            if started is not None and not stopping:
+                logger.error("Server worker %d died, starting a new one" % pid)
+                if time.time() - started < 1:  # Don't spin if they die when they start
+                    time.sleep(1)
+
+        for pid in workers:
+            _kill(pid, signal.SIGTERM)
+        deadline = time.time() + shutdown_timeout + 1
+        while workers and time.time() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except OSError as exc:
+                if exc.errno == errno.ECHILD:  # All of them finished
+                    workers.clear()
+                continue
+            if pid:
+                workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in workers:
+            _kill(pid, signal.SIGKILL)
+        server.server_close()
+
+    @staticmethod
+    def _run_worker(server, shutdown_timeout):
+        exit_code = 0
+        try:
+            _serve(server, shutdown_timeout)
+        except BaseException:
+            logger.error(traceback.format_exc())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+
+def _kill(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except OSError:  # Already finished
+        pass
+
+
+SERVER_ADAPTERS = {"wsgiref": "wsgiref",
+                   "threaded": ThreadedServer,
+                   "prefork": PreforkServer}
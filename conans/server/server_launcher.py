@@ -49,13 +49,20 @@ class ServerLauncher(object):
 
         file_manager = get_file_manager(server_config, updown_auth_manager=updown_auth_manager)
 
+        self.server_options = {"server_mode": server_config.server_mode,
+                               "threads": server_config.threads,
+                               "workers": server_config.workers,
+                               "request_timeout": server_config.request_timeout,
+                               "shutdown_timeout": server_config.shutdown_timeout}
+
         self.ra = ConanServer(server_config.port, server_config.ssl_enabled,
                               credentials_manager, updown_auth_manager,
                               authorizer, authenticator, file_manager,
-                              Version(SERVER_VERSION), Version(MIN_CLIENT_COMPATIBLE_VERSION))
+                              Version(SERVER_VERSION), Version(MIN_CLIENT_COMPATIBLE_VERSION),
+                              server_config.file_offload, server_config.file_offload_prefix)
 
     def launch(self):
-        self.ra.run(host="0.0.0.0")
+        self.ra.run(host="0.0.0.0", **self.server_options)
 
 
 launcher = ServerLauncher()
@@ -1,18 +1,31 @@
-from conans.errors import RequestErrorException, NotFoundException, ForbiddenException
+from conans.errors import (RequestErrorException, NotFoundException, ForbiddenException,
+                           AuthenticationException)
 from conans.server.store.file_manager import FileManager
 import os
 import jwt
-from conans.util.files import mkdir
+from conans.util.files import mkdir, md5sum
+from conans.server.store.blob_store import BlobStore
+from conans.server.store.checksum_index import ChecksumIndex
 from conans.model.ref import PackageReference
+from conans.info import SearchInfo
 from conans.util.log import logger
 
 
+MAX_METADATA_REFERENCES = 1000
+
+
 class FileUploadDownloadService(object):
     """Handles authorization from token and upload and download files"""
 
-    def __init__(self, updown_auth_manager, base_store_folder):
+    def __init__(self, updown_auth_manager, base_store_folder, file_manager=None):
+        """ param file_manager: FileManager notified of the uploaded files, to keep its
+        search index up to date
+        """
         self.updown_auth_manager = updown_auth_manager
         self.base_store_folder = base_store_folder
+        self._file_manager = file_manager
+        self._checksums = ChecksumIndex(base_store_folder)
+        self._blob_store = BlobStore(base_store_folder, self._checksums)
 
     def get_file_path(self, filepath, token):
         try:
@@ -28,7 +41,8 @@ class FileUploadDownloadService(object):
 
     def put_file(self, file_saver, abs_filepath, token, upload_size):
         """
-        file_saver is an object with the save() method without parameters
+        file_saver is an object with the save() method without parameters, and the md5
+        attribute of the saved contents, if it computes it while saving them
         """
         try:
             encoded_path, filesize, user = self.updown_auth_manager.get_resource_info(token)
@@ -43,8 +57,13 @@ class FileUploadDownloadService(object):
             logger.debug("Put file: %s: %s" % (user, abs_filepath))
             mkdir(os.path.dirname(abs_filepath))
             if os.path.exists(abs_filepath):
-                os.remove(abs_filepath)
+                self._blob_store.remove(abs_filepath)
             file_saver.save(os.path.dirname(abs_filepath))
+            file_md5 = getattr(file_saver, "md5", None) or md5sum(abs_filepath)
+            self._blob_store.add(abs_filepath, file_md5)
+            self._checksums.set(abs_filepath, file_md5)
+            if self._file_manager is not None:
+                self._file_manager.file_uploaded(abs_filepath)
 
         except (jwt.ExpiredSignature, jwt.DecodeError, AttributeError):
             return NotFoundException("File not found")
@@ -101,6 +120,15 @@ class ConanService(object):
                                                             self._auth_user)
         return urls
 
+    def link_conanfile_blobs(self, reference, files_md5s):
+        """Links the files already stored in the server with the same contents
+        :param files_md5s: {filepath: md5}
+        :return {filepath: md5} of the linked files, the rest have to be uploaded"""
+        _validate_conan_reg_filenames(files_md5s.keys())
+        self._authorizer.check_write_conan(self._auth_user, reference)
+        return self._file_manager.link_conanfile_blobs(reference,
+                                                       self._readable_blobs(files_md5s))
+
     def remove_conanfile(self, reference):
         self._authorizer.check_delete_conan(self._auth_user, reference)
         self._file_manager.remove_conanfile(reference)
@@ -144,8 +172,7 @@ class ConanService(object):
         :param package_reference: PackageReference
         :param filesizes: {filepath: bytes}
         :return {filepath: url} """
-        info = self._file_manager.search(str(package_reference.conan), exclude_index=True)
-        if not info:
+        if not self._file_manager.conanfile_exists(package_reference.conan):
             raise NotFoundException("There are no remote conanfiles like %s"
                                     % str(package_reference.conan))
         self._authorizer.check_write_package(self._auth_user, package_reference)
@@ -153,27 +180,108 @@ class ConanService(object):
                                                           filesizes, self._auth_user)
         return urls
 
-    def search(self, pattern=None, ignorecase=True):
+    def link_package_blobs(self, package_reference, files_md5s):
+        """Links the files already stored in the server with the same contents
+        :param package_reference: PackageReference
+        :param files_md5s: {filepath: md5}
+        :return {filepath: md5} of the linked files, the rest have to be uploaded"""
+        _validate_conan_reg_filenames(files_md5s.keys())
+        if not self._file_manager.conanfile_exists(package_reference.conan):
+            raise NotFoundException("There are no remote conanfiles like %s"
+                                    % str(package_reference.conan))
+        self._authorizer.check_write_package(self._auth_user, package_reference)
+        return self._file_manager.link_package_blobs(package_reference,
+                                                     self._readable_blobs(files_md5s))
+
+    def _readable_blobs(self, files_md5s):
+        """Only the files whose contents are already stored in a reference that the user
+        can read can be linked, otherwise the blob of a private reference could be copied
+        to other one, and the response would tell if some contents exist in the server
+        :param files_md5s: {filepath: md5}
+        :return {filepath: md5} of the ones that can be linked"""
+        readable = {}
+        for the_md5 in set(files_md5s.values()):
+            for owner in self._file_manager.blob_owners(the_md5):
+                try:
+                    if isinstance(owner, PackageReference):
+                        self._authorizer.check_read_package(self._auth_user, owner)
+                    else:
+                        self._authorizer.check_read_conan(self._auth_user, owner)
+                except (ForbiddenException, AuthenticationException):
+                    continue
+                readable[the_md5] = True
+                break
+        return {path: the_md5 for path, the_md5 in files_md5s.iteritems()
+                if the_md5 in readable}
+
+    def get_metadata(self, references, package_references):
+        """Gets in a single call the snapshots and download urls of several conanfiles
+        and packages:
+            {str(reference): {"snapshot": {filename: md5}, "urls": {filename: url}}}
+        The value is None for the ones that don't exist. The ones that the user cannot
+        read are not returned, their own requests will ask for authentication
+        """
+        if len(references) + len(package_references) > MAX_METADATA_REFERENCES:
+            raise RequestErrorException("Too many references, the maximum is %d"
+                                        % MAX_METADATA_REFERENCES)
+        for package_reference in package_references:
+            # From the body instead of a route segment, they could point to other folders
+            if any(sep in package_reference.package_id for sep in ("..", "/", "\\")):
+                raise RequestErrorException("Invalid package reference %s"
+                                            % str(package_reference))
+        ret = {}
+        for reference in references:
+            try:
+                self._authorizer.check_read_conan(self._auth_user, reference)
+                snapshot = self._file_manager.get_conanfile_snapshot(reference)
+                urls = self._file_manager.get_download_conanfile_urls(reference,
+                                                                      user=self._auth_user)
+                ret[str(reference)] = {"snapshot": snapshot, "urls": urls}
+            except NotFoundException:
+                ret[str(reference)] = None
+            except ForbiddenException:
+                pass
+        for package_reference in package_references:
+            try:
+                self._authorizer.check_read_package(self._auth_user, package_reference)
+                snapshot = self._file_manager.get_package_snapshot(package_reference)
+                urls = self._file_manager.get_download_package_urls(package_reference,
+                                                                    user=self._auth_user)
+                ret[str(package_reference)] = {"snapshot": snapshot, "urls": urls}
+            except NotFoundException:
+                ret[str(package_reference)] = None
+            except ForbiddenException:
+                pass
+        return ret
+
+    def search(self, pattern=None, ignorecase=True, packages_query=None):
         """ Get all the info about any package
             Attributes:
                 pattern = wildcards like opencv/*
+                packages_query = PackageQuery of the packages to return
         """
-        info = self._file_manager.search(pattern, ignorecase)
+        return SearchInfo(self.iter_search(pattern, ignorecase, packages_query))
 
-        # Filter out restricted items
-        for conan_ref in info.keys():
+    def iter_search(self, pattern=None, ignorecase=True, packages_query=None, cursor=None):
+        """ Yields the (ConanFileReference, {package_id: ConanInfo}) of the search, ordered
+        by str(reference), as they are read
+            Attributes:
+                cursor = str of the last reference already returned, to get the next ones
+        """
+        for conan_ref, packages in self._file_manager.iter_search(
+                pattern, ignorecase, packages_query=packages_query, cursor=cursor):
+            # Filter out restricted items
             try:
                 self._authorizer.check_read_conan(self._auth_user, conan_ref)
-                conan_search_info = info[conan_ref]
-                for package_id in conan_search_info.keys():
-                    package_ref = PackageReference(conan_ref, package_id)
-                    try:
-                        self._authorizer.check_read_package(self._auth_user, package_ref)
-                    except ForbiddenException:
-                        conan_search_info.pop(package_id)
             except ForbiddenException:
-                info.pop(conan_ref)
-        return info
+                continue
+            for package_id in packages.keys():
+                package_ref = PackageReference(conan_ref, package_id)
+                try:
+                    self._authorizer.check_read_package(self._auth_user, package_ref)
+                except ForbiddenException:
+                    packages.pop(package_id)
+            yield conan_ref, packages
 
 
 def _validate_conan_reg_filenames(files):
@@ -190,6 +298,6 @@ def _validate_conan_reg_filenames(files):
 
     # All contents in same directory (from conan_id)
     for filename in files:
-        if ".." in filename:
+        if ".." in filename or os.path.isabs(filename):
             # Log something
             raise RequestErrorException(message)
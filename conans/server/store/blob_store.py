@@ -0,0 +1,86 @@
+""" Content addressed storage of the uploaded files. Each file uploaded to the server is
+also hard linked as <store>/.blobs/<md5[:2]>/<md5>, so when the same contents are uploaded
+to another reference, like a package promoted from testing to stable, the client only
+sends the md5 and the blob is linked in the new path, without transferring the bytes.
+A blob is removed with the last file linked to it
+"""
+import os
+import re
+from conans.util.files import md5sum, mkdir, rmdir
+from conans.util.log import logger
+
+
+BLOBS_FOLDER = ".blobs"
+_MD5_RE = re.compile("^[0-9a-f]{32}$")
+
+
+class BlobStore(object):
+
+    def __init__(self, base_storage_path, checksums=None):
+        """ param checksums: ChecksumIndex to get the md5 of the stored files from
+        """
+        self._blobs_folder = os.path.join(base_storage_path, BLOBS_FOLDER)
+        self._md5 = checksums.md5 if checksums is not None else md5sum
+
+    @property
+    def enabled(self):
+        # Blobs are hard links, python 2 doesn't support them in Windows
+        return hasattr(os, "link")
+
+    def add(self, path, the_md5=None):
+        """ stores the file in path as a blob. If there is already a blob with the same
+        contents, the file is replaced with a link to it
+        param the_md5: md5 of the file, if already known
+        """
+        if not self.enabled:
+            return
+        blob_path = self._blob_path(the_md5 or self._md5(path))
+        if os.path.exists(blob_path):
+            if not os.path.samefile(blob_path, path):
+                tmp_path = path + ".blob"
+                os.link(blob_path, tmp_path)
+                os.rename(tmp_path, path)
+            return
+        mkdir(os.path.dirname(blob_path))
+        try:
+            os.link(path, blob_path)
+        except OSError as e:  # Stored at the same time by other upload
+            logger.debug("Blob %s not stored: %s" % (blob_path, str(e)))
+
+    def link(self, md5, path):
+        """ links the blob with the given md5 in path
+        return: False if there is no such blob
+        """
+        if not self.enabled or not _MD5_RE.match(md5):
+            return False
+        blob_path = self._blob_path(md5)
+        if not os.path.exists(blob_path):
+            return False
+        mkdir(os.path.dirname(path))
+        if os.path.exists(path):
+            self.remove(path)
+        try:
+            os.link(blob_path, path)
+        except OSError as e:  # Removed at the same time by other request
+            logger.debug("Blob %s not linked: %s" % (blob_path, str(e)))
+            return False
+        return True
+
+    def remove(self, path):
+        """ removes the file, and its blob if it was the only file linked to it
+        """
+        if self.enabled and os.stat(path).st_nlink == 2:
+            blob_path = self._blob_path(self._md5(path))
+            if os.path.exists(blob_path) and os.path.samefile(blob_path, path):
+                os.remove(blob_path)
+        os.remove(path)
+
+    def remove_folder(self, folder):
+        if self.enabled:
+            for root, _, files in os.walk(folder):
+                for filename in files:
+                    self.remove(os.path.join(root, filename))
+        rmdir(folder)
+
+    def _blob_path(self, md5):
+        return os.path.join(self._blobs_folder, md5[:2], md5)
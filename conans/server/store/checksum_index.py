@@ -0,0 +1,112 @@
+""" Persistent index of the md5 of the stored files, so the snapshots don't hash the
+files, some of them of several GB, in every request. The md5 of an uploaded file is
+computed while it is received and stored here. Each entry keeps the size and mtime of
+the file, if they changed the file is hashed again. It is just a cache, if the database
+is not available the md5 is computed as before
+"""
+import os
+import sqlite3
+import threading
+from conans.util.files import md5sum
+from conans.util.log import logger
+
+
+CHECKSUMS_DB = ".checksums.db"
+CHECKSUMS_TABLE = "checksums"
+
+
+class ChecksumIndex(object):
+
+    def __init__(self, base_storage_path):
+        self._base_storage_path = base_storage_path
+        self._dbfile = os.path.join(base_storage_path, CHECKSUMS_DB)
+        self._local = threading.local()  # sqlite connections can't be shared by threads
+
+    def _connection(self):
+        """ created the first time it is used, so a store that never serves snapshots,
+        as the local one of the client, doesn't have a database
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._dbfile, timeout=10)
+            connection.text_factory = str
+            connection.execute("create table if not exists %s (path TEXT PRIMARY KEY, "
+                               "size INTEGER, mtime REAL, md5 TEXT)" % CHECKSUMS_TABLE)
+            connection.execute("create index if not exists %s_md5 on %s (md5)"
+                               % (CHECKSUMS_TABLE, CHECKSUMS_TABLE))
+            connection.commit()
+            self._local.connection = connection
+        return connection
+
+    def _key(self, path):
+        return os.path.relpath(path, self._base_storage_path).replace("\\", "/")
+
+    def md5(self, path):
+        """ the md5 of the file, from the index if it didn't change, else computed and
+        stored
+        """
+        stats = os.stat(path)
+        try:
+            row = self._connection().execute("select size, mtime, md5 from %s where path=?"
+                                             % CHECKSUMS_TABLE, (self._key(path), )).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("Checksum index not available: %s" % str(e))
+            return md5sum(path)
+        if row is not None and row[0] == stats.st_size and row[1] == stats.st_mtime:
+            return row[2]
+        the_md5 = md5sum(path)
+        self.set(path, the_md5)
+        return the_md5
+
+    def set(self, path, the_md5):
+        """ stores the md5 of the file, that has to be already in its final location
+        """
+        stats = os.stat(path)
+        try:
+            connection = self._connection()
+            connection.execute("insert or replace into %s (path, size, mtime, md5) "
+                               "values (?, ?, ?, ?)" % CHECKSUMS_TABLE,
+                               (self._key(path), stats.st_size, stats.st_mtime, the_md5))
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.debug("Checksum of %s not stored: %s" % (path, str(e)))
+
+    def paths(self, the_md5):
+        """ the stored files with the given md5, only the indexed ones that didn't change
+        """
+        if not os.path.exists(self._dbfile):  # Nothing indexed yet
+            return []
+        try:
+            rows = self._connection().execute("select path, size, mtime from %s where md5=?"
+                                              % CHECKSUMS_TABLE, (the_md5, )).fetchall()
+        except sqlite3.Error as e:
+            logger.debug("Checksum index not available: %s" % str(e))
+            return []
+        ret = []
+        for key, size, mtime in rows:
+            path = os.path.join(self._base_storage_path, key)
+            try:
+                stats = os.stat(path)
+            except OSError:
+                continue
+            if stats.st_size == size and stats.st_mtime == mtime:
+                ret.append(path)
+        return ret
+
+    def remove(self, path):
+        self._delete("path=?", (self._key(path), ))
+
+    def remove_folder(self, folder):
+        key = self._key(folder)
+        prefix = key + "/"
+        self._delete("path=? or substr(path, 1, ?)=?", (key, len(prefix), prefix))
+
+    def _delete(self, condition, params):
+        if not os.path.exists(self._dbfile):  # Nothing indexed yet
+            return
+        try:
+            connection = self._connection()
+            connection.execute("delete from %s where %s" % (CHECKSUMS_TABLE, condition), params)
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.debug("Checksums not removed: %s" % str(e))
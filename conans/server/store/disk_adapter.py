@@ -2,7 +2,9 @@
 import os
 from conans.errors import NotFoundException
 from conans.server.store.file_manager import StorageAdapter
-from conans.util.files import relative_dirs, rmdir, load, md5sum
+from conans.server.store.blob_store import BlobStore
+from conans.server.store.checksum_index import ChecksumIndex
+from conans.util.files import relative_dirs, load
 from conans.util.files import path_exists
 
 
@@ -17,6 +19,8 @@ class DiskAdapter(StorageAdapter):
         # URLs are generated removing this base path
         self.base_storage_path = base_storage_path
         self.updown_auth_manager = updown_auth_manager
+        self._checksums = ChecksumIndex(base_storage_path)
+        self._blob_store = BlobStore(base_storage_path, self._checksums)
 
     def get_download_urls(self, paths, user=None):
         '''Get the urls for download the specified files using s3 signed request.
@@ -61,19 +65,39 @@ class DiskAdapter(StorageAdapter):
         if files_subset is not None:
             paths = set(paths).intersection(set(files_subset))
         abs_paths = [os.path.join(absolute_path, relpath) for relpath in paths]
-        return {filepath: md5sum(filepath) for filepath in abs_paths}
+        return {filepath: self._checksums.md5(filepath) for filepath in abs_paths}
+
+    def link_blobs(self, paths_md5s):
+        '''Link the already stored files with the same contents in the given paths.
+        returns the list of linked paths
+
+        paths_md5s is a dict of {path: md5} '''
+        assert isinstance(paths_md5s, dict)
+        linked = []
+        for filepath, the_md5 in paths_md5s.iteritems():
+            if self._blob_store.link(the_md5, filepath):
+                self._checksums.set(filepath, the_md5)
+                linked.append(filepath)
+        return linked
+
+    def blob_paths(self, the_md5):
+        '''returns the paths of the stored files with those contents, whose blob can be
+        linked'''
+        return self._checksums.paths(the_md5) if self._blob_store.enabled else []
 
     def delete_folder(self, path):
         '''Delete folder from disk. Path already contains base dir'''
         if not path_exists(path, self.base_storage_path):
             raise NotFoundException()
-        rmdir(path)
+        self._blob_store.remove_folder(path)
+        self._checksums.remove_folder(path)
 
     def delete_file(self, path):
         '''Delete files from bucket. Path already contains base dir'''
         if not path_exists(path, self.base_storage_path):
             raise NotFoundException()
-        os.remove(path)
+        self._blob_store.remove(path)
+        self._checksums.remove(path)
 
     # ######### FOR SEARCH
     def list_folder_subdirs(self, basedir="", level=None):
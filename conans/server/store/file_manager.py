@@ -1,4 +1,4 @@
-from conans.paths import SimplePaths, CONANINFO
+from conans.paths import SimplePaths, CONANINFO, CONAN_MANIFEST, EXPORT_FOLDER, PACKAGES_FOLDER
 from conans.model.ref import ConanFileReference, PackageReference
 import os
 from conans.info import SearchInfo
@@ -7,7 +7,7 @@ from conans.model.info import ConanInfo
 
 from abc import ABCMeta, abstractmethod
 from conans.util.log import logger
-from conans.errors import ConanException
+from conans.errors import ConanException, NotFoundException
 import traceback
 
 
@@ -30,6 +30,15 @@ class StorageAdapter:
     def delete_folder(self, path):
         raise NotImplementedError()
 
+    def link_blobs(self, paths_md5s):
+        """Adapters without content addressed storage don't link any file,
+        so all of them are uploaded"""
+        return []
+
+    def blob_paths(self, the_md5):
+        """The stored files with those contents, none without content addressed storage"""
+        return []
+
     # ######### FOR SEARCH
     @abstractmethod
     def list_folder_subdirs(self, basedir=None, level=None):
@@ -96,10 +105,74 @@ class FileManager(object):
         assert isinstance(filesizes, dict)
         return self._get_upload_urls(self.paths.package(package_reference), filesizes, user)
 
+    # ############ BLOBS
+    def link_conanfile_blobs(self, reference, files_md5s):
+        """
+        :param reference: ConanFileReference
+        :param files_md5s: {filepath: md5}
+        :return {filepath: md5} of the files already in the storage, that are linked """
+        assert isinstance(reference, ConanFileReference)
+        assert isinstance(files_md5s, dict)
+        return self._link_blobs(self.paths.export(reference), files_md5s)
+
+    def link_package_blobs(self, package_reference, files_md5s):
+        """
+        :param reference: PackageReference
+        :param files_md5s: {filepath: md5}
+        :return {filepath: md5} of the files already in the storage, that are linked """
+        assert isinstance(package_reference, PackageReference)
+        assert isinstance(files_md5s, dict)
+        return self._link_blobs(self.paths.package(package_reference), files_md5s)
+
+    def blob_owners(self, the_md5):
+        """ the references whose files have those contents, so the Service can check
+        that the blob is readable before linking it
+        :return list of ConanFileReference (exports) and PackageReference
+        """
+        owners = []
+        for path in self._file_adapter.blob_paths(the_md5):
+            parts = os.path.relpath(path, self.paths.store).split(os.sep)
+            try:
+                if len(parts) > 5 and parts[4] == EXPORT_FOLDER:
+                    owners.append(ConanFileReference(*parts[:4]))
+                elif len(parts) > 6 and parts[4] == PACKAGES_FOLDER:
+                    owners.append(PackageReference(ConanFileReference(*parts[:4]), parts[5]))
+            except ConanException:  # Not a reference folder
+                pass
+        return owners
+
+    # ######### UPLOAD
+    def file_uploaded(self, path):
+        """ Updates the search index when the upload of a conanfile or a package
+        completes. The new clients upload the manifest last, the older ones upload the
+        conaninfo.txt of the packages after it, so the package is updated with either
+        param path: absolute path of the uploaded file
+        """
+        if not self._search_engine:
+            return
+        parts = os.path.relpath(path, self.paths.store).split(os.sep)
+        try:
+            if len(parts) == 6 and parts[4] == EXPORT_FOLDER and parts[5] == CONAN_MANIFEST:
+                self._search_engine.update_conanfile(ConanFileReference(*parts[:4]))
+            elif (len(parts) == 7 and parts[4] == PACKAGES_FOLDER and
+                  parts[6] in (CONAN_MANIFEST, CONANINFO)):
+                package_reference = PackageReference(ConanFileReference(*parts[:4]), parts[5])
+                info_path = os.path.join(self.paths.package(package_reference), CONANINFO)
+                try:
+                    conaninfo = self._file_adapter.get_file(info_path)
+                except NotFoundException:  # Still to be uploaded, it will update it
+                    return
+                self._search_engine.update_package(package_reference, conaninfo)
+        except Exception as exc:
+            logger.error("Search index not updated with %s: %s" % (path, str(exc)))
+
     # ######### DELETE
     def remove_conanfile(self, reference):
         assert isinstance(reference, ConanFileReference)
-        return self._file_adapter.delete_folder(self.paths.conan(reference))
+        ret = self._file_adapter.delete_folder(self.paths.conan(reference))
+        if self._search_engine:
+            self._search_engine.remove_conanfile(reference)
+        return ret
 
     def remove_packages(self, reference, package_ids_filter):
         assert isinstance(reference, ConanFileReference)
@@ -108,11 +181,15 @@ class FileManager(object):
         if not package_ids_filter:  # Remove all packages
             packages_folder = self.paths.packages(reference)
             self._file_adapter.delete_folder(packages_folder)
+            if self._search_engine:
+                self._search_engine.remove_packages(reference)
         else:
             for package_id in package_ids_filter:
                 package_ref = PackageReference(reference, package_id)
                 package_folder = self.paths.package(package_ref)
                 self._file_adapter.delete_folder(package_folder)
+                if self._search_engine:
+                    self._search_engine.remove_packages(reference, [package_id])
 
         return
 
@@ -129,26 +206,67 @@ class FileManager(object):
             self._file_adapter.delete_file(path)
 
     # ######### SEARCH
-    def search(self, pattern=None, ignorecase=True, exclude_index=False):
+    def search(self, pattern=None, ignorecase=True, exclude_index=False, packages_query=None):
         """ Get all an info dict from your exported conans
         param paths: ConanPaths object
         param pattern: these could be conan_reference or wildcards, e.g., "opencv/*"
+        param packages_query: PackageQuery, if given only the matching packages and their
+        conans are returned
+        """
+        return SearchInfo(self.iter_search(pattern, ignorecase, exclude_index, packages_query))
+
+    def iter_search(self, pattern=None, ignorecase=True, exclude_index=False,
+                    packages_query=None, cursor=None):
+        """ Same as search, but yields the (ConanFileReference, {package_id: ConanInfo})
+        ordered by str(reference) as they are read, so the results don't need to be held
+        in memory
+        param cursor: str of the last reference already returned, the search continues after it
         """
         if not self._search_engine or exclude_index:
-            result = SearchInfo()
-            conans = self._exported_conans(pattern, ignorecase)
-            for conan_reference in conans:
-                result[conan_reference] = self._single_conan_search(conan_reference)
-        else:
-            # We have a quick index for search conanfiles
-            try:
-                return self._search_engine.search_conanfiles(pattern)[1]
-            except Exception as exc:
-                logger.error(exc)
-                logger.error(traceback.format_exc())
-                raise ConanException("Something went bad with the search. Please try again later.")
+            return self._iter_storage_search(pattern, ignorecase, packages_query, cursor)
+        # We have a quick index for search conanfiles
+        return self._iter_index_search(pattern, ignorecase, packages_query, cursor)
+
+    def _iter_storage_search(self, pattern, ignorecase, packages_query, cursor):
+        conans = sorted(self._exported_conans(pattern, ignorecase), key=str)
+        for conan_reference in conans:
+            if cursor and str(conan_reference) <= cursor:
+                continue
+            packages = self._single_conan_search(conan_reference)
+            if packages_query:
+                packages = {package_id: conan_info
+                            for package_id, conan_info in packages.iteritems()
+                            if packages_query.matches(conan_info)}
+                if not packages:
+                    continue
+            yield conan_reference, packages
+
+    def _iter_index_search(self, pattern, ignorecase, packages_query, cursor):
+        try:
+            for item in self._search_engine.iter_conanfiles(pattern, ignorecase,
+                                                            packages_query, cursor):
+                yield item
+        except Exception as exc:
+            logger.error(exc)
+            logger.error(traceback.format_exc())
+            raise ConanException("Something went bad with the search. Please try again later.")
+
+    def conanfile_exists(self, reference):
+        """ True if the conanfile has been uploaded, without searching its packages
+        """
+        assert isinstance(reference, ConanFileReference)
+        if self._search_engine:
+            return self._search_engine.conanfile_exists(reference)
+        return bool(self._exported_conans(str(reference), ignorecase=False))
 
-        return result
+    def rebuild_search_index(self):
+        """ Fills the search index from the storage
+        returns the number of indexed conanfiles
+        """
+        conans = [(conan_reference, dict(self._conan_infos(conan_reference)))
+                  for conan_reference in self._exported_conans()]
+        self._search_engine.rebuild(conans)
+        return len(conans)
 
     def _exported_conans(self, pattern=None, ignorecase=True):
         """ Returns a list of exported ConanFileReference
@@ -182,20 +300,27 @@ class FileManager(object):
         param conan_ref: ConanFileReference object
         """
         result = {}
+        for package_id, conan_info_content in self._conan_infos(conan_ref):
+            try:
+                result[package_id] = ConanInfo.loads(conan_info_content)
+            except Exception:
+                logger.error("Package %s:%s has an invalid ConanInfo" % (str(conan_ref),
+                                                                        package_id))
+        return result
+
+    def _conan_infos(self, conan_ref):
+        """ Yields the (package_id, conaninfo.txt contents) of the packages of conan_ref
+        """
         packages_path = self.paths.packages(conan_ref)
         subdirs = self._file_adapter.list_folder_subdirs(packages_path, level=1)
         for package_id in subdirs:
+            package_reference = PackageReference(conan_ref, package_id)
+            info_path = os.path.join(self.paths.package(package_reference), CONANINFO)
             try:
-                package_reference = PackageReference(conan_ref, package_id)
-                info_path = os.path.join(self.paths.package(package_reference), CONANINFO)
-                conan_info_content = self._file_adapter.get_file(info_path)
-                conan_vars_info = ConanInfo.loads(conan_info_content)
-                result[package_id] = conan_vars_info
+                yield package_id, self._file_adapter.get_file(info_path)
             except Exception:
                 logger.error("Package %s has not ConanInfo file" % str(package_reference))
 
-        return result
-
     # ############ INTERNAL METHODS
     def _get_snapshot_of_files(self, relative_path):
         snapshot = self._file_adapter.get_snapshot(relative_path)
@@ -219,6 +344,15 @@ class FileManager(object):
         urls = self._relativize_keys(urls, relative_path)
         return urls
 
+    def _link_blobs(self, relative_path, files_md5s):
+        abs_paths = {}
+        for path, the_md5 in files_md5s.iteritems():
+            abs_paths[os.path.join(relative_path, path)] = the_md5
+        linked = self._file_adapter.link_blobs(abs_paths)
+        for path in linked:  # Not uploaded, but completed as well
+            self.file_uploaded(path)
+        return self._relativize_keys({path: abs_paths[path] for path in linked}, relative_path)
+
     def _relativize_keys(self, the_dict, basepath):
         """Relativize the keys in the dict relative to basepath"""
         ret = {}
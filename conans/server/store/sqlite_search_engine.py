@@ -0,0 +1,224 @@
+""" Search engine of conan_server, an index in SQLite of the conanfiles and the conaninfo.txt
+of their packages, kept up to date by the FileManager when they are uploaded or removed.
+The searches don't walk the storage nor read the packages files. It can be rebuilt from
+the storage, with the server stopped:
+
+    python -m conans.server.store.sqlite_search_engine [storage_folder]
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from conans.info import SearchInfo
+from conans.model.info import ConanInfo
+from conans.model.package_query import package_properties
+from conans.model.ref import ConanFileReference
+from conans.util.log import logger
+
+
+SEARCH_DB = ".search.db"
+CONANS_TABLE = "conans"
+PACKAGES_TABLE = "packages"
+PROPERTIES_TABLE = "package_properties"
+
+
+class SQLiteSearchEngine(object):
+
+    def __init__(self, dbfile):
+        self._dbfile = dbfile
+        self._local = threading.local()  # sqlite connections can't be shared by threads
+        connection = self._connection()
+        # The streamed searches read while the uploads write, without blocking them
+        connection.execute("pragma journal_mode=wal")
+        tables = [row[0] for row in connection.execute("select name from sqlite_master "
+                                                       "where type = 'table'")]
+        # New, or from a version without some table, it has to be filled from the storage
+        self.needs_rebuild = PROPERTIES_TABLE not in tables
+        connection.execute("create table if not exists %s (reference TEXT PRIMARY KEY)"
+                           % CONANS_TABLE)
+        connection.execute("create table if not exists %s (reference TEXT, package_id TEXT, "
+                           "conaninfo TEXT, PRIMARY KEY (reference, package_id))"
+                           % PACKAGES_TABLE)
+        # The settings, options and requirements of the packages, for the package queries
+        connection.execute("create table if not exists %s (reference TEXT, package_id TEXT, "
+                           "field TEXT, value TEXT)" % PROPERTIES_TABLE)
+        connection.execute("create index if not exists %s_package on %s (reference, "
+                           "package_id)" % (PROPERTIES_TABLE, PROPERTIES_TABLE))
+        connection.execute("create index if not exists %s_field on %s (field, value)"
+                           % (PROPERTIES_TABLE, PROPERTIES_TABLE))
+        connection.commit()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._dbfile, timeout=10)
+            connection.text_factory = str
+            self._local.connection = connection
+        return connection
+
+    def search_conanfiles(self, pattern=None, ignorecase=True, packages_query=None):
+        """ param pattern: wildcards like the ones of fnmatch, e.g. "opencv/*"
+        param packages_query: PackageQuery, if given only the matching packages and their
+        conanfiles are returned
+        returns (number of conanfiles, SearchInfo)
+        """
+        result = SearchInfo(self.iter_conanfiles(pattern, ignorecase, packages_query))
+        return len(result), result
+
+    def iter_conanfiles(self, pattern=None, ignorecase=True, packages_query=None, cursor=None):
+        """ yields (ConanFileReference, {package_id: ConanInfo}) ordered by the reference,
+        reading the rows as they are consumed
+        param cursor: the last reference already returned, only the following ones are yielded
+        """
+        join = "join" if packages_query else "left join"
+        query = ("select c.reference, p.package_id, p.conaninfo from %s c %s %s p "
+                 "on p.reference = c.reference" % (CONANS_TABLE, join, PACKAGES_TABLE))
+        conditions = []
+        params = []
+        if pattern:
+            pattern = pattern.replace("[!", "[^")  # fnmatch negation to GLOB one
+            if ignorecase:
+                conditions.append("lower(c.reference) glob lower(?)")
+            else:
+                conditions.append("c.reference glob ?")
+            params.append(pattern)
+        if packages_query:
+            conditions.append(self._query_condition(packages_query.tree, params))
+        if cursor:
+            conditions.append("c.reference > ?")
+            params.append(cursor)
+        if conditions:
+            query += " where " + " and ".join(conditions)
+        query += " order by c.reference"
+        current, packages = None, None
+        for reference, package_id, conaninfo in self._connection().execute(query, params):
+            if reference != current:
+                if current is not None:
+                    yield ConanFileReference.loads(current), packages
+                current, packages = reference, {}
+            if package_id is not None:
+                try:
+                    packages[package_id] = ConanInfo.loads(conaninfo)
+                except Exception:
+                    logger.error("Package %s:%s has an invalid ConanInfo" % (reference,
+                                                                            package_id))
+        if current is not None:
+            yield ConanFileReference.loads(current), packages
+
+    def _query_condition(self, node, params):
+        """ the SQL condition of the PackageQuery tree, over the package p
+        """
+        if node[0] in ("and", "or"):
+            return "(%s %s %s)" % (self._query_condition(node[1], params), node[0],
+                                   self._query_condition(node[2], params))
+        operator, field, pattern = node
+        params.extend([field, pattern.replace("[!", "[^")])
+        condition = ("exists (select 1 from %s q where q.reference = p.reference and "
+                     "q.package_id = p.package_id and q.field = ? and q.value glob ?)"
+                     % PROPERTIES_TABLE)
+        return condition if operator == "=" else "not " + condition
+
+    def conanfile_exists(self, reference):
+        row = self._connection().execute("select 1 from %s where reference = ?"
+                                         % CONANS_TABLE, (str(reference), )).fetchone()
+        return row is not None
+
+    def update_conanfile(self, reference):
+        self._execute([("insert or ignore into %s (reference) values (?)" % CONANS_TABLE,
+                        (str(reference), ))])
+
+    def update_package(self, package_reference, conaninfo):
+        """ param conaninfo: contents of the conaninfo.txt of the package
+        """
+        reference = str(package_reference.conan)
+        statements = [("insert or ignore into %s (reference) values (?)" % CONANS_TABLE,
+                       (reference, ))]
+        statements.extend(_package_statements(reference, package_reference.package_id,
+                                              conaninfo))
+        self._execute(statements)
+
+    def remove_conanfile(self, reference):
+        self._execute([("delete from %s where reference = ?" % table, (str(reference), ))
+                       for table in (PROPERTIES_TABLE, PACKAGES_TABLE, CONANS_TABLE)])
+
+    def remove_packages(self, reference, package_ids=None):
+        """ param package_ids: the ones to remove, all if None
+        """
+        if package_ids is None:
+            self._execute([("delete from %s where reference = ?" % table, (str(reference), ))
+                           for table in (PROPERTIES_TABLE, PACKAGES_TABLE)])
+        else:
+            self._execute([("delete from %s where reference = ? and package_id = ?"
+                            % table, (str(reference), package_id))
+                           for package_id in package_ids
+                           for table in (PROPERTIES_TABLE, PACKAGES_TABLE)])
+
+    def rebuild(self, conans):
+        """ replaces the whole index
+        param conans: iterable of (ConanFileReference, {package_id: conaninfo})
+        """
+        statements = [("delete from %s" % table, ())
+                      for table in (PROPERTIES_TABLE, PACKAGES_TABLE, CONANS_TABLE)]
+        for reference, packages in conans:
+            statements.append(("insert or ignore into %s (reference) values (?)"
+                               % CONANS_TABLE, (str(reference), )))
+            for package_id, conaninfo in packages.iteritems():
+                statements.extend(_package_statements(str(reference), package_id, conaninfo))
+        self._execute(statements)
+        self.needs_rebuild = False
+
+    def _execute(self, statements):
+        """ runs the statements in a single transaction
+        """
+        connection = self._connection()
+        try:
+            for statement, params in statements:
+                connection.execute(statement, params)
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+
+
+def _package_statements(reference, package_id, conaninfo):
+    """ the statements that store the package and its properties, replacing the previous
+    ones
+    """
+    statements = [("insert or replace into %s (reference, package_id, conaninfo) "
+                   "values (?, ?, ?)" % PACKAGES_TABLE, (reference, package_id, conaninfo)),
+                  ("delete from %s where reference = ? and package_id = ?" % PROPERTIES_TABLE,
+                   (reference, package_id))]
+    try:
+        properties = package_properties(ConanInfo.loads(conaninfo))
+    except Exception:
+        logger.error("Package %s:%s has an invalid ConanInfo" % (reference, package_id))
+        properties = []
+    for field, value in properties:
+        statements.append(("insert into %s (reference, package_id, field, value) "
+                           "values (?, ?, ?, ?)" % PROPERTIES_TABLE,
+                           (reference, package_id, field, value)))
+    return statements
+
+
+def main(args=None):
+    from conans.paths import SimplePaths
+    from conans.server.conf import ConanServerConfigParser
+    from conans.server.store.disk_adapter import DiskAdapter
+    from conans.server.store.file_manager import FileManager
+    parser = argparse.ArgumentParser(description="Rebuilds the search index of conan_server "
+                                                 "from the storage")
+    parser.add_argument("storage", nargs="?", help="Storage folder, the one of the server.conf "
+                                                   "by default")
+    args = parser.parse_args(args)
+    storage = args.storage
+    if not storage:
+        storage = ConanServerConfigParser(os.path.expanduser("~")).disk_storage_path
+    search_engine = SQLiteSearchEngine(os.path.join(storage, SEARCH_DB))
+    file_manager = FileManager(SimplePaths(storage), DiskAdapter("", storage, None),
+                               search_engine)
+    count = file_manager.rebuild_search_index()
+    print("Search index rebuilt with %d conanfiles" % count)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import unittest
 from conans.util.files import save
 import os
 from conans.server.conf import ConanServerConfigParser
+from conans.errors import ConanException
 from datetime import timedelta
 from conans.test.utils.test_files import temp_folder
 
@@ -67,3 +68,43 @@ class ServerConfTest(unittest.TestCase):
         self.assertEquals(config.read_permissions, [("*/*@*/*", "*"),
                                                     ("openssl/2.0.1@lasote/testing", "pepe")])
         self.assertEquals(config.users, {"lasote": "lasotepass", "pepe2": "pepepass2"})
+
+    def test_server_mode(self):
+        config = ConanServerConfigParser(self.file_path, environment=self.environ)
+        self.assertEquals(config.server_mode, "threaded")
+        self.assertEquals(config.threads, 10)
+        self.assertEquals(config.workers, 4)
+        self.assertEquals(config.request_timeout, 300)
+        self.assertEquals(config.shutdown_timeout, 30)
+
+        self.environ["CONAN_SERVER_MODE"] = "prefork"
+        self.environ["CONAN_SERVER_WORKERS"] = "8"
+        self.environ["CONAN_SHUTDOWN_TIMEOUT"] = "0"
+        config = ConanServerConfigParser(self.file_path, environment=self.environ)
+        self.assertEquals(config.server_mode, "prefork")
+        self.assertEquals(config.workers, 8)
+        self.assertEquals(config.shutdown_timeout, 0)
+
+        self.environ["CONAN_SERVER_MODE"] = "gunicorn"
+        self.environ["CONAN_SERVER_THREADS"] = "0"
+        config = ConanServerConfigParser(self.file_path, environment=self.environ)
+        with self.assertRaisesRegexp(ConanException, "Invalid server_mode"):
+            config.server_mode
+        with self.assertRaisesRegexp(ConanException, "Invalid threads"):
+            config.threads
+
+    def test_file_offload(self):
+        config = ConanServerConfigParser(self.file_path, environment=self.environ)
+        self.assertIsNone(config.file_offload)
+        self.assertEquals(config.file_offload_prefix, "/conan_storage")
+
+        self.environ["CONAN_FILE_OFFLOAD"] = "X-Accel-Redirect"
+        self.environ["CONAN_FILE_OFFLOAD_PREFIX"] = "/internal"
+        config = ConanServerConfigParser(self.file_path, environment=self.environ)
+        self.assertEquals(config.file_offload, "x-accel-redirect")
+        self.assertEquals(config.file_offload_prefix, "/internal")
+
+        self.environ["CONAN_FILE_OFFLOAD"] = "x-reproxy-url"
+        config = ConanServerConfigParser(self.file_path, environment=self.environ)
+        with self.assertRaisesRegexp(ConanException, "Invalid file_offload"):
+            config.file_offload
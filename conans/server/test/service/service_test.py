@@ -2,16 +2,19 @@ import unittest
 from conans.model.ref import ConanFileReference, PackageReference
 from conans.server.service.service import ConanService, FileUploadDownloadService
 from conans.paths import CONAN_MANIFEST, CONANINFO, SimplePaths
-from conans.util.files import save_files, save, mkdir, load, md5sum
+from conans.util.files import save_files, save, mkdir, load, md5sum, md5
 from conans.server.service.authorize import BasicAuthorizer
 import os
 from conans.errors import NotFoundException, RequestErrorException
 from conans.test.utils.test_files import hello_source_files
 from conans.server.store.disk_adapter import DiskAdapter
+from conans.server.store.checksum_index import ChecksumIndex
+from conans.server.store.blob_store import BlobStore
 from conans.server.store.file_manager import FileManager
 from conans.server.crypto.jwt.jwt_updown_manager import JWTUpDownAuthManager
 from datetime import timedelta
 from time import sleep
+from mock import patch
 from conans.model.info import ConanInfo
 from conans.model.manifest import FileTreeManifest
 from conans.test.utils.test_files import temp_folder
@@ -71,6 +74,34 @@ class FileUploadDownloadServiceTest(unittest.TestCase):
         self.assertRaises(RequestErrorException, self.service.put_file, file_saver,
                           self.absolute_file_path, token, len(self.content) + 1)
 
+    def test_checksum_index(self):
+        """ the md5 of the uploaded files is indexed, the snapshots don't hash them again
+        while they don't change
+        """
+        token = self.updown_auth_manager.get_token_for(self.relative_file_path,
+                                                       "pepe", len(self.content))
+        file_saver = MockFileSaver("thefile.txt", self.content)
+        file_saver.md5 = md5(self.content)
+        self.service.put_file(file_saver, self.absolute_file_path, token, len(self.content))
+
+        adapter = DiskAdapter("http://url", self.storage_dir, self.updown_auth_manager)
+        with patch("conans.server.store.checksum_index.md5sum") as hashing:
+            snapshot = adapter.get_snapshot(self.disk_path)
+            self.assertFalse(hashing.called)
+        self.assertEqual({self.absolute_file_path: md5(self.content)}, snapshot)
+
+        # Modified in disk, it is hashed again
+        save(self.absolute_file_path, "other contents")
+        snapshot = adapter.get_snapshot(self.disk_path)
+        self.assertEqual({self.absolute_file_path: md5("other contents")}, snapshot)
+
+        adapter.delete_folder(os.path.join(self.storage_dir, "dir"))
+        index = ChecksumIndex(self.storage_dir)
+        with patch.object(index, "set") as index_set:
+            save(self.absolute_file_path, "new contents")
+            self.assertEqual(md5("new contents"), index.md5(self.absolute_file_path))
+            self.assertTrue(index_set.called)
+
 
 class ConanServiceTest(unittest.TestCase):
 
@@ -171,6 +202,60 @@ class ConanServiceTest(unittest.TestCase):
                          'dos.dll': fake_url_build('dos.dll')}
         self.assertEquals(urls, expected_urls)
 
+    def test_get_metadata(self):
+        missing_reference = ConanFileReference.loads("missing/2.0.3@lasote/testing")
+        missing_package = PackageReference(self.conan_reference, "missing")
+        metadata = self.service.get_metadata([self.conan_reference, missing_reference],
+                                             [self.package_reference, missing_package])
+
+        self.assertIsNone(metadata[str(missing_reference)])
+        self.assertIsNone(metadata[str(missing_package)])
+        conan_metadata = metadata[str(self.conan_reference)]
+        self.assertEquals(conan_metadata["snapshot"],
+                          self.service.get_conanfile_snapshot(self.conan_reference))
+        self.assertEquals(set(conan_metadata["urls"].keys()),
+                          set(conan_metadata["snapshot"].keys()))
+        package_metadata = metadata[str(self.package_reference)]
+        self.assertEquals(package_metadata["snapshot"],
+                          self.service.get_package_snapshot(self.package_reference))
+        self.assertEquals(set(package_metadata["urls"].keys()),
+                          set(package_metadata["snapshot"].keys()))
+
+        # Not readable references are not returned
+        authorizer = BasicAuthorizer([("openssl/*@lasote/*", "lasote")], [])
+        service = ConanService(authorizer, self.file_manager, "pepe")
+        self.assertEquals({}, service.get_metadata([self.conan_reference],
+                                                   [self.package_reference]))
+
+        invalid_package = PackageReference(self.conan_reference, "../../other")
+        self.assertRaises(RequestErrorException, self.service.get_metadata, [],
+                          [invalid_package])
+
+    def test_link_blobs(self):
+        """ only the blobs of the files that the user can read are linked
+        """
+        private_lib = os.path.join(self.paths.package(self.package_reference), "lib.a")
+        save(private_lib, "private lib")
+        BlobStore(self.tmp_dir, ChecksumIndex(self.tmp_dir)).add(private_lib)
+
+        other_reference = ConanFileReference.loads("other/1.0@pepe/testing")
+        save(os.path.join(self.paths.export(other_reference), CONAN_MANIFEST), "manifest")
+        other_package = PackageReference(other_reference, "456")
+        other_lib = os.path.join(self.paths.package(other_package), "lib.a")
+
+        authorizer = BasicAuthorizer([("openssl/*@lasote/*", "lasote")], [])
+        service = ConanService(authorizer, self.file_manager, "pepe")
+        self.assertEquals({}, service.link_package_blobs(other_package,
+                                                         {"lib.a": md5("private lib")}))
+        self.assertFalse(os.path.exists(other_lib))
+
+        authorizer = BasicAuthorizer([("*/*@*/*", "*")], [])
+        service = ConanService(authorizer, self.file_manager, "pepe")
+        self.assertEquals({"lib.a": md5("private lib")},
+                          service.link_package_blobs(other_package,
+                                                     {"lib.a": md5("private lib")}))
+        self.assertEquals("private lib", load(other_lib))
+
     def test_search(self):
         """ check the dict is returned by get_packages_info service
         """
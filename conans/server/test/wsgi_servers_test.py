@@ -0,0 +1,109 @@
+import socket
+import threading
+import time
+import unittest
+import os
+import bottle
+import mock
+import requests
+from conans.server.rest.wsgi_servers import ThreadPoolWSGIServer, _sendfile
+from conans.test.utils.test_files import temp_folder
+from conans.util.files import save
+
+
+class ThreadPoolWSGIServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.folder = temp_folder()
+        app = bottle.Bottle()
+
+        @app.route("/slow")
+        def slow():
+            self.started.set()
+            self.release.wait(10)
+            return "slow"
+
+        @app.route("/fast")
+        def fast():
+            return "fast"
+
+        @app.route("/files/<filename>")
+        def files(filename):
+            return bottle.static_file(filename, root=self.folder)
+
+        self.server = ThreadPoolWSGIServer(("localhost", 0), threads=2, request_timeout=0.5)
+        self.server.set_app(app)
+        self.url = "http://localhost:%d" % self.server.server_port
+        self.serving = threading.Thread(target=self.server.serve_forever,
+                                        kwargs={"poll_interval": 0.1})
+        self.serving.daemon = True
+        self.serving.start()
+
+    def tearDown(self):
+        self.release.set()
+        if self.serving.is_alive():
+            self.server.shutdown()
+            self.server.stop(5)
+
+    def concurrent_requests_test(self):
+        responses = []
+        slow_client = threading.Thread(
+            target=lambda: responses.append(requests.get("%s/slow" % self.url).text))
+        slow_client.start()
+        self.assertTrue(self.started.wait(5))
+        # Served while the slow one is running
+        self.assertEqual("fast", requests.get("%s/fast" % self.url, timeout=5).text)
+        self.assertEqual([], responses)
+
+        # Graceful shutdown, it waits for the running request, that finishes
+        self.server.shutdown()
+        self.serving.join(5)
+        stopping = threading.Thread(target=self.server.stop, args=(5, ))
+        stopping.start()
+        self.assertTrue(stopping.is_alive())
+        self.release.set()
+        stopping.join(5)
+        self.assertFalse(stopping.is_alive())
+        slow_client.join(5)
+        self.assertEqual(["slow"], responses)
+        with self.assertRaises(requests.ConnectionError):
+            requests.get("%s/fast" % self.url, timeout=5)
+
+    def request_timeout_test(self):
+        idle = socket.create_connection(("localhost", self.server.server_port))
+        idle.settimeout(5)
+        start = time.time()
+        self.assertEqual("", idle.recv(1024))  # Closed by the server
+        self.assertLess(time.time() - start, 4)
+        idle.close()
+        self.assertEqual("fast", requests.get("%s/fast" % self.url, timeout=5).text)
+
+    def sendfile_test(self):
+        contents = os.urandom(3 * 1024 * 1024 + 17)
+        save(os.path.join(self.folder, "big.bin"), contents)
+        sent = []
+
+        def recording_sendfile(out_fd, in_fd, offset, count):
+            ret = _sendfile(out_fd, in_fd, offset, count)
+            sent.append(ret)
+            return ret
+        with mock.patch("conans.server.rest.wsgi_servers._sendfile", recording_sendfile):
+            response = requests.get("%s/files/big.bin" % self.url, timeout=5)
+            self.assertEqual(contents, response.content)
+            self.assertEqual(len(contents), sum(sent))
+
+            # The ranges are not sent with sendfile
+            del sent[:]
+            response = requests.get("%s/files/big.bin" % self.url, timeout=5,
+                                    headers={"Range": "bytes=100-"})
+            self.assertEqual(206, response.status_code)
+            self.assertEqual(contents[100:], response.content)
+            self.assertEqual([], sent)
+
+        # Not available, the file is read
+        with mock.patch("conans.server.rest.wsgi_servers._sendfile", None):
+            response = requests.get("%s/files/big.bin" % self.url, timeout=5)
+            self.assertEqual(contents, response.content)
+
@@ -1,8 +1,13 @@
 import unittest
 from conans.test.tools import TestServer, TestClient
+from conans.test.utils.test_files import temp_folder
+from conans.client.rest.auth_manager import ConanApiAuthManager
+from conans.client.store.localdb import LocalDB
+from conans.errors import ForbiddenException
 from conans.paths import CONANFILE
 from conans.util.files import save
 from conans.model.ref import ConanFileReference
+from mock import Mock
 import os
 
 conan_content = """
@@ -59,3 +64,24 @@ class AuthorizeTest(unittest.TestCase):
 
         # Check that login failed all times
         self.assertEquals(self.conan.user_io.login_index, 3)
+
+    def token_shared_by_remotes_test(self):
+        localdb = LocalDB(os.path.join(temp_folder(), "localdb"))
+        user_io = Mock()
+        user_io.request_login.return_value = ("pepe", "pepepass")
+        rest_client = Mock(custom_headers={})
+        rest_client.for_remote.return_value = Mock(custom_headers={})
+        manager = ConanApiAuthManager(rest_client, user_io, localdb)
+        other_manager = manager.for_remote("http://other_remote")
+        self.assertIsNone(other_manager.rest_client.token)
+
+        # The first remote asks for a login
+        manager.rest_client.exists.side_effect = [ForbiddenException(), True]
+        manager.rest_client.authenticate.return_value = "new_token"
+        self.assertTrue(manager.exists(self.conan_reference))
+        self.assertEqual(("pepe", "new_token"), localdb.get_login())
+
+        # The other remote uses the new token
+        other_manager.exists(self.conan_reference)
+        self.assertEqual("pepe", other_manager.user)
+        self.assertEqual("new_token", other_manager.rest_client.token)
@@ -0,0 +1,68 @@
+""" Benchmark of the compression of packages, with different gzip levels and threads.
+Generates a synthetic package tree, half of it random (not compressible) data and half
+of it text, and compresses it as the uploads do.
+
+    python -m conans.test.benchmark.compression [size_in_MB] [threads,...]
+
+The default is a tree of 1024 MB, compressed with 1 thread and all the CPUs
+"""
+import multiprocessing
+import os
+import sys
+import time
+from conans.client.remote_manager import compress_folder_files, remove_spooled_files
+from conans.paths import PACKAGE_TGZ_NAME
+from conans.test.utils.test_files import temp_folder
+from conans.util.files import rmdir, relative_dirs, mkdir
+
+
+FILE_SIZE = 16 * 1024 * 1024
+
+
+def generate_tree(folder, size):
+    text = "".join("int function_%d(int value){ return value * %d; }\n" % (i, i)
+                   for i in range(1000))
+    written = 0
+    index = 0
+    while written < size:
+        file_size = min(FILE_SIZE, size - written)
+        subfolder = os.path.join(folder, "lib" if index % 2 else "include", str(index // 16))
+        mkdir(subfolder)
+        with open(os.path.join(subfolder, "file%d" % index), "wb") as handle:
+            if index % 2:
+                handle.write(os.urandom(file_size))
+            else:
+                handle.write((text * (file_size // len(text) + 1))[:file_size])
+        written += file_size
+        index += 1
+
+
+def run(size, threads_list):
+    folder = temp_folder()
+    try:
+        print("Generating %d MB tree in %s" % (size // (1024 * 1024), folder))
+        generate_tree(folder, size)
+        rel_files = relative_dirs(folder)
+        print("%-6s %-8s %10s %10s %10s" % ("level", "threads", "time (s)", "MB/s", "ratio"))
+        for compresslevel in (1, 6, 9):
+            for threads in threads_list:
+                start = time.time()
+                files = compress_folder_files(folder, rel_files, PACKAGE_TGZ_NAME, excluded=[],
+                                              compresslevel=compresslevel, threads=threads)
+                elapsed = time.time() - start
+                compressed = len(files[PACKAGE_TGZ_NAME])
+                remove_spooled_files(files)
+                print("%-6d %-8d %10.2f %10.1f %10.3f"
+                      % (compresslevel, threads, elapsed, size / elapsed / (1024 * 1024),
+                         float(compressed) / size))
+    finally:
+        rmdir(folder)
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    if len(sys.argv) > 2:
+        threads_list = [int(threads) for threads in sys.argv[2].split(",")]
+    else:
+        threads_list = sorted(set([1, multiprocessing.cpu_count()]))
+    run(size_mb * 1024 * 1024, threads_list)
@@ -0,0 +1,173 @@
+""" Load benchmark of the conan_server modes. Launches a server in each mode with a storage
+of some conanfiles, one of them with a big package, and measures the throughput of the
+searches and of the downloads of the package with an increasing number of concurrent clients.
+The searches are measured again while a slow client downloads the package, as the ones with
+a slow network do.
+
+    python -m conans.test.benchmark.server_load [package_size_in_MB] [clients,...] [modes,...]
+
+The default is a 64 MB package, 1, 2, 4, 8 and 16 clients and all the server modes
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import requests
+from conans.model.manifest import FileTreeManifest
+from conans.model.ref import ConanFileReference, PackageReference
+from conans.paths import (SimplePaths, CONANFILE, CONANINFO, CONAN_MANIFEST,
+                          PACKAGE_TGZ_NAME)
+from conans.server.rest.wsgi_servers import SERVER_MODES
+from conans.test.utils.test_files import temp_folder
+from conans.util.files import save, rmdir
+
+
+CONANFILES = 100
+DURATION = 5  # seconds of each measure
+SLOW_CHUNK = 64 * 1024  # the slow client reads this every 0.1 seconds
+STARTUP_TIMEOUT = 30
+
+
+def generate_storage(storage, package_size):
+    """ returns the PackageReference of the big package
+    """
+    paths = SimplePaths(storage)
+    for index in range(CONANFILES):
+        conan_ref = ConanFileReference("Package%d" % index, "1.0", "bench", "stable")
+        export = paths.export(conan_ref)
+        save(os.path.join(export, CONANFILE), "from conans import ConanFile")
+        save(os.path.join(export, CONAN_MANIFEST), str(FileTreeManifest.create(export)))
+        package_ref = PackageReference(conan_ref, "package_id")
+        package = paths.package(package_ref)
+        save(os.path.join(package, CONANINFO), "[settings]\n    os=Linux\n")
+        size = package_size if index == 0 else 1024
+        with open(os.path.join(package, PACKAGE_TGZ_NAME), "wb") as handle:
+            for _ in range(size // (1024 * 1024)):
+                handle.write(os.urandom(1024 * 1024))
+            handle.write(os.urandom(size % (1024 * 1024)))
+        save(os.path.join(package, CONAN_MANIFEST), str(FileTreeManifest.create(package)))
+    return PackageReference(ConanFileReference("Package0", "1.0", "bench", "stable"),
+                            "package_id")
+
+
+def _free_port():
+    sock = socket.socket()
+    sock.bind(("localhost", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start_server(home, mode, port):
+    """ the real conan_server, configured with environment variables
+    """
+    env = dict(os.environ)
+    env.update({"HOME": home, "CONAN_SERVER_PORT": str(port), "CONAN_SERVER_MODE": mode,
+                "CONAN_SERVER_THREADS": "16", "CONAN_SERVER_WORKERS": "4"})
+    process = subprocess.Popen([sys.executable, "-m", "conans.server.server_launcher"],
+                               env=env, stdout=open(os.devnull, "w"), stderr=subprocess.STDOUT)
+    url = "http://localhost:%d/v1" % port
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        try:
+            requests.get("%s/conans/search?q=Package0*" % url, timeout=1)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise Exception("The %s server didn't start" % mode)
+
+
+def measure(clients, request):
+    """ runs request(session) in clients threads during DURATION seconds
+    returns (requests per second, bytes per second)
+    """
+    totals = []
+    lock = threading.Lock()
+    deadline = time.time() + DURATION
+
+    def client():
+        session = requests.Session()
+        count, received = 0, 0
+        while time.time() < deadline:
+            received += request(session)
+            count += 1
+        with lock:
+            totals.append((count, received))
+    start = time.time()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    return (sum(count for count, _ in totals) / elapsed,
+            sum(received for _, received in totals) / elapsed)
+
+
+def run(package_size, clients_list, modes):
+    home = temp_folder()
+    try:
+        storage = os.path.join(home, ".conan_server", "data")
+        print("Generating storage with a %d MB package in %s" % (package_size // (1024 * 1024),
+                                                                 storage))
+        package_ref = generate_storage(storage, package_size)
+
+        def search(session):
+            response = session.get("%s/conans/search?q=Package1*" % url)
+            response.raise_for_status()
+            return len(response.content)
+
+        def download(session):
+            response = session.get(download_url, stream=True)
+            response.raise_for_status()
+            return sum(len(chunk) for chunk in response.iter_content(1024 * 1024))
+
+        def slow_download(stop):
+            session = requests.Session()
+            while not stop.is_set():
+                response = session.get(download_url, stream=True)
+                for _ in response.iter_content(SLOW_CHUNK):
+                    if stop.wait(0.1):
+                        break
+                response.close()
+
+        print("%-9s %-8s %12s %14s %26s" % ("mode", "clients", "searches/s", "download MB/s",
+                                            "searches/s slow download"))
+        for mode in modes:
+            process, url = start_server(home, mode, _free_port())
+            try:
+                urls = requests.get("%s/conans/%s/packages/%s/download_urls"
+                                    % (url, "/".join(package_ref.conan),
+                                       package_ref.package_id)).json()
+                download_url = urls[PACKAGE_TGZ_NAME]
+                for clients in clients_list:
+                    searches, _ = measure(clients, search)
+                    _, downloaded = measure(clients, download)
+                    stop = threading.Event()
+                    slow_client = threading.Thread(target=slow_download, args=(stop, ))
+                    slow_client.start()
+                    time.sleep(0.5)  # The download has started
+                    slow_searches, _ = measure(clients, search)
+                    stop.set()
+                    slow_client.join()
+                    print("%-9s %-8d %12.1f %14.1f %26.1f"
+                          % (mode, clients, searches, downloaded / (1024 * 1024),
+                             slow_searches))
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        rmdir(home)
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    if len(sys.argv) > 2:
+        clients_list = [int(clients) for clients in sys.argv[2].split(",")]
+    else:
+        clients_list = [1, 2, 4, 8, 16]
+    modes = sys.argv[3].split(",") if len(sys.argv) > 3 else SERVER_MODES
+    run(size_mb * 1024 * 1024, clients_list, modes)
@@ -0,0 +1,71 @@
+import unittest
+import os
+import time
+from conans.client.build_executor import BuildExecutor
+from conans.test.tools import TestBufferConanOutput
+from conans.errors import ConanException
+from conans.util.files import load, save
+from conans.test.utils.test_files import temp_folder
+
+
+class BuildExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        if not BuildExecutor.available():
+            self.skipTest("Worker processes not available")
+        self.output = TestBufferConanOutput()
+
+    def run_test(self):
+        folder = temp_folder()
+
+        def task(name):
+            def build(output):
+                os.chdir(folder)
+                save(name, "built by %d" % os.getpid())
+                output.info("%s built" % name)
+            return name, build
+
+        current_dir = os.getcwd()
+        accounting = BuildExecutor(self.output, 2).run([task("lib%d" % i) for i in range(4)])
+        self.assertEqual(current_dir, os.getcwd())
+        self.assertEqual(sorted(accounting.keys()), ["lib0", "lib1", "lib2", "lib3"])
+        for i in range(4):
+            self.assertIn("lib%d built" % i, str(self.output))
+            self.assertIn("lib%d: Build process time" % i, str(self.output))
+            content = load(os.path.join(folder, "lib%d" % i))
+            self.assertNotEqual("built by %d" % os.getpid(), content)
+
+    def same_name_test(self):
+        """ the tasks with the same name, builds of the same reference, are not run at the
+        same time
+        """
+        running = os.path.join(temp_folder(), "running")
+
+        def build(output):
+            if os.path.exists(running):
+                raise ConanException("lib0 already running")
+            save(running, "")
+            time.sleep(0.2)
+            os.remove(running)
+
+        BuildExecutor(self.output, 2).run([("lib0", build), ("lib0", build)])
+
+    def failure_test(self):
+        def fail(output):
+            raise ConanException("lib0: Error in build")
+
+        def crash(output):
+            os._exit(3)
+
+        def build(output):
+            output.info("built")
+
+        executor = BuildExecutor(self.output, 1)
+        with self.assertRaisesRegexp(ConanException, "lib0: Error in build"):
+            executor.run([("lib0", fail), ("lib1", build)])
+        # The pending tasks are not started after a failure
+        self.assertNotIn("built", str(self.output))
+
+        with self.assertRaisesRegexp(ConanException, "lib1: Build process finished unexpectedly "
+                                                     "with exit code 3"):
+            executor.run([("lib1", crash)])
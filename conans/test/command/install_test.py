@@ -6,6 +6,10 @@ import os
 from conans.model.info import ConanInfo
 from conans.test.utils.cpp_test_files import cpp_hello_conan_files
 from conans.paths import CONANFILE_TXT
+from conans.client.deps_builder import DepsBuilder
+from conans.errors import ConanException
+from conans.util.files import load, save
+from mock import patch
 
 
 class InstallTest(unittest.TestCase):
@@ -180,3 +184,52 @@ class InstallTest(unittest.TestCase):
         self.assertIn("Hello0:language=0", conan_info.full_options.dumps())
         self.assertIn("Hello0/0.1@lasote/stable:2e38bbc2c3ef1425197c8e2ffa8532894c347d26",
                       conan_info.full_requires.dumps())
+
+    def graph_cache_test(self):
+        self._create("Hello0", "0.1")
+        self._create("Hello1", "0.1", ["Hello0/0.1@lasote/stable"])
+        self._create("Hello2", "0.1", ["Hello1/0.1@lasote/stable"], export=False)
+
+        self.client.run("install -o language=1 %s --build missing" % self.settings)
+        info_path = os.path.join(self.client.current_folder, CONANINFO)
+        conan_info = load(info_path)
+        self.assertEqual(1, len(os.listdir(self.client.paths.graph_cache)))
+
+        # Nothing changed, the graph is not computed again
+        recompute = patch.object(DepsBuilder, "load",
+                                 side_effect=ConanException("Graph computed again"))
+        with recompute:
+            self.client.run("install -o language=1 %s" % self.settings)
+        self.assertEqual(conan_info, load(info_path))
+
+        with recompute:
+            error = self.client.run("install -o language=1 %s --no-graph-cache" % self.settings,
+                                    ignore_error=True)
+        self.assertTrue(error)
+        self.assertIn("Graph computed again", self.client.user_io.out)
+
+        # Different options, different entry
+        with recompute:
+            error = self.client.run("install -o language=0 %s" % self.settings,
+                                    ignore_error=True)
+        self.assertTrue(error)
+        self.client.run("install -o language=0 %s --build missing" % self.settings)
+        self.assertEqual(2, len(os.listdir(self.client.paths.graph_cache)))
+
+        # A corrupted export, not matching its manifest, is retrieved again
+        conanfile_path = self.client.paths.conanfile(ConanFileReference.loads("Hello0/0.1@"
+                                                                              "lasote/stable"))
+        save(conanfile_path, load(conanfile_path) + "\n# Corrupted")
+        with recompute:
+            error = self.client.run("install -o language=1 %s" % self.settings,
+                                    ignore_error=True)
+        self.assertTrue(error)
+        self.assertIn("Graph computed again", self.client.user_io.out)
+
+        # An export changed, its manifest too
+        self._create("Hello0", "0.1", no_config=True)
+        self._create("Hello2", "0.1", ["Hello1/0.1@lasote/stable"], export=False)
+        with recompute:
+            error = self.client.run("install -o language=1 %s" % self.settings,
+                                    ignore_error=True)
+        self.assertTrue(error)
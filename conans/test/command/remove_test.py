@@ -1,6 +1,10 @@
 import unittest
 from conans.test.tools import TestClient, TestBufferConanOutput, TestServer
-from conans.paths import PACKAGES_FOLDER, EXPORT_FOLDER, BUILD_FOLDER, SRC_FOLDER
+from conans.paths import (PACKAGES_FOLDER, EXPORT_FOLDER, BUILD_FOLDER, SRC_FOLDER,
+                          CONAN_MANIFEST)
+from conans.model.manifest import FileTreeManifest
+from conans.model.ref import PackageReference
+from conans.util.files import save
 import os
 from mock import Mock
 from conans.client.userio import UserIO
@@ -59,6 +63,8 @@ class RemoveTest(unittest.TestCase):
                             self.assertTrue(os.path.exists(package_folder))
                         else:
                             self.assertFalse(os.path.exists(package_folder))
+                            # Neither the stat data of its digest
+                            self.assertFalse(os.path.exists(package_folder + ".stat"))
 
         root_folder = self.client.paths.store
         for k, shas in build_folders.iteritems():
@@ -153,6 +159,13 @@ class RemoveTest(unittest.TestCase):
                             {"H1": True, "H2": True, "B": True, "O": True})
 
     def remove_specific_package_test(self):
+        package_ref = PackageReference.loads("Hello/1.4.10@fenix/testing:1_H1")
+        package_folder = self.client.paths.package(package_ref)
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
+        self.assertTrue(self.client.paths.valid_package_digest(package_ref))
+        self.assertTrue(os.path.exists(package_folder + ".stat"))
+
         self.client.run("remove hello/1.4.10* -p=1_H1 -f")
         self.assert_folders({"H1": [2], "H2": [1, 2], "B": [1, 2], "O": [1, 2]},
                             {"H1": [1, 2], "H2": [1, 2], "B": [1, 2], "O": [1, 2]},
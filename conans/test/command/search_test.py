@@ -1,6 +1,21 @@
 import unittest
-from conans.test.tools import TestClient
-from conans.paths import PACKAGES_FOLDER, CONANINFO
+import json
+import os
+import zlib
+import mock
+import webob
+from requests.exceptions import ConnectionError
+from conans.test.tools import TestClient, TestServer
+from conans.paths import (PACKAGES_FOLDER, CONANINFO, CONANFILE, CONAN_MANIFEST,
+                          PACKAGE_TGZ_NAME)
+from conans.client.rest.rest_client import RestApiClient
+from conans.model.ref import ConanFileReference, PackageReference
+from conans.model.manifest import FileTreeManifest
+from conans.model.package_query import PackageQuery
+from conans.util.files import save
+from conans.info import NDJSON_CONTENT_TYPE
+from conans.server.rest.bottle_plugins.gzip_compression import GZIP_WBITS
+from conans.server.rest.controllers.conan_controller import NEXT_CURSOR_HEADER
 
 
 conan_vars1 = '''
@@ -181,3 +196,214 @@ NodeInfo/1.0.2@fenix/stable
 
         client.run("search Bye/0.14@fenix/testing -p e4*")
         self.assertNotIn('''NodeInfo/1.0.2@fenix/stable''', client.user_io.out)
+
+        # Packages query
+        client.run('search -q "os=Windows AND arch=x*"')
+        self.assertIn('''Hello/1.4.10@fenix/testing
+    Package_ID: d91960d4c06b38
+            (x64, Windows, 8.1)
+NodeInfo/1.0.2@fenix/stable
+    Package_ID: e4f7vdwcv4w55d
+            (x86_64, gcc, Windows)''', client.user_io.out)
+        self.assertNotIn("Bye/0.14@fenix/testing", client.user_io.out)
+        self.assertNotIn("Empty/1.10@fake/test", client.user_io.out)
+
+        client.run('search hello* -q "options.use_OpenGL=True OR os=Darwin"')
+        self.assertIn("helloTest/1.4.10@fenix/stable", client.user_io.out)
+        self.assertNotIn("Hello/1.4.10@fenix/testing", client.user_io.out)
+        self.assertNotIn("Bye/0.14@fenix/testing", client.user_io.out)
+
+        error = client.run('search -q "os=Windows AND"', ignore_error=True)
+        self.assertTrue(error)
+        self.assertIn("Invalid package query", client.user_io.out)
+
+
+class RemoteSearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")],
+                                 users={"lasote": "mypass"})
+        self.client = TestClient(servers={"default": self.server},
+                                 users=[("lasote", "mypass")])
+        self.client.init_dynamic_vars()
+
+    def _upload(self, reference, package_id, conaninfo):
+        conan_ref = ConanFileReference.loads(reference)
+        export_folder = self.client.paths.export(conan_ref)
+        self.client.save({CONANFILE: "from conans import ConanFile"}, path=export_folder)
+        self.client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                         path=export_folder)
+        package_ref = PackageReference(conan_ref, package_id)
+        package_folder = self.client.paths.package(package_ref)
+        save(os.path.join(package_folder, CONANINFO), conaninfo)
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
+        self.client.remote_manager.upload_conan(conan_ref)
+        self.client.remote_manager.upload_package(package_ref)
+
+    def search_index_test(self):
+        file_manager = self.server.test_server.file_manager
+        self.assertIsNotNone(file_manager._search_engine)
+        self._upload("Hello/1.4.10@fenix/testing", "hello_id", conan_vars1)
+        self._upload("Bye/0.14@fenix/testing", "bye_id", conan_vars2)
+
+        # The uploads are in the index, the storage is not read
+        file_adapter = file_manager._file_adapter
+        file_manager._file_adapter = None
+        self.client.run("search -r default")
+        self.assertIn("Hello/1.4.10@fenix/testing", self.client.user_io.out)
+        self.assertIn("Bye/0.14@fenix/testing", self.client.user_io.out)
+        self.client.run("search hello* -r default -v")
+        self.assertIn("Package_ID: hello_id", self.client.user_io.out)
+        self.assertIn("os=Windows", self.client.user_io.out)
+        self.assertNotIn("Bye/0.14@fenix/testing", self.client.user_io.out)
+        self.client.run("search hello* --case-sensitive -r default")
+        self.assertIn("There are no packages", self.client.user_io.out)
+        hello = ConanFileReference.loads("Hello/1.4.10@fenix/testing")
+        self.assertTrue(file_manager.conanfile_exists(hello))
+        self.assertFalse(file_manager.conanfile_exists(
+            ConanFileReference.loads("hello/1.4.10@fenix/testing")))
+        file_manager._file_adapter = file_adapter
+
+        self.client.run("remove Hello/1.4.10@fenix/testing -p hello_id -r default -f")
+        info = file_manager.search("Hello*")
+        self.assertEqual({}, info[hello])
+        self.client.run("remove Hello/1.4.10@fenix/testing -r default -f")
+        self.assertEqual(["Bye/0.14@fenix/testing"],
+                         [str(ref) for ref in file_manager.search()])
+
+        # Packages queries, resolved by the index
+        self._upload("Hello/1.4.10@fenix/testing", "hello_id", conan_vars1)
+        self._upload("Hello/1.4.10@fenix/testing", "hello_id2", conan_vars4)
+        self.client.run('search -r default -q "os=Windows AND options.use_Qt!=True"')
+        self.assertIn("Package_ID: hello_id2", self.client.user_io.out)
+        self.assertNotIn("Package_ID: hello_id\n", self.client.user_io.out)
+        self.assertNotIn("Bye/0.14@fenix/testing", self.client.user_io.out)
+        info = file_manager.search(packages_query=PackageQuery.loads("os=Ubuntu OR arch=x64"))
+        self.assertEqual(["Bye/0.14@fenix/testing", "Hello/1.4.10@fenix/testing"],
+                         sorted(str(ref) for ref in info))
+        self.assertEqual(["hello_id"], info[hello].keys())
+
+        # Only the requested fields
+        remote_manager = self.client.remote_manager
+        info = remote_manager.search("Hello*", "default", True, "os=Windows", ["settings"])
+        self.assertEqual(["hello_id", "hello_id2"], sorted(info[hello].keys()))
+        self.assertEqual("Windows", str(info[hello]["hello_id"].settings.os))
+        self.assertEqual("", info[hello]["hello_id"].options.dumps())
+        with self.assertRaisesRegexp(Exception, "Invalid package query"):
+            remote_manager.search("Hello*", "default", True, "os=")
+        self.client.run("remove Hello/1.4.10@fenix/testing -p -r default -f")
+
+        # Rebuilt from the storage
+        save(os.path.join(self.server.paths.package(PackageReference(hello, "other_id")),
+                          CONANINFO), conan_vars3)
+        self.assertEqual(2, file_manager.rebuild_search_index())
+        info = file_manager.search("Hello*")
+        self.assertEqual(["other_id"], info[hello].keys())
+        self.assertIn("Darwin", info[hello]["other_id"].dumps())
+
+    def old_client_upload_order_test(self):
+        """ the clients that didn't upload the manifest last sent the files of a package
+        in dict order, the conaninfo.txt after the manifest
+        """
+        order = [PACKAGE_TGZ_NAME, CONAN_MANIFEST, CONANINFO]
+        upload_files = RestApiClient.upload_files
+
+        def old_upload_files(client, file_urls, files, output):
+            for filename in sorted(file_urls, key=lambda name: (order.index(name)
+                                                                 if name in order else -1)):
+                upload_files(client, {filename: file_urls[filename]}, files, output)
+
+        with mock.patch.object(RestApiClient, "upload_files", old_upload_files):
+            self._upload("Hello/1.4.10@fenix/testing", "hello_id", conan_vars1)
+        info = self.server.test_server.file_manager.search("Hello*")
+        hello = ConanFileReference.loads("Hello/1.4.10@fenix/testing")
+        self.assertEqual(["hello_id"], info[hello].keys())
+        self.assertIn("os=Windows", info[hello]["hello_id"].dumps())
+
+    def paginated_search_test(self):
+        for name in ("Hello", "Bye", "Other"):
+            self._upload("%s/1.0@fenix/testing" % name, "%s_id" % name, conan_vars4)
+        app = self.server.app
+
+        response = app.get("/v1/conans/search?limit=2")
+        self.assertEqual(["Bye/1.0@fenix/testing", "Hello/1.0@fenix/testing"],
+                         sorted(json.loads(response.body).keys()))
+        self.assertEqual("Hello/1.0@fenix/testing", response.headers[NEXT_CURSOR_HEADER])
+        response = app.get("/v1/conans/search?limit=2&cursor=Hello/1.0@fenix/testing")
+        self.assertEqual(["Other/1.0@fenix/testing"], json.loads(response.body).keys())
+        self.assertNotIn(NEXT_CURSOR_HEADER, response.headers)
+        response = app.get("/v1/conans/search?limit=0", expect_errors=True)
+        self.assertEqual(400, response.status_code)
+
+        # Streamed, a JSON line for each conanfile and the cursor of the next page
+        response = app.get("/v1/conans/search?limit=2&fields=settings",
+                           headers={"Accept": NDJSON_CONTENT_TYPE})
+        self.assertEqual(NDJSON_CONTENT_TYPE, response.content_type)
+        lines = [json.loads(line) for line in response.body.splitlines()]
+        self.assertEqual([{"reference": "Bye/1.0@fenix/testing",
+                           "packages": {"Bye_id": {"settings": [["arch", "x86_64"],
+                                                                ["compiler", "gcc"],
+                                                                ["os", "Windows"]]}}},
+                          {"reference": "Hello/1.0@fenix/testing",
+                           "packages": {"Hello_id": {"settings": [["arch", "x86_64"],
+                                                                  ["compiler", "gcc"],
+                                                                  ["os", "Windows"]]}}},
+                          {"next_cursor": "Hello/1.0@fenix/testing"}], lines)
+
+        # The client requests all the pages, and prints them as they arrive
+        with mock.patch("conans.client.rest.rest_client.SEARCH_PAGE_SIZE", 1):
+            self.client.run("search -r default")
+        self.assertEqual("""Existing packages info:
+
+Bye/1.0@fenix/testing
+    Package_ID: Bye_id
+            (x86_64, gcc, Windows)
+Hello/1.0@fenix/testing
+    Package_ID: Hello_id
+            (x86_64, gcc, Windows)
+Other/1.0@fenix/testing
+    Package_ID: Other_id
+            (x86_64, gcc, Windows)
+""", self.client.user_io.out)
+
+        # The errors of the next pages are handled as the ones of the first one
+        search_page = RestApiClient._search_page
+
+        def reset_search_page(client, params, cursor=None):
+            if cursor:
+                raise ConnectionError("Connection reset by peer")
+            return search_page(client, params, cursor)
+        with mock.patch("conans.client.rest.rest_client.SEARCH_PAGE_SIZE", 1):
+            with mock.patch.object(RestApiClient, "_search_page", reset_search_page):
+                error = self.client.run("search -r default", ignore_error=True)
+        self.assertTrue(error)
+        self.assertIn("Bye/1.0@fenix/testing", self.client.user_io.out)
+        self.assertIn("ERROR: Unable to connect to default=", self.client.user_io.out)
+
+        # Compressed if accepted. TestApp would decode them
+        def compressed_get(url, headers):
+            request = webob.Request.blank(url, headers=headers)
+            return request.get_response(self.server.test_server.ra.root_app)
+        headers = {"Accept": NDJSON_CONTENT_TYPE, "Accept-Encoding": "gzip, deflate"}
+        compressed = compressed_get("/v1/conans/search?limit=2&fields=settings", headers)
+        self.assertEqual("gzip", compressed.headers["Content-Encoding"])
+        self.assertEqual(response.body, zlib.decompress(compressed.body, GZIP_WBITS))
+        small = compressed_get("/v1/conans/search?q=Bye*", {"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", small.headers)
+        for accept_encoding in ("gzip;q=0, deflate", "deflate, *;q=0", "identity"):
+            headers["Accept-Encoding"] = accept_encoding
+            identity = compressed_get("/v1/conans/search?limit=2&fields=settings", headers)
+            self.assertNotIn("Content-Encoding", identity.headers)
+            self.assertEqual(response.body, identity.body)
+        headers["Accept-Encoding"] = "deflate;q=1.0, *;q=0.5"
+        compressed = compressed_get("/v1/conans/search?limit=2&fields=settings", headers)
+        self.assertEqual("gzip", compressed.headers["Content-Encoding"])
+        for name in ("Zlib", "OpenSSL"):
+            self._upload("%s/1.0@fenix/testing" % name, "%s_id" % name, conan_vars4)
+        response = app.get("/v1/conans/search")
+        compressed = compressed_get("/v1/conans/search", {"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", compressed.headers["Content-Encoding"])
+        self.assertEqual(json.loads(response.body),
+                         json.loads(zlib.decompress(compressed.body, GZIP_WBITS)))
+        self.assertLess(len(compressed.body), len(response.body))
@@ -0,0 +1,69 @@
+import unittest
+import os
+from conans.client.compressed_cache import CompressedCache
+from conans.test.utils.test_files import temp_folder
+from conans.util.files import SpooledContents
+from mock import patch
+
+
+class CompressedCacheTest(unittest.TestCase):
+
+    def _store(self, cache, key, contents):
+        spooled = cache.spool("conan_package.tgz")
+        spooled.write(contents)
+        spooled.close()
+        return cache.store(key, spooled)
+
+    def store_and_get_test(self):
+        cache = CompressedCache(temp_folder(), max_size=1000)
+        key = cache.key("manifest", "conan_package.tgz", 9)
+        self.assertNotEqual(key, cache.key("manifest", "conan_package.tgz", 1))
+        self.assertNotEqual(key, cache.key("manifest2", "conan_package.tgz", 9))
+        self.assertIsNone(cache.get(key))
+
+        stored = self._store(cache, key, "contents")
+        cached = cache.get(key)
+        self.assertEqual(stored.path, cached.path)
+        self.assertEqual(len("contents"), len(cached))
+        self.assertEqual(stored.md5, cached.md5)
+        self.assertEqual(["contents"], list(cached.chunks(100)))
+
+    def eviction_test(self):
+        folder = temp_folder()
+        cache = CompressedCache(folder, max_size=25)
+        keys = [cache.key("manifest%d" % index, "conan_package.tgz", 9) for index in range(3)]
+        for index, key in enumerate(keys):
+            stored = self._store(cache, key, "0123456789")
+            os.utime(stored.path, (index, index))
+        # The third one exceeded the size, the least recently used was removed
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+        # A get() makes it the most recently used one
+        os.utime(cache.get(keys[2]).path, (0, 0))
+        self.assertIsNotNone(cache.get(keys[1]))
+        self._store(cache, keys[0], "0123456789")
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertEqual(4, len(os.listdir(folder)))
+
+        # Bigger than the cache, it's not stored
+        key = cache.key("big", "conan_package.tgz", 9)
+        stored = self._store(cache, key, "0" * 26)
+        self.assertIsInstance(stored, SpooledContents)
+        self.assertIsNone(cache.get(key))
+        stored.remove()
+
+    def concurrent_eviction_test(self):
+        """ the entries removed by another process are skipped
+        """
+        folder = temp_folder()
+        cache = CompressedCache(folder, max_size=25)
+        keys = [cache.key("manifest%d" % index, "conan_package.tgz", 9) for index in range(3)]
+        for key in keys[:2]:
+            self._store(cache, key, "0123456789")
+        vanished = "%s.tgz" % cache.key("vanished", "conan_package.tgz", 9)
+        with patch("os.listdir", return_value=[vanished] + os.listdir(folder)):
+            with patch("os.remove", side_effect=OSError("Removed by another process")):
+                stored = self._store(cache, keys[2], "0123456789")
+        self.assertEqual(stored.path, cache.get(keys[2]).path)
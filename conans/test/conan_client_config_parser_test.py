@@ -0,0 +1,75 @@
+import unittest
+import os
+import multiprocessing
+from conans.test.utils.test_files import temp_folder
+from conans.util.files import save
+from conans.client.conf import ConanClientConfigParser, default_client_conf
+from conans.errors import ConanException
+
+
+class ConanClientConfigParserTest(unittest.TestCase):
+
+    def _config(self, content):
+        conf_path = os.path.join(temp_folder(), "conan.conf")
+        save(conf_path, content)
+        return ConanClientConfigParser(conf_path)
+
+    def compression_test(self):
+        config = self._config(default_client_conf)
+        self.assertEqual(9, config.compression_level("export"))
+        self.assertEqual(9, config.compression_level("package"))
+        self.assertEqual(multiprocessing.cpu_count(), config.compression_threads)
+        self.assertEqual(1024 * 1024 * 1024, config.compressed_cache_size)
+
+        config = self._config("""
+[storage]
+path: ~/.conan/data
+compressed_cache_size: 10
+[compression]
+export_level: 1
+package_level: 6
+threads: 3
+""")
+        self.assertEqual(1, config.compression_level("export"))
+        self.assertEqual(6, config.compression_level("package"))
+        self.assertEqual(3, config.compression_threads)
+        self.assertEqual(10 * 1024 * 1024, config.compressed_cache_size)
+
+        # Optional section
+        config = self._config("[storage]\npath: ~/.conan/data\n")
+        self.assertEqual(9, config.compression_level("package"))
+        self.assertEqual(multiprocessing.cpu_count(), config.compression_threads)
+
+        config = self._config("[compression]\npackage_level: 10\nthreads: many\n")
+        with self.assertRaisesRegexp(ConanException, "Invalid package_level '10'"):
+            config.compression_level("package")
+        with self.assertRaisesRegexp(ConanException, "Invalid threads 'many'"):
+            config.compression_threads
+
+    def remote_lookup_test(self):
+        config = self._config(default_client_conf)
+        self.assertEqual(300, config.remote_lookup("missing_ttl"))
+        self.assertEqual(3, config.remote_lookup("max_failures"))
+        self.assertEqual(60, config.remote_lookup("retry_after"))
+
+        config = self._config("[remote_lookup]\nmissing_ttl: 0\nretry_after: 10\n")
+        self.assertEqual(0, config.remote_lookup("missing_ttl"))
+        self.assertEqual(3, config.remote_lookup("max_failures"))
+        self.assertEqual(10, config.remote_lookup("retry_after"))
+
+        config = self._config("[remote_lookup]\nmax_failures: -1\n")
+        with self.assertRaisesRegexp(ConanException, "Invalid max_failures '-1'"):
+            config.remote_lookup("max_failures")
+
+    def http_test(self):
+        config = self._config(default_client_conf)
+        self.assertEqual(10, config.http("pool_size"))
+        self.assertEqual(3, config.http("retries"))
+
+        config = self._config("[http]\nretries: 0\n")
+        self.assertEqual(10, config.http("pool_size"))
+        self.assertEqual(0, config.http("retries"))
+
+        config = self._config("[http]\npool_size: 0\n")
+        with self.assertRaisesRegexp(ConanException, "Invalid pool_size '0'"):
+            config.http("pool_size")
@@ -3,6 +3,8 @@ from conans.client.deps_builder import DepsGraph, Node
 from conans.model.ref import ConanFileReference
 from conans.model.conan_file import ConanFile
 from conans.model.settings import Settings
+from conans.util.log import logger
+import time
 
 
 class DepsGraphTest(unittest.TestCase):
@@ -68,3 +70,40 @@ class DepsGraphTest(unittest.TestCase):
         deps.add_edge(2, 32)
         deps.add_edge(32, 5)
         self.assertEqual([[5, 31], [32], [2], [1]], deps.by_levels())
+
+    def levels_cache_test(self):
+        deps = DepsGraph()
+        deps.add_node(1)
+        deps.add_node(2)
+        deps.add_edge(1, 2)
+        self.assertEqual([[2], [1]], deps.by_levels())
+        deps.add_node(3)
+        deps.add_edge(2, 3)
+        self.assertEqual([[3], [2], [1]], deps.by_levels())
+        deps.by_levels()[0].append(4)  # returned levels are copies
+        self.assertEqual([[3], [2], [1]], deps.by_levels())
+        self.assertEqual([2], deps.neighbors(1))
+        self.assertEqual([1], deps.inverse_neighbors(2))
+
+    def scaling_levels_test(self):
+        """ synthetic layered graphs of growing size, each node depending on up to
+        3 nodes of the previous layer. Timings are logged, so the linear growth
+        can be checked running this test with logging enabled
+        """
+        for size in (10, 100, 1000, 10000):
+            width = max(size / 100, 2)
+            deps = DepsGraph()
+            for i in range(size):
+                deps.add_node(i)
+            for i in range(width, size):
+                layer_start = (i / width - 1) * width
+                for j in range(3):
+                    deps.add_edge(i, layer_start + (i + j) % width)
+
+            start = time.time()
+            levels = deps.by_levels()
+            logger.info("DepsGraph.by_levels() %d nodes: %.3f s" % (size, time.time() - start))
+
+            self.assertEqual(size / width, len(levels))
+            for index, level in enumerate(levels):
+                self.assertEqual(range(index * width, (index + 1) * width), level)
@@ -1,16 +1,22 @@
 import unittest
+import json
 from conans.test.tools import TestClient, TestServer, TestBufferConanOutput
 from conans.test.utils.test_files import hello_source_files
 from conans.client.manager import CONANFILE
 import os
 from conans.model.ref import ConanFileReference, PackageReference
-from conans.paths import CONAN_MANIFEST
+from conans.paths import CONAN_MANIFEST, EXPORT_TGZ_NAME
 from conans.util.files import save
 from conans.model.manifest import FileTreeManifest
 from conans.model.options import OptionsValues
 from conans.client.loader import ConanFileLoader
 from conans.model.settings import Settings
 from conans.client.proxy import ConanfileRemoteProxy, ConanRemoteProxy
+from conans.client.rest.rest_client import RestApiClient
+from conans.errors import ConanException, ConanConnectionError
+from conans.client.rest.uploader_downloader import Downloader
+from requests.exceptions import ConnectionError
+from mock import patch, Mock
 
 
 myconan1 = """
@@ -33,8 +39,6 @@ class DownloadTest(unittest.TestCase):
         test_server = TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")])
         servers["default"] = test_server
 
-        conan_digest = FileTreeManifest(123123123, {})
-
         client = TestClient(servers=servers)
         client.init_dynamic_vars()
         conan_ref = ConanFileReference.loads("Hello/1.2.1@frodo/stable")
@@ -43,10 +47,11 @@ class DownloadTest(unittest.TestCase):
         files = hello_source_files()
         client.save(files, path=reg_folder)
         client.save({CONANFILE: myconan1,
-                       CONAN_MANIFEST: str(conan_digest),
                       "include/math/lib1.h": "//copy",
                       "my_lib/debug/libd.a": "//copy",
                       "my_data/readme.txt": "//copy"}, path=reg_folder)
+        client.save({CONAN_MANIFEST: str(FileTreeManifest.create(reg_folder))},
+                    path=reg_folder)
 
         package_ref = PackageReference(conan_ref, "fakeid")
         package_folder = client.paths.package(package_ref)
@@ -68,13 +73,22 @@ class DownloadTest(unittest.TestCase):
                                          client2.remote_manager,
                                          "default")
         installer.retrieve_conanfile(conan_ref)
+        reg_path = client2.paths.export(ConanFileReference.loads("Hello/1.2.1/frodo/stable"))
+        # Only the conanfile is needed to resolve the graph
+        self.assertEqual(sorted([CONANFILE, CONAN_MANIFEST]), sorted(os.listdir(reg_path)))
+        self.assertTrue(client2.paths.is_partial_export(conan_ref))
+        self.assertTrue(client2.paths.valid_conan_digest(conan_ref))
+
         installer = ConanRemoteProxy(client2.paths,
                                      client2.user_io,
                                      client2.remote_manager,
                                      "default")
         installer.retrieve_remote_package(package_ref, TestBufferConanOutput())
+        # The sources are retrieved if it has to be built
+        installer.get_export_sources(conan_ref, TestBufferConanOutput())
+        self.assertFalse(client2.paths.is_partial_export(conan_ref))
+        self.assertTrue(client2.paths.valid_conan_digest(conan_ref))
 
-        reg_path = client2.paths.export(ConanFileReference.loads("Hello/1.2.1/frodo/stable"))
         pack_folder = client2.paths.package(package_ref)
 
         # Test the file in the downloaded conans
@@ -100,3 +114,310 @@ class DownloadTest(unittest.TestCase):
                                                     "my_lib/libd.a")))
         self.assertTrue(os.path.exists(os.path.join(pack_folder, "res",
                                                     "shares/readme.txt")))
+
+    def prefetch_test(self):
+        """ the missing conanfiles are retrieved all together, and then
+        loaded from the local store
+        """
+        servers = {"default": TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")])}
+        client = TestClient(servers=servers)
+        client.init_dynamic_vars()
+        conan_refs = [ConanFileReference.loads("Hello%d/1.2.1@frodo/stable" % index)
+                      for index in range(4)]
+        for conan_ref in conan_refs:
+            conanfile = myconan1.replace('"Hello"', '"%s"' % conan_ref.name)
+            export_folder = client.paths.export(conan_ref)
+            client.save({CONANFILE: conanfile}, path=export_folder)
+            client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                        path=export_folder)
+            client.remote_manager.upload_conan(conan_ref)
+
+        client2 = TestClient(servers=servers)
+        client2.init_dynamic_vars()
+        loader = ConanFileLoader(None, Settings(), OptionsValues.loads(""))
+        proxy = ConanfileRemoteProxy(client2.paths, client2.user_io, loader,
+                                     client2.remote_manager, "default")
+        missing = ConanFileReference.loads("Missing/1.2.1@frodo/stable")
+        proxy.prefetch_conanfiles(conan_refs + [missing])
+
+        output = str(client2.user_io.out)
+        for conan_ref in conan_refs:
+            self.assertTrue(os.path.exists(client2.paths.conanfile(conan_ref)))
+            self.assertIn("%s: Conanfile not found, retrieving from server" % str(conan_ref),
+                          output)
+        self.assertNotIn("Missing", output)
+        self.assertFalse(os.path.exists(client2.paths.export(missing)))
+        # Output is written in order
+        positions = [output.index(str(conan_ref)) for conan_ref in conan_refs]
+        self.assertEqual(sorted(positions), positions)
+
+        # Nothing else to retrieve
+        for conan_ref in conan_refs:
+            self.assertTrue(client2.paths.valid_conan_digest(conan_ref))
+
+    def batched_metadata_test(self):
+        """ the snapshots and download urls of all the conanfiles and packages to retrieve
+        are requested at once, and each one just downloads its files
+        """
+        servers = {"default": TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")])}
+        client = TestClient(servers=servers)
+        client.init_dynamic_vars()
+        conan_refs = [ConanFileReference.loads("Hello%d/1.2.1@frodo/stable" % index)
+                      for index in range(3)]
+        package_refs = [PackageReference(conan_ref, "fakeid") for conan_ref in conan_refs]
+        for conan_ref, package_ref in zip(conan_refs, package_refs):
+            export_folder = client.paths.export(conan_ref)
+            client.save({CONANFILE: myconan1.replace('"Hello"', '"%s"' % conan_ref.name)},
+                        path=export_folder)
+            client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                        path=export_folder)
+            client.remote_manager.upload_conan(conan_ref)
+            save(os.path.join(client.paths.package(package_ref), "lib", "lib.a"), "//lib")
+            client.remote_manager.upload_package(package_ref)
+        missing = PackageReference(conan_refs[0], "missingid")
+
+        def retrieve_all(client):
+            loader = ConanFileLoader(None, Settings(), OptionsValues.loads(""))
+            proxy = ConanfileRemoteProxy(client.paths, client.user_io, loader,
+                                         client.remote_manager, "default")
+            proxy.prefetch_conanfiles(conan_refs)
+            proxy = ConanRemoteProxy(client.paths, client.user_io, client.remote_manager,
+                                     "default")
+            proxy.prefetch_metadata(package_refs + [missing])
+            for package_ref in package_refs + [missing]:
+                retrieved = proxy.retrieve_remote_package(package_ref, TestBufferConanOutput())
+                self.assertEqual(package_ref != missing, retrieved)
+            for conan_ref, package_ref in zip(conan_refs, package_refs):
+                self.assertTrue(client.paths.valid_conan_digest(conan_ref))
+                self.assertTrue(os.path.exists(os.path.join(client.paths.package(package_ref),
+                                                            "lib", "lib.a")))
+
+        client2 = TestClient(servers=servers)
+        client2.init_dynamic_vars()
+        requester = _RecordingRequester(client2.requester)
+        client2.rest_api_client.requester = requester
+        retrieve_all(client2)
+        self.assertEqual(2, len([url for url in requester.urls if "/metadata" in url]))
+        self.assertEqual([], [url for url in requester.urls if "download_urls" in url])
+        # Only the files are requested, the missing package doesn't need any request
+        self.assertEqual([], [url for url in requester.urls
+                              if "/metadata" not in url and "signature=" not in url])
+        self.assertEqual([], [url for url in requester.urls if "missingid" in url])
+
+        # Remotes without the batched metadata are asked for each reference
+        client3 = TestClient(servers=servers)
+        client3.init_dynamic_vars()
+        requester = _RecordingRequester(client3.requester, metadata=False)
+        client3.rest_api_client.requester = requester
+        retrieve_all(client3)
+        self.assertEqual(len(conan_refs) + len(package_refs) + 1,
+                         len([url for url in requester.urls if "download_urls" in url]))
+
+    def streamed_download_test(self):
+        """ the files are written and extracted while downloaded, and checked against
+        the md5 of the remote snapshot
+        """
+        servers = {"default": TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")])}
+        client = TestClient(servers=servers)
+        client.init_dynamic_vars()
+        conan_ref = ConanFileReference.loads("Hello/1.2.1@frodo/stable")
+        export_folder = client.paths.export(conan_ref)
+        client.save({CONANFILE: myconan1,
+                     "data/big.txt": "".join(str(i) for i in range(100000))},
+                    path=export_folder)
+        client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                    path=export_folder)
+        client.remote_manager.upload_conan(conan_ref)
+
+        client2 = TestClient(servers=servers)
+        client2.init_dynamic_vars()
+        client2.remote_manager.get_conanfile(conan_ref)
+        self.assertTrue(client2.paths.valid_conan_digest(conan_ref))
+
+        # A corrupted download is detected and doesn't leave anything behind
+        client3 = TestClient(servers=servers)
+        client3.init_dynamic_vars()
+        wrong_snapshot = {name: "wrong_md5" for name in
+                          (CONANFILE, CONAN_MANIFEST, EXPORT_TGZ_NAME)}
+        with patch.object(RestApiClient, "get_conan_snapshot", return_value=wrong_snapshot):
+            with self.assertRaisesRegexp(ConanException, "Bad md5 of downloaded file"):
+                client3.remote_manager.get_conanfile(conan_ref)
+        self.assertFalse(os.path.exists(client3.paths.export(conan_ref)))
+
+    def resume_download_test(self):
+        servers = {"default": TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")])}
+        client = TestClient(servers=servers)
+        client.init_dynamic_vars()
+        conan_ref = ConanFileReference.loads("Hello/1.2.1@frodo/stable")
+        export_folder = client.paths.export(conan_ref)
+        client.save({CONANFILE: myconan1,
+                     "data/big.bin": os.urandom(200000)}, path=export_folder)
+        client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                    path=export_folder)
+        client.remote_manager.upload_conan(conan_ref)
+
+        # The connection drops in the middle of the tgz, it's resumed with a Range request
+        client2 = TestClient(servers=servers)
+        client2.init_dynamic_vars()
+        requester = _FlakyRequester(client2.requester, failures=1)
+        client2.rest_api_client.requester = requester
+        with patch.object(Downloader, "RETRY_WAIT", 0):
+            client2.remote_manager.get_conanfile(conan_ref)
+            client2.remote_manager.get_export_sources(conan_ref)
+        self.assertTrue(client2.paths.valid_conan_digest(conan_ref))
+        self.assertIn("Connection error downloading, retrying", str(client2.user_io.out))
+        tgz_url, headers = requester.requests[-1]
+        self.assertIn(EXPORT_TGZ_NAME, tgz_url)
+        self.assertEqual("bytes=%d-" % _FlakyRequester.FAIL_AFTER, headers["Range"])
+        self.assertIn("If-Range", headers)
+        export_folder = client2.paths.export(conan_ref)
+        self.assertFalse(os.path.exists(export_folder + ".%s.part" % EXPORT_TGZ_NAME))
+
+        # Too many failures, the received part is kept for the next time
+        client3 = TestClient(servers=servers)
+        client3.init_dynamic_vars()
+        client3.rest_api_client.requester = _FlakyRequester(client3.requester, failures=10)
+        with patch.object(Downloader, "RETRY_WAIT", 0):
+            client3.remote_manager.get_conanfile(conan_ref)
+            with self.assertRaisesRegexp(ConanConnectionError, "All remotes failed"):
+                client3.remote_manager.get_export_sources(conan_ref)
+        self.assertIn("failed after 5 retries", str(client3.user_io.out))
+        export_folder = client3.paths.export(conan_ref)
+        self.assertFalse(os.path.exists(export_folder))
+        part_path = export_folder + ".%s.part" % EXPORT_TGZ_NAME
+        # Each retry received another part
+        received = (Downloader.RETRIES + 1) * _FlakyRequester.FAIL_AFTER
+        self.assertEqual(received, os.path.getsize(part_path))
+
+        client3.init_dynamic_vars()
+        requester = _FlakyRequester(client3.requester, failures=0)
+        client3.rest_api_client.requester = requester
+        client3.remote_manager.get_conanfile(conan_ref)
+        client3.remote_manager.get_export_sources(conan_ref)
+        self.assertTrue(client3.paths.valid_conan_digest(conan_ref))
+        self.assertFalse(os.path.exists(part_path))
+        tgz_url, headers = requester.requests[-1]
+        self.assertEqual("bytes=%d-" % received, headers["Range"])
+
+        # The server honors If-Range
+        response = client3.requester.get(tgz_url, headers={"Range": "bytes=10-"})
+        self.assertEqual(206, response.status_code)
+        etag = response.headers["ETag"]
+        full_response = client3.requester.get(tgz_url)
+        self.assertEqual(200, full_response.status_code)
+        self.assertEqual(full_response.content[10:], response.content)
+        self.assertEqual("bytes 10-%d/%d" % (len(full_response.content) - 1,
+                                             len(full_response.content)),
+                         response.headers["Content-Range"])
+        response = client3.requester.get(tgz_url, headers={"Range": "bytes=10-",
+                                                           "If-Range": etag})
+        self.assertEqual(206, response.status_code)
+        response = client3.requester.get(tgz_url, headers={"Range": "bytes=10-",
+                                                           "If-Range": '"other"'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(full_response.content, response.content)
+
+    def cached_download_test(self):
+        server = TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")])
+        client = TestClient(servers={"default": server})
+        client.init_dynamic_vars()
+        conan_ref = ConanFileReference.loads("Hello/1.2.1@frodo/stable")
+        export_folder = client.paths.export(conan_ref)
+        client.save({CONANFILE: myconan1}, path=export_folder)
+        client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                    path=export_folder)
+        client.remote_manager.upload_conan(conan_ref)
+        urls = json.loads(client.requester.get("%s/v1/conans/%s/download_urls"
+                                               % (server.fake_url, "/".join(conan_ref))).content)
+        url = urls[CONANFILE]
+
+        response = client.requester.get(url)
+        self.assertEqual(200, response.status_code)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        # Cached by the client, nothing is sent
+        for headers in ({"If-None-Match": etag},
+                        {"If-None-Match": '"other", W/%s' % etag},
+                        {"If-None-Match": "*"},
+                        {"If-Modified-Since": last_modified}):
+            response = client.requester.get(url, headers=headers)
+            self.assertEqual(304, response.status_code)
+            self.assertEqual("", response.content)
+            self.assertEqual(etag, response.headers["ETag"])
+        # If-None-Match takes precedence over If-Modified-Since
+        response = client.requester.get(url, headers={"If-None-Match": '"other"',
+                                                      "If-Modified-Since": last_modified})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(myconan1, response.content)
+
+        # A fronting web server sends the files
+        api = server.test_server.ra.api_v1
+        api.file_offload = "x-accel-redirect"
+        api.file_offload_prefix = "/conan_storage/"
+        response = client.requester.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("", response.content)
+        self.assertEqual("/conan_storage/Hello/1.2.1/frodo/stable/export/conanfile.py",
+                         response.headers["X-Accel-Redirect"])
+        self.assertEqual(etag, response.headers["ETag"])
+        api.file_offload = "x-sendfile"
+        response = client.requester.get(url)
+        self.assertEqual(server.paths.conanfile(conan_ref), response.headers["X-Sendfile"])
+        self.assertEqual(304, client.requester.get(url, headers={"If-None-Match": etag})
+                         .status_code)
+        # The signature is checked before
+        response = client.requester.get(url.replace("signature=", "signature=bad"))
+        self.assertEqual(404, response.status_code)
+        self.assertNotIn("X-Sendfile", response.headers)
+
+
+class _RecordingRequester(object):
+    """ records the requested urls. Without metadata, it behaves as a server without
+    the batched metadata route
+    """
+    def __init__(self, requester, metadata=True):
+        self._requester = requester
+        self._metadata = metadata
+        self.urls = []
+
+    def __getattr__(self, name):
+        return getattr(self._requester, name)
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return self._requester.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        self.urls.append(url)
+        if not self._metadata and url.endswith("/metadata"):
+            return Mock(status_code=404, content="Not found")
+        return self._requester.post(url, **kwargs)
+
+
+class _FlakyRequester(object):
+    """ the responses of the tgz files fail after sending FAIL_AFTER bytes, the given
+    number of times
+    """
+    FAIL_AFTER = 1000
+
+    def __init__(self, requester, failures):
+        self._requester = requester
+        self._failures = failures
+        self.requests = []
+
+    def __getattr__(self, name):
+        return getattr(self._requester, name)
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs.get("headers") or {}))
+        response = self._requester.get(url, **kwargs)
+        if ".tgz" in url and self._failures:
+            self._failures -= 1
+            content = response.content
+
+            def iter_content(chunk_size=1):  # @UnusedVariable
+                yield content[:self.FAIL_AFTER]
+                raise ConnectionError("Connection reset by peer")
+            response.iter_content = iter_content
+        return response
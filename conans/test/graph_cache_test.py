@@ -0,0 +1,50 @@
+import unittest
+import os
+from conans.client.deps_builder import DepsBuilder
+from conans.client.graph_cache import GraphCache
+from conans.client.loader import ConanFileLoader
+from conans.model.options import OptionsValues
+from conans.model.settings import Settings
+from conans.paths import SimplePaths, CONANFILE_TXT
+from conans.test.tools import TestBufferConanOutput
+from conans.test.utils.test_files import temp_folder
+from conans.util.files import save
+
+
+class GraphCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = temp_folder()
+        self.output = TestBufferConanOutput()
+        self.loader = ConanFileLoader(None, Settings(), OptionsValues.loads(""))
+        self.conanfile_path = os.path.join(temp_folder(), CONANFILE_TXT)
+        save(self.conanfile_path, "")
+
+    def _store(self, cache, key):
+        conanfile = self.loader.load_conan_txt(self.conanfile_path, self.output)
+        deps_graph = DepsBuilder(None, self.output).load(None, conanfile)
+        cache.store(key, deps_graph, conanfile)
+        return os.path.join(self.folder, "%s.json" % key)
+
+    def eviction_test(self):
+        cache = GraphCache(self.folder, SimplePaths(temp_folder()), self.loader, self.output)
+        keys = [cache.key("[requires]\nHello%d/0.1@lasote/stable" % index, None)
+                for index in range(3)]
+        size = os.path.getsize(self._store(cache, keys[0]))
+        os.remove(os.path.join(self.folder, "%s.json" % keys[0]))
+
+        cache = GraphCache(self.folder, SimplePaths(temp_folder()), self.loader, self.output,
+                           max_size=2 * size)
+        for index, key in enumerate(keys):
+            entry_path = self._store(cache, key)
+            os.utime(entry_path, (index, index))
+        # The third one exceeded the size, the least recently used was removed
+        self.assertEqual(sorted("%s.json" % key for key in keys[1:]),
+                         sorted(os.listdir(self.folder)))
+
+        # A load() makes it the most recently used one
+        conanfile = self.loader.load_conan_txt(self.conanfile_path, self.output)
+        self.assertIsNotNone(cache.load(keys[1], None, conanfile))
+        self._store(cache, keys[0])
+        self.assertEqual(sorted("%s.json" % key for key in (keys[0], keys[1])),
+                         sorted(os.listdir(self.folder)))
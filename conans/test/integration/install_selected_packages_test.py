@@ -27,13 +27,13 @@ class InstallSelectedPackagesTest(unittest.TestCase):
     def install_some_reference_test(self):
         # Should retrieve the specified packages
         self.new_client.run("install Hello0/0.1@lasote/stable -p %s" % self.package_ids[0])
-        packages = os.listdir(self.new_client.paths.packages(self.ref))
+        packages = self.new_client.paths.conan_packages(self.ref)
         self.assertEquals(len(packages), 1)
         self.assertEquals(packages[0], self.package_ids[0])
 
         self.new_client.run("install Hello0/0.1@lasote/stable -p %s -p %s" % (self.package_ids[0],
                                                                               self.package_ids[1]))
-        packages = os.listdir(self.new_client.paths.packages(self.ref))
+        packages = self.new_client.paths.conan_packages(self.ref)
         self.assertEquals(len(packages), 2)
 
     def _upload_some_packages(self, client):
@@ -47,4 +47,4 @@ class InstallSelectedPackagesTest(unittest.TestCase):
         client.run("install Hello0/0.1@lasote/stable -s os=Linux --build missing")
         client.run("install Hello0/0.1@lasote/stable -s os=Linux -s compiler=gcc -s compiler.version=4.6  --build missing")
         client.run("upload  Hello0/0.1@lasote/stable --all")
-        return os.listdir(self.client.paths.packages(self.ref))
+        return self.client.paths.conan_packages(self.ref)
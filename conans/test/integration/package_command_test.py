@@ -89,8 +89,10 @@ class MyConan(ConanFile):
 
         # And try to do the same without regenerate manifest
         save(os.path.join(package_path, "newfile2.txt"), "new content")
+        self.assertTrue(os.path.exists(package_path + ".stat"))
         self.client.run("install %s" % str(conan_reference), ignore_error=True)
         self.assertIn("Bad package", self.client.user_io.out)
+        self.assertFalse(os.path.exists(package_path + ".stat"))
 
         # Try to do it specifying the package (without --all)
         save(os.path.join(package_path, "newfile3.txt"), "new content")
@@ -0,0 +1,86 @@
+import unittest
+from conans.test.tools import TestServer, TestClient
+from conans.model.ref import ConanFileReference, PackageReference
+from conans.paths import CONANFILE
+from conans.test.utils.cpp_test_files import cpp_hello_conan_files
+import os
+
+
+class ParallelInstallTest(unittest.TestCase):
+
+    def setUp(self):
+        test_server = TestServer([("*/*@*/*", "*")],  # read permissions
+                                 [],  # write permissions
+                                 users={"lasote": "mypass"})  # exported users and passwords
+        self.servers = {"default": test_server}
+        self.client = TestClient(servers=self.servers, users=[("lasote", "mypass")])
+        self.settings = ("-s os=Windows -s compiler='Visual Studio' -s compiler.version=12 "
+                         "-s arch=x86 -s compiler.runtime=MD")
+
+    def _create(self, client, number, version, deps=None, export=True):
+        files = cpp_hello_conan_files(number, version, deps)
+        # To avoid building
+        files = {CONANFILE: files[CONANFILE].replace("def build(self):",
+                                                     "def build(self):\n"
+                                                     "        self.run('echo Built %s' % self.name)\n"
+                                                     "        self.output.info('Run done')\n"
+                                                     "    def build2(self):")}
+        client.save(files, clean_first=True)
+        if export:
+            client.run("export lasote/stable")
+
+    def parallel_test(self):
+        names = ["Hello%d" % index for index in range(4)]
+        conan_refs = [ConanFileReference.loads("%s/0.1@lasote/stable" % name)
+                      for name in names]
+        for name in names:
+            self._create(self.client, name, "0.1")
+        self._create(self.client, "Hello4", "0.1", ["Hello3/0.1@lasote/stable"])
+        self._create(self.client, "Project", "0.1", [str(r) for r in conan_refs] +
+                     ["Hello4/0.1@lasote/stable"], export=False)
+        self.client.run("install %s --build missing -j 4" % self.settings)
+        # The packages of the first level are built in worker processes
+        for conan_ref in conan_refs:
+            self.assertIn("%s: Build process time" % str(conan_ref), str(self.client.user_io.out))
+            # The output of the conanfile and of its commands, from the worker processes
+            self.assertIn("%s: Built %s" % (str(conan_ref), conan_ref.name),
+                          str(self.client.user_io.out))
+            self.assertIn("%s: Run done" % str(conan_ref), str(self.client.user_io.out))
+            package_ids = self.client.paths.conan_packages(conan_ref)
+            self.assertEqual(1, len(package_ids))
+        for name in names + ["Hello4"]:
+            self.client.run("upload %s/0.1@lasote/stable --all" % name)
+
+        # All the packages of the first level are downloaded concurrently
+        other = TestClient(servers=self.servers, users=[("lasote", "mypass")])
+        self._create(other, "Project", "0.1", [str(r) for r in conan_refs] +
+                     ["Hello4/0.1@lasote/stable"], export=False)
+        current_dir = os.getcwd()
+        other.run("install %s -j 4" % self.settings)
+        self.assertEqual(current_dir, os.getcwd())
+
+        output = str(other.user_io.out)
+        for conan_ref in conan_refs + [ConanFileReference.loads("Hello4/0.1@lasote/stable")]:
+            package_ids = other.paths.conan_packages(conan_ref)
+            self.assertEqual(1, len(package_ids))
+            package_ref = PackageReference(conan_ref, package_ids[0])
+            self.assertTrue(other.paths.valid_package_digest(package_ref))
+            self.assertIn("%s: Package installed %s" % (str(conan_ref), package_ids[0]), output)
+
+        # The output of each package is not interleaved with the others
+        positions = [output.index("%s: Installing package" % str(conan_ref))
+                     for conan_ref in conan_refs]
+        self.assertEqual(sorted(positions), positions)
+        for current, following in zip(conan_refs, conan_refs[1:]):
+            block = output[output.index("%s: Installing package" % str(current)):
+                           output.index("%s: Installing package" % str(following))]
+            self.assertNotIn(str(following), block)
+
+        # A missing binary is still reported as an error
+        self._create(other, "Project", "0.1", [str(r) for r in conan_refs],
+                     export=False)
+        error = other.run("install %s -j 4" % self.settings.replace("compiler.version=12",
+                                                                    "compiler.version=11"),
+                          ignore_error=True)
+        self.assertTrue(error)
+        self.assertIn("Can't find a 'Hello0/0.1@lasote/stable' package", str(other.user_io.out))
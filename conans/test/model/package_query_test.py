@@ -0,0 +1,56 @@
+import unittest
+from conans.errors import ConanException
+from conans.model.info import ConanInfo
+from conans.model.package_query import PackageQuery
+
+
+conaninfo = """[settings]
+    os=Linux
+    compiler=gcc
+    compiler.version=5.3
+[options]
+    shared=True
+[full_requires]
+    Boost/1.60.0@lasote/stable:63da998e3642b50bee33f4449826b2d623661505
+    zlib/1.2.8@lasote/stable:2dec3996ef8de7edb0304eaf4efdd96a0477d3a3
+"""
+
+
+class PackageQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.info = ConanInfo.loads(conaninfo)
+
+    def _matches(self, query):
+        return PackageQuery.loads(query).matches(self.info)
+
+    def conditions_test(self):
+        self.assertTrue(self._matches("os=Linux"))
+        self.assertFalse(self._matches("os=Windows"))
+        self.assertTrue(self._matches("os!=Windows"))
+        self.assertTrue(self._matches("compiler.version=5.*"))
+        self.assertTrue(self._matches("options.shared=True"))
+        self.assertFalse(self._matches("options.fPIC=True"))
+        self.assertTrue(self._matches("options.fPIC!=True"))
+        self.assertTrue(self._matches("requires=Boost/*"))
+        self.assertTrue(self._matches("requires=zlib/1.2.8@lasote/stable"))
+        self.assertFalse(self._matches("requires!=zlib/*"))
+        self.assertTrue(self._matches('compiler="gcc"'))
+
+    def operators_test(self):
+        self.assertTrue(self._matches("os=Linux AND compiler.version=5.3 AND "
+                                      "options.shared=True"))
+        self.assertFalse(self._matches("os=Linux and compiler.version=4.9"))
+        self.assertTrue(self._matches("os=Windows OR compiler=gcc"))
+        # AND has precedence over OR
+        self.assertTrue(self._matches("os=Linux OR os=Windows AND compiler=msvc"))
+        self.assertFalse(self._matches("(os=Linux OR os=Windows) AND compiler=msvc"))
+        self.assertEqual(("or", ("=", "os", "Linux"),
+                          ("and", ("=", "os", "Windows"), ("!=", "arch", "x86"))),
+                         PackageQuery.loads("os=Linux OR os=Windows AND arch!=x86").tree)
+
+    def invalid_test(self):
+        for query in ("os", "os=Linux AND", "(os=Linux", "os=Linux)", "os=Linux arch=x86",
+                      "AND os=Linux", "os=Linux OR OR arch=x86"):
+            with self.assertRaisesRegexp(ConanException, "Invalid package query"):
+                PackageQuery.loads(query)
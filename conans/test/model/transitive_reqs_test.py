@@ -14,6 +14,8 @@ from conans.client.conf import default_settings_yml
 from conans.model.values import Values
 from conans.model.config_dict import undefined_field, bad_value_msg
 from conans.test.utils.test_files import temp_folder
+from conans.util.log import logger
+import time
 
 
 class Retriever(object):
@@ -1435,3 +1437,70 @@ class ChatConan(ConanFile):
                          "%s:95c360996106af45b8eec11a37df19fda39a5880\n"
                          "%s:751fd69d10b2a54fdd8610cdae748d6b22700841"
                          % (str(hello_ref), str(say_ref)))
+
+
+class CountingDepsBuilder(DepsBuilder):
+    """ counts how many times the nodes are configured, i.e. expanded
+    """
+    def __init__(self, retriever, output):
+        super(CountingDepsBuilder, self).__init__(retriever, output)
+        self.expansions = 0
+
+    def _config_node(self, *args):
+        self.expansions += 1
+        return super(CountingDepsBuilder, self)._config_node(*args)
+
+
+diamond_content = """
+from conans import ConanFile
+
+class LayerConan(ConanFile):
+    name = "%s"
+    version = "0.1"
+    options = {"shared": [True, False]}
+    default_options = "shared=False"
+    requires = %s
+"""
+
+
+class DiamondScalingTest(unittest.TestCase):
+    """ layered diamonds, every node of a layer requires all the nodes of the next one,
+    so the number of paths grows exponentially with the depth
+    """
+
+    def setUp(self):
+        self.output = TestBufferConanOutput()
+        self.loader = ConanFileLoader(None, Settings.loads(""),
+                                      OptionsValues.loads(""))
+        self.retriever = Retriever(self.loader, self.output)
+
+    def _layer_refs(self, layer, width):
+        return ["Layer%dNode%d/0.1@user/testing" % (layer, index) for index in range(width)]
+
+    def _diamond_graph(self, width, depth):
+        for layer in range(depth):
+            requires = self._layer_refs(layer + 1, width) if layer < depth - 1 else []
+            for index, ref in enumerate(self._layer_refs(layer, width)):
+                content = diamond_content % ("Layer%dNode%d" % (layer, index), tuple(requires))
+                self.retriever.conan(ref, content)
+        root_content = diamond_content % ("Root", tuple(self._layer_refs(0, width)))
+        root_conan = self.retriever.root(root_content)
+        builder = CountingDepsBuilder(self.retriever, self.output)
+        start = time.time()
+        deps_graph = builder.load(None, root_conan)
+        logger.info("Diamond graph width %d, depth %d: %d expansions, %.3f s"
+                    % (width, depth, builder.expansions, time.time() - start))
+        return deps_graph, builder.expansions
+
+    def scaling_test(self):
+        width = 10
+        for depth in (2, 5, 10):
+            deps_graph, expansions = self._diamond_graph(width, depth)
+            self.assertEqual(width * depth + 1, len(deps_graph.nodes))
+            self.assertEqual(width * width * (depth - 1) + width, len(deps_graph.edges))
+            # at most once per incoming edge, instead of once per path
+            self.assertLessEqual(expansions, len(deps_graph.edges) + 1)
+            levels = deps_graph.by_levels()
+            self.assertEqual(depth + 1, len(levels))
+            conanfile = deps_graph.get_nodes("Layer0Node0")[0].conanfile
+            self.assertEqual(width * (depth - 1), len(conanfile.info.full_requires))
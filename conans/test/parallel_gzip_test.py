@@ -0,0 +1,51 @@
+import unittest
+import gzip
+import os
+from cStringIO import StringIO
+from conans.util.parallel_gzip import ParallelGzipWriter
+from conans.util.files import gzopen_without_timestamps, tar_extract, load
+from conans.test.utils.test_files import temp_folder
+import tarfile
+
+
+class ParallelGzipTest(unittest.TestCase):
+
+    def _compress(self, data, threads, compresslevel=9, write_size=7777):
+        output = StringIO()
+        writer = ParallelGzipWriter("file.tgz", output, compresslevel, threads, block_size=10000)
+        for index in range(0, len(data), write_size):
+            writer.write(data[index:index + write_size])
+        writer.close()
+        return output.getvalue()
+
+    def valid_gzip_test(self):
+        data = os.urandom(25000) + "repeated contents " * 10000
+        for threads in (1, 3):
+            for compresslevel in (1, 6, 9):
+                compressed = self._compress(data, threads, compresslevel)
+                self.assertEqual(data, gzip.GzipFile(fileobj=StringIO(compressed)).read())
+
+        self.assertEqual("", gzip.GzipFile(fileobj=StringIO(self._compress("", 2))).read())
+
+    def deterministic_test(self):
+        data = "repeated contents " * 10000
+        compressed = self._compress(data, threads=1)
+        self.assertEqual(compressed, self._compress(data, threads=4))
+        self.assertEqual(compressed, self._compress(data, threads=4, write_size=100))
+        self.assertNotEqual(compressed, self._compress(data, threads=1, compresslevel=1))
+
+    def tar_extract_test(self):
+        output = StringIO()
+        tgz = gzopen_without_timestamps("file.tgz", mode="w", fileobj=output, threads=2)
+        contents = {"file%d.txt" % index: ("contents %d" % index) * 5000 for index in range(5)}
+        for name, content in sorted(contents.iteritems()):
+            info = tarfile.TarInfo(name=name)
+            info.size = len(content)
+            tgz.addfile(tarinfo=info, fileobj=StringIO(content))
+        tgz.close()
+
+        for streaming in (False, True):
+            folder = temp_folder()
+            tar_extract(StringIO(output.getvalue()), folder, streaming=streaming)
+            for name, content in contents.iteritems():
+                self.assertEqual(content, load(os.path.join(folder, name)))
@@ -5,6 +5,10 @@ import os
 from conans.server.store.disk_adapter import DiskAdapter
 from conans.server.store.file_manager import FileManager
 from conans.test.utils.test_files import temp_folder
+from conans.util.files import save
+from conans.client.packager import generate_manifest
+from conans.model import manifest
+from mock import patch
 
 
 class PathsTest(unittest.TestCase):
@@ -87,3 +91,43 @@ class PathsTest(unittest.TestCase):
         # Case sensitive search
         self.assertEqual(str(file_manager._exported_conans(pattern="SDL*", ignorecase=False)[0]),
                          str(conan_ref5))
+
+    def valid_digest_test(self):
+        folder = temp_folder()
+        paths = StorePaths(folder)
+        conan_ref = ConanFileReference.loads("opencv/2.4.10@lasote/testing")
+        package_ref = PackageReference(conan_ref, "456fa678eae68")
+        package_folder = paths.package(package_ref)
+        save(os.path.join(package_folder, "include", "lib.h"), "//header")
+        save(os.path.join(package_folder, "lib", "lib.a"), "lib")
+        generate_manifest(package_folder)
+
+        md5sum_calls = []
+        original_md5sum = manifest.md5sum
+
+        def counted_md5sum(file_path):
+            md5sum_calls.append(file_path)
+            return original_md5sum(file_path)
+
+        with patch.object(manifest, "md5sum", counted_md5sum):
+            self.assertTrue(paths.valid_package_digest(package_ref))
+            self.assertEqual(3, len(md5sum_calls))  # The manifest too
+            # The stat data is stored outside of the package
+            self.assertTrue(os.path.exists(package_folder + ".stat"))
+            self.assertEqual(["456fa678eae68"], paths.conan_packages(conan_ref))
+
+            # Nothing changed, nothing is read again
+            md5sum_calls[:] = []
+            self.assertTrue(paths.valid_package_digest(package_ref))
+            self.assertEqual([], md5sum_calls)
+
+            # Only the modified file is read again
+            save(os.path.join(package_folder, "lib", "lib.a"), "corrupted lib")
+            self.assertFalse(paths.valid_package_digest(package_ref))
+            self.assertEqual([os.path.join(package_folder, "lib", "lib.a")], md5sum_calls)
+
+            # Full verification always reads everything
+            md5sum_calls[:] = []
+            paths.verify_full = True
+            self.assertFalse(paths.valid_package_digest(package_ref))
+            self.assertEqual(3, len(md5sum_calls))
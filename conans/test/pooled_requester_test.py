@@ -0,0 +1,76 @@
+import unittest
+import threading
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from requests.exceptions import RetryError
+from conans.client.rest.pooled_requester import PooledRequester, IDEMPOTENT_METHODS
+from conans.client.rest.rest_client import RestApiClient
+from conans.client.rest.uploader_downloader import Downloader
+from conans.errors import ConanConnectionError
+from conans.test.tools import TestBufferConanOutput
+
+
+class PooledRequesterTest(unittest.TestCase):
+
+    def session_per_host_test(self):
+        requester = PooledRequester(proxies={"http": "http://proxy:3128"}, pool_size=4,
+                                    retries=2)
+        session = requester._session("https://server.com/v1/ping")
+        self.assertIs(session, requester._session("https://server.com/v1/conans/Hello"))
+        self.assertIsNot(session, requester._session("https://other.com/v1/ping"))
+        self.assertIsNot(session, requester._session("http://server.com/v1/ping"))
+        self.assertEqual({"http": "http://proxy:3128"}, session.proxies)
+
+        adapter = session.get_adapter("https://server.com/v1/ping")
+        self.assertEqual(4, adapter._pool_maxsize)
+        self.assertEqual(2, adapter.max_retries.total)
+        # Uploads are not repeated, their body is a stream
+        self.assertNotIn("PUT", adapter.max_retries.method_whitelist)
+        self.assertEqual(IDEMPOTENT_METHODS, adapter.max_retries.method_whitelist)
+
+        requester.close()
+        self.assertIsNot(session, requester._session("https://server.com/v1/ping"))
+
+    def client_per_remote_test(self):
+        requester = PooledRequester()
+        client = RestApiClient(TestBufferConanOutput(), requester)
+        client.token = "mytoken"
+        remote_client = client.for_remote("https://server.com")
+        self.assertEqual("https://server.com", remote_client.remote_url)
+        self.assertEqual("mytoken", remote_client.token)
+        self.assertIs(requester, remote_client.requester)
+        self.assertIsNone(client.remote_url)
+
+    def unavailable_test(self):
+        requests_received = []
+
+        class UnavailableHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests_received.append(self.path)
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("localhost", 0), UnavailableHandler)
+        serving = threading.Thread(target=server.serve_forever)
+        serving.daemon = True
+        serving.start()
+        try:
+            url = "http://localhost:%d/file.tgz" % server.server_port
+            requester = PooledRequester(retries=1)
+            with self.assertRaises(RetryError):
+                requester.get(url)
+            self.assertEqual(2, len(requests_received))
+
+            # The downloader doesn't retry them again
+            del requests_received[:]
+            downloader = Downloader(requester, TestBufferConanOutput(), verify=False)
+            with self.assertRaisesRegexp(ConanConnectionError, "Error downloading file"):
+                downloader.download(url)
+            self.assertEqual(2, len(requests_received))
+            requester.close()
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -20,8 +20,8 @@ class RestApiTest(unittest.TestCase):
     def setUp(self):
         self.server = TestServerLauncher()
         self.server.start()
-        self.api = RestApiClient(ConanOutput(sys.stdout, Color), requester=requests)
-        self.api.remote_url = "http://localhost:%s" % str(self.server.port)
+        self.api = RestApiClient(ConanOutput(sys.stdout, Color), requester=requests,
+                                 remote_url="http://localhost:%s" % str(self.server.port))
 
         time.sleep(0.05)  # necessary in linux
         # Authenticate user
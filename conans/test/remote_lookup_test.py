@@ -0,0 +1,184 @@
+import unittest
+import os
+from collections import OrderedDict
+from conans.test.tools import TestClient, TestServer
+from conans.model.ref import ConanFileReference, PackageReference
+from conans.model.manifest import FileTreeManifest
+from conans.paths import CONANFILE, CONAN_MANIFEST
+from conans.util.files import save
+from conans.errors import NotFoundException, ConanConnectionError
+from requests.exceptions import ConnectionError
+
+
+conanfile = """
+from conans import ConanFile
+
+class HelloConan(ConanFile):
+    name = "Hello"
+    version = "1.2.1"
+"""
+
+
+class RemoteLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = OrderedDict()
+        for name in ("remote0", "remote1", "remote2"):
+            self.servers[name] = TestServer([("*/*@*/*", "*")], [("*/*@*/*", "*")],
+                                            users={"lasote": "mypass"})
+        self.conan_ref = ConanFileReference.loads("Hello/1.2.1@lasote/stable")
+        self.package_ref = PackageReference(self.conan_ref, "fakeid")
+
+        # Only the last remote has the package
+        uploader = TestClient(servers={"default": self.servers["remote2"]},
+                              users=[("lasote", "mypass")])
+        uploader.init_dynamic_vars()
+        self._create(uploader, self.package_ref)
+        uploader.remote_manager.upload_conan(self.conan_ref)
+        uploader.remote_manager.upload_package(self.package_ref)
+
+        self.client = TestClient(servers=self.servers, users=[("lasote", "mypass")])
+        self.client.init_dynamic_vars()
+        self.requester = _UnreachableRequester(self.client.requester)
+        self.client.rest_api_client.requester = self.requester
+
+    def _create(self, client, package_ref):
+        export_folder = client.paths.export(package_ref.conan)
+        client.save({CONANFILE: conanfile}, path=export_folder)
+        client.save({CONAN_MANIFEST: str(FileTreeManifest.create(export_folder))},
+                    path=export_folder)
+        package_folder = client.paths.package(package_ref)
+        save(os.path.join(package_folder, "lib", "lib.a"), "//lib")
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
+
+    def _requested(self, remote):
+        return [url for url in self.requester.urls
+                if url.startswith(self.servers[remote].fake_url)]
+
+    def lookup_test(self):
+        """ the first remote is asked directly, if it doesn't have the reference the rest
+        are asked at once, the download is done from the first one in order that has it,
+        and the misses are asked last
+        """
+        self.client.remote_manager.get_conanfile(self.conan_ref)
+        self.client.remote_manager.get_package(self.package_ref)
+        self.assertIn("Found in remote 'remote2'", str(self.client.user_io.out))
+        self.assertTrue(self.client.paths.valid_package_digest(self.package_ref))
+        self.assertEqual(2, len(self._requested("remote0")))
+        # The next ones are only asked if they have it
+        self.assertEqual(2, len(self._requested("remote1")))
+        self.assertEqual([], [url for url in self._requested("remote1")
+                              if "download_urls" in url or "signature" in url])
+        misses = self.client.localdb.get_remote_misses(str(self.package_ref), 300)
+        self.assertEqual(set([self.servers["remote0"].fake_url,
+                              self.servers["remote1"].fake_url]), misses)
+
+        # The remotes where it was recently missing are asked last
+        self.requester.urls = []
+        self.client.remote_manager.get_package(self.package_ref)
+        self.assertTrue(self.requester.urls[0].startswith(self.servers["remote2"].fake_url))
+        self.assertEqual([], self._requested("remote0") + self._requested("remote1"))
+
+        # A binary in none of them is always looked up
+        missing_ref = PackageReference(self.conan_ref, "missingid")
+        self.assertRaises(NotFoundException, self.client.remote_manager.get_package,
+                          missing_ref)
+        self.requester.urls = []
+        self.assertRaises(NotFoundException, self.client.remote_manager.get_package,
+                          missing_ref)
+        self.assertNotEqual([], self._requested("remote0"))
+
+        # So it's found once another client uploads it
+        uploader = TestClient(servers={"default": self.servers["remote1"]},
+                              users=[("lasote", "mypass")])
+        uploader.init_dynamic_vars()
+        self._create(uploader, missing_ref)
+        uploader.remote_manager.upload_conan(self.conan_ref)
+        uploader.remote_manager.upload_package(missing_ref)
+        self.client.remote_manager.get_package(missing_ref)
+        self.assertTrue(self.client.paths.valid_package_digest(missing_ref))
+
+        # Or from this client
+        uploaded_ref = PackageReference(self.conan_ref, "uploadedid")
+        self.assertRaises(NotFoundException, self.client.remote_manager.get_package,
+                          uploaded_ref)
+        self._create(self.client, uploaded_ref)
+        self.client.remote_manager.upload_package(uploaded_ref, "remote2")
+        self.client.remote_manager.get_package(uploaded_ref)
+        self.assertTrue(self.client.paths.valid_package_digest(uploaded_ref))
+
+        # Found in the first remote, the others are not asked
+        first_ref = PackageReference(self.conan_ref, "firstid")
+        uploader = TestClient(servers={"default": self.servers["remote0"]},
+                              users=[("lasote", "mypass")])
+        uploader.init_dynamic_vars()
+        self._create(uploader, first_ref)
+        uploader.remote_manager.upload_conan(self.conan_ref)
+        uploader.remote_manager.upload_package(first_ref)
+        self.requester.urls = []
+        self.client.remote_manager.get_package(first_ref)
+        self.client.remote_manager.close()
+        self.assertEqual([], self._requested("remote1") + self._requested("remote2"))
+
+    def uploaded_after_miss_test(self):
+        """ a reference missing in the only remote is found once another client uploads it
+        """
+        client = TestClient(servers={"default": self.servers["remote0"]},
+                            users=[("lasote", "mypass")])
+        client.init_dynamic_vars()
+        self.assertRaises(NotFoundException, client.remote_manager.get_conanfile,
+                          self.conan_ref)
+        uploader = TestClient(servers={"default": self.servers["remote0"]},
+                              users=[("lasote", "mypass")])
+        uploader.init_dynamic_vars()
+        self._create(uploader, self.package_ref)
+        uploader.remote_manager.upload_conan(self.conan_ref)
+        client.remote_manager.get_conanfile(self.conan_ref)
+        self.assertTrue(client.paths.valid_conan_digest(self.conan_ref))
+
+    def circuit_breaker_test(self):
+        """ a remote that fails to connect several times in a row is skipped for a while
+        """
+        self.requester.unreachable = self.servers["remote0"].fake_url
+        for _ in range(3):
+            self.client.remote_manager.get_conanfile(self.conan_ref)
+            self.assertIn("Unable to connect to remote0", str(self.client.user_io.out))
+            self.client.init_dynamic_vars()
+            self.client.rest_api_client.requester = self.requester
+        self.requester.urls = []
+        self.client.remote_manager.get_conanfile(self.conan_ref)
+        self.assertEqual([], self._requested("remote0"))
+        self.assertTrue(self.client.paths.valid_conan_digest(self.conan_ref))
+
+        # If all the remotes are skipped, they are tried anyway
+        self.client.localdb.set_remote_failures(self.servers["remote1"].fake_url, 3)
+        self.client.localdb.set_remote_failures(self.servers["remote2"].fake_url, 3)
+        self.requester.unreachable = None
+        self.client.remote_manager.get_package(self.package_ref)
+        self.assertTrue(self.client.paths.valid_package_digest(self.package_ref))
+        # And the ones that work again are not skipped anymore
+        self.assertEqual((0, None),
+                         self.client.localdb.get_remote_failures(self.servers["remote2"].fake_url))
+
+        self.requester.unreachable = self.servers["remote2"].fake_url
+        self.assertRaises(ConanConnectionError, self.client.remote_manager.get_package,
+                          PackageReference(self.conan_ref, "otherid"))
+
+
+class _UnreachableRequester(object):
+    """ records the requested urls, and fails to connect to the unreachable one
+    """
+    def __init__(self, requester):
+        self._requester = requester
+        self.unreachable = None
+        self.urls = []
+
+    def __getattr__(self, name):
+        return getattr(self._requester, name)
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if self.unreachable and url.startswith(self.unreachable):
+            raise ConnectionError("Connection refused")
+        return self._requester.get(url, **kwargs)
@@ -1,7 +1,8 @@
 import unittest
 from conans.client.remote_manager import RemoteManager
 from mock import Mock
-from conans.errors import NotFoundException
+from conans.errors import NotFoundException, ConanConnectionError
+from requests.exceptions import RetryError
 from conans.model.ref import ConanFileReference, PackageReference
 from conans.client.paths import ConanPaths
 from conans.test.tools import TestBufferConanOutput, TestClient
@@ -14,12 +15,18 @@ class MockRemoteClient(object):
     def __init__(self):
         self.upload_package = Mock()
         self.get_conan_digest = Mock()
-        self.get_conanfile = Mock(return_value=[("one.txt", "ONE")])
-        self.get_package = Mock(return_value=[("one.txt", "ONE")])
+        self.get_conan_snapshot = Mock(return_value={})
+        self.get_package_snapshot = Mock(return_value={})
+        self.get_conanfile = Mock(return_value=[("one.txt", ["ONE"])])
+        self.get_package = Mock(return_value=[("one.txt", ["ONE"])])
         self.remote_url = None
 
         self.raise_count = 0
 
+    def for_remote(self, remote_url):
+        self.remote_url = remote_url
+        return self
+
     def upload_conan(self, *argc, **argv):  # @UnusedVariable
         if self.remote_url != "url3":
             self.raise_count += 1
@@ -40,6 +47,16 @@ class RemoteManagerTest(unittest.TestCase):
         self.remotes = [("default", "url1"), ("other", "url2"), ("last", "url3")]
         self.manager = RemoteManager(self.paths, self.remotes, self.remote_client, self.output)
 
+    def test_unavailable_remote(self):
+        """ the temporary errors already retried by the requester are connection errors, the
+        next remote is tried
+        """
+        self.remote_client.get_conan_digest.side_effect = RetryError("Max retries exceeded")
+        with self.assertRaisesRegexp(ConanConnectionError, "All remotes failed"):
+            self.manager.get_conan_digest(self.conan_reference, None)
+        self.assertEqual(3, self.remote_client.get_conan_digest.call_count)
+        self.assertIn("Remote last=url3 unavailable", self.output)
+
     def test_no_remotes(self):
         client = TestClient()
         files = cpp_hello_conan_files("Hello0", "0.1")
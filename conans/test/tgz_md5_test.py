@@ -1,10 +1,11 @@
 import unittest
 from conans.test.utils.test_files import temp_folder
-from conans.util.files import save, md5sum
+from conans.util.files import save, md5sum, md5, load
 from conans.paths import PACKAGE_TGZ_NAME
 import os
 import time
-from conans.client.remote_manager import compress_files
+from conans.client.remote_manager import compress_files, compress_folder_files,\
+    remove_spooled_files
 
 
 class TgzMd5Test(unittest.TestCase):
@@ -30,3 +31,47 @@ class TgzMd5Test(unittest.TestCase):
         md5_b = md5sum(file_path)
 
         self.assertEquals(md5_a, md5_b)
+
+    def folder_compression_test(self):
+        """ compressing from disk to a spooled file gives the same tgz as in memory
+        """
+        files = {"one_file.txt": "The contents",
+                 "subdir/Two_file.txt": "Two contents" * 100000,
+                 "conaninfo.txt": "info"}
+        folder = temp_folder()
+        for name, contents in files.iteritems():
+            save(os.path.join(folder, name), contents)
+
+        excluded = ["conaninfo.txt"]
+        in_memory = compress_files(files, PACKAGE_TGZ_NAME, excluded=excluded)
+        spooled = compress_folder_files(folder, list(files), PACKAGE_TGZ_NAME, excluded=excluded)
+
+        self.assertEqual(in_memory["conaninfo.txt"], spooled["conaninfo.txt"])
+        tgz = spooled[PACKAGE_TGZ_NAME]
+        self.assertEqual(in_memory[PACKAGE_TGZ_NAME], load(tgz.path))
+        self.assertEqual(len(in_memory[PACKAGE_TGZ_NAME]), len(tgz))
+        self.assertEqual(md5(in_memory[PACKAGE_TGZ_NAME]), tgz.md5)
+
+        remove_spooled_files(spooled)
+        self.assertFalse(os.path.exists(tgz.path))
+
+    def deterministic_folder_compression_test(self):
+        """ the tgz doesn't depend on the order, times or permissions of the files
+        """
+        files = {"b.txt": "b contents", "a/c.txt": "c contents", "a.txt": "a contents"}
+
+        def compressed_md5(names, mtime, mode):
+            folder = temp_folder()
+            for name in names:
+                path = os.path.join(folder, name)
+                save(path, files[name])
+                os.chmod(path, mode)
+                os.utime(path, (mtime, mtime))
+            compressed = compress_folder_files(folder, names, PACKAGE_TGZ_NAME, excluded=[])
+            result = compressed[PACKAGE_TGZ_NAME].md5
+            remove_spooled_files(compressed)
+            return result
+
+        md5_a = compressed_md5(["b.txt", "a/c.txt", "a.txt"], 1000, 0644)
+        md5_b = compressed_md5(["a.txt", "b.txt", "a/c.txt"], 2000, 0664)
+        self.assertEqual(md5_a, md5_b)
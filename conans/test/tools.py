@@ -47,14 +47,18 @@ class TestingResponse(object):
 
     @property
     def ok(self):
-        return self.test_response.status_code == 200
+        return self.test_response.status_code < 400
 
     @property
     def content(self):
         return self.test_response.body
 
-    def iter_content(self, chunk_size=1):  # @UnusedVariable
-        return [self.content]
+    def iter_content(self, chunk_size=1):
+        content = self.content
+        return [content[i:i + chunk_size] for i in xrange(0, len(content), chunk_size)]
+
+    def iter_lines(self):
+        return self.content.splitlines()
 
     @property
     def status_code(self):
@@ -82,7 +86,7 @@ class TestRequester(object):
         raise Exception("Testing error: Not remote found")
 
     def get(self, url, auth=None, headers=None, verify=None, stream=None):
-        headers = headers or {}
+        headers = dict(headers or {})  # As requests, not modifying the given ones
         app, url = self._prepare_call(url, headers, auth)
         if app:
             response = app.get(url, headers=headers, expect_errors=True)
@@ -101,7 +105,7 @@ class TestRequester(object):
             return requests.put(url, data=data.read())
 
     def delete(self, url, auth, headers, verify=None):
-        headers = headers or {}
+        headers = dict(headers or {})
         app, url = self._prepare_call(url, headers, auth)
         if app:
             response = app.delete(url, "", headers=headers, expect_errors=True)
@@ -110,7 +114,7 @@ class TestRequester(object):
             return requests.delete(url, headers=headers)
 
     def post(self, url, auth=None, headers=None, verify=None, stream=None, data=None, json=None):
-        headers = headers or {}
+        headers = dict(headers or {})
         app, url = self._prepare_call(url, headers, auth)
         if app:
             content_type = None
@@ -311,7 +315,7 @@ class TestClient(object):
         auth_manager = ConanApiAuthManager(self.rest_api_client, self.user_io, self.localdb)
         # Handle remote connections
         self.remote_manager = RemoteManager(self.paths, self.servers.items(), auth_manager,
-                                            self.user_io.out)
+                                            self.user_io.out, self.localdb)
         # self.loader = ConanFileLoader(self.user_io.out, self.runner, self.paths.settings, None)
 
     def run(self, command_line, user_io=None, ignore_error=False):
@@ -331,6 +335,7 @@ class TestClient(object):
             error = command.run(args)
         finally:
             os.chdir(current_dir)
+            self.remote_manager.close()
 
         if not ignore_error and error:
             logger.error(self.user_io.out)
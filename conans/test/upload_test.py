@@ -4,11 +4,16 @@ from conans.test.utils.test_files import hello_source_files, temp_folder
 from conans.client.manager import CONANFILE
 import os
 from conans.paths import CONAN_MANIFEST, PACKAGE_TGZ_NAME, EXPORT_TGZ_NAME
-from conans.util.files import save
+from conans.util.files import save, load, rmdir
 from conans.model.ref import ConanFileReference, PackageReference
 from conans.model.manifest import FileTreeManifest
 from conans.test.utils.test_files import uncompress_packaged_files
 from conans.tools import untargz
+from conans.client.remote_manager import RemoteManager
+from conans.errors import ConanException
+from conans.server.store.blob_store import BLOBS_FOLDER
+from mock import patch
+import shutil
 
 
 myconan1 = """
@@ -114,11 +119,161 @@ class UploadTest(unittest.TestCase):
 
     def upload_all_test(self):
         '''Upload conans and package together'''
+        export_folder = self.client.paths.export(self.conan_ref)
+        save(os.path.join(export_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(export_folder)))
+        package_folder = self.client.paths.package(self.package_ref)
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
         # Try to upload all conans and packages
         self.client.run('upload %s --all' % str(self.conan_ref))
         self.assertTrue(os.path.exists(self.server_reg_folder))
         self.assertTrue(os.path.exists(self.server_pack_folder))
 
+        # Nothing changed, so nothing is compressed nor uploaded again
+        with patch("conans.client.remote_manager.compress_folder_files") as compress:
+            self.client.run('upload %s --all' % str(self.conan_ref))
+        self.assertFalse(compress.called)
+        self.assertIn("Package is up to date.", self.client.user_io.out)
+
+        # A changed package is compressed and uploaded
+        save(os.path.join(package_folder, "include", "lib1.h"), "//header modified")
+        manifest = FileTreeManifest.create(package_folder)
+        save(os.path.join(package_folder, CONAN_MANIFEST), str(manifest))
+        self.client.run('upload %s --all' % str(self.conan_ref))
+        self.assertNotIn("Package is up to date.", self.client.user_io.out)
+        self.assertEqual(str(manifest),
+                         load(os.path.join(self.server_pack_folder, CONAN_MANIFEST)))
+
+        # Modified after its manifest was computed, it's not up to date
+        save(os.path.join(package_folder, "include", "lib1.h"), "//header edited")
+        self.client.run('upload %s --all' % str(self.conan_ref))
+        self.assertNotIn("Package is up to date.", self.client.user_io.out)
+        folder = uncompress_packaged_files(self.test_server.paths, self.package_ref)
+        self.assertEqual("//header edited", load(os.path.join(folder, "include", "lib1.h")))
+        # With its local manifest, so the consumers detect the mismatch
+        self.assertEqual(str(manifest),
+                         load(os.path.join(self.server_pack_folder, CONAN_MANIFEST)))
+
+        # Back to the contents of the manifest, the remote has to be updated too
+        save(os.path.join(package_folder, "include", "lib1.h"), "//header modified")
+        self.client.run('upload %s --all' % str(self.conan_ref))
+        self.assertNotIn("Package is up to date.", self.client.user_io.out)
+        folder = uncompress_packaged_files(self.test_server.paths, self.package_ref)
+        self.assertEqual("//header modified", load(os.path.join(folder, "include", "lib1.h")))
+        self.assertEqual(str(manifest),
+                         load(os.path.join(self.server_pack_folder, CONAN_MANIFEST)))
+
+    def compressed_cache_test(self):
+        """ the compressed files are reused to upload again the same package
+        """
+        export_folder = self.client.paths.export(self.conan_ref)
+        save(os.path.join(export_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(export_folder)))
+        package_folder = self.client.paths.package(self.package_ref)
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
+        self.client.run('upload %s --all' % str(self.conan_ref))
+        uploaded_tgz = load(os.path.join(self.server_pack_folder, PACKAGE_TGZ_NAME))
+
+        # Removed from the server, as if uploading to other one
+        rmdir(self.server_pack_folder)
+        with patch("conans.client.remote_manager.compress_folder_files") as compress:
+            self.client.run('upload %s --all' % str(self.conan_ref))
+        self.assertFalse(compress.called)
+        self.assertEqual(load(os.path.join(package_folder, CONAN_MANIFEST)),
+                         load(os.path.join(self.server_pack_folder, CONAN_MANIFEST)))
+        self.assertEqual(uploaded_tgz,
+                         load(os.path.join(self.server_pack_folder, PACKAGE_TGZ_NAME)))
+
+        # A modified package doesn't use the cached file
+        save(os.path.join(package_folder, "include", "lib1.h"), "//header modified")
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
+        with patch("conans.client.remote_manager.compress_folder_files") as compress:
+            compress.side_effect = ConanException("Compressing")
+            error = self.client.run('upload %s --all' % str(self.conan_ref), ignore_error=True)
+        self.assertTrue(error)
+        self.assertIn("Compressing", self.client.user_io.out)
+
+    def promotion_test(self):
+        """ the files already stored in the server are linked instead of uploaded again
+        """
+        package_folder = self.client.paths.package(self.package_ref)
+        save(os.path.join(package_folder, CONAN_MANIFEST),
+             str(FileTreeManifest.create(package_folder)))
+        self.client.run('upload %s --all' % str(self.conan_ref))
+        uploaded = {EXPORT_TGZ_NAME: load(os.path.join(self.server_reg_folder, EXPORT_TGZ_NAME)),
+                    PACKAGE_TGZ_NAME: load(os.path.join(self.server_pack_folder,
+                                                        PACKAGE_TGZ_NAME))}
+
+        testing_ref = ConanFileReference.loads("Hello/1.2.1@frodo/testing")
+        testing_package_ref = PackageReference(testing_ref, self.package_ref.package_id)
+        shutil.copytree(self.client.paths.export(self.conan_ref),
+                        self.client.paths.export(testing_ref))
+        shutil.copytree(package_folder, self.client.paths.package(testing_package_ref))
+        self.client.run('upload %s --all' % str(testing_ref))
+        output = str(self.client.user_io.out)
+        for tgz_name in (EXPORT_TGZ_NAME, PACKAGE_TGZ_NAME):
+            self.assertIn("Already in the remote, not uploaded: %s" % tgz_name, output)
+            self.assertNotIn("Uploading %s" % tgz_name, output)
+        server_paths = self.test_server.paths
+        self.assertTrue(os.path.samefile(os.path.join(self.server_pack_folder, PACKAGE_TGZ_NAME),
+                                         os.path.join(server_paths.package(testing_package_ref),
+                                                      PACKAGE_TGZ_NAME)))
+        self.assertEqual(load(os.path.join(package_folder, CONAN_MANIFEST)),
+                         load(os.path.join(server_paths.package(testing_package_ref),
+                                           CONAN_MANIFEST)))
+
+        # The linked files remain when the original ones are removed
+        self.client.run('remove %s -r default -f' % str(self.conan_ref))
+        self.assertFalse(os.path.exists(self.server_pack_folder))
+        for tgz_path in (os.path.join(server_paths.export(testing_ref), EXPORT_TGZ_NAME),
+                         os.path.join(server_paths.package(testing_package_ref),
+                                      PACKAGE_TGZ_NAME)):
+            self.assertEqual(uploaded[os.path.basename(tgz_path)], load(tgz_path))
+
+        # And the stored blobs with the last ones
+        self.client.run('remove %s -r default -f' % str(testing_ref))
+        blobs_folder = os.path.join(server_paths.store, BLOBS_FOLDER)
+        self.assertEqual([], [files for _, _, files in os.walk(blobs_folder) if files])
+
+    def parallel_upload_all_test(self):
+        package_ids = ["myfakeid%d" % index for index in range(4)]
+        for package_id in package_ids:
+            package_folder = self.client.paths.package(PackageReference(self.conan_ref,
+                                                                        package_id))
+            save(os.path.join(package_folder, "lib", "lib.a"), "//lib %s" % package_id)
+
+        # The first attempt of one of the packages fails, only that one is retried
+        original_upload_package = RemoteManager.upload_package
+        attempts = []
+
+        def upload_package(manager, package_reference, remote=None, output=None):
+            attempts.append(package_reference.package_id)
+            if attempts.count("myfakeid2") == 1 and package_reference.package_id == "myfakeid2":
+                raise ConanException("Connection reset")
+            return original_upload_package(manager, package_reference, remote, output)
+
+        with patch.object(RemoteManager, "upload_package", upload_package):
+            self.client.run('upload %s --all -j 3' % str(self.conan_ref))
+
+        output = str(self.client.user_io.out)
+        all_ids = sorted(package_ids + [self.package_ref.package_id])
+        self.assertEqual(sorted(attempts), sorted(all_ids + ["myfakeid2"]))
+        self.assertIn("Upload of package myfakeid2 failed: Connection reset", output)
+        self.assertIn("Retrying the upload of 1 failed package(s)", output)
+        for package_id in all_ids:
+            package_ref = PackageReference(self.conan_ref, package_id)
+            self.assertTrue(os.path.exists(self.test_server.paths.package(package_ref)))
+        # Output of each package written in order
+        positions = [output.index("Uploading package %d/5" % index) for index in range(1, 6)]
+        self.assertEqual(sorted(positions), positions)
+
+        # Up to date packages are not uploaded again
+        self.client.run('upload %s --all -j 3' % str(self.conan_ref))
+        self.assertEqual(5, str(self.client.user_io.out).count("Package is up to date."))
+
     def force_test(self):
         '''Tries to upload a conans exported after than remote version.'''
         # Upload all conans and packages
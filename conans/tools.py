@@ -6,7 +6,7 @@ from conans.errors import ConanException
 from conans.util.files import _generic_algorithm_sum, save
 from patch import fromfile, fromstring
 from conans.client.rest.uploader_downloader import Downloader
-import requests
+from conans.client.rest.pooled_requester import PooledRequester
 from conans.client.output import ConanOutput
 
 
@@ -70,13 +70,25 @@ def get(url):
     os.unlink(filename)
 
 
+# Shared by all the downloads, so they reuse the connections. The conan command sets
+# it with the configured proxies
+_global_requester = None
+
+
+def _requester():
+    global _global_requester
+    if _global_requester is None:
+        _global_requester = PooledRequester()
+    return _global_requester
+
+
 def download(url, filename, verify=True):
     out = ConanOutput(sys.stdout, True)
     if verify:
         # We check the certificate using a list of known verifiers
         import conans.client.rest.cacert as cacert
         verify = cacert.file_path
-    downloader = Downloader(requests, out, verify=verify)
+    downloader = Downloader(_requester(), out, verify=verify)
     content = downloader.download(url)
     out.writeln("")
     save(filename, content)
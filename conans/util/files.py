@@ -4,9 +4,12 @@ from errno import ENOENT, EEXIST
 import hashlib
 import sys
 import tarfile
+import tempfile
 from os.path import abspath, realpath, join as joinpath
 import platform
 import re
+from contextlib import contextmanager
+from conans.util.parallel_gzip import ParallelGzipWriter
 
 
 def normalize(text):
@@ -22,6 +25,14 @@ def md5(content):
     return md5alg.hexdigest()
 
 
+def contents_md5(contents):
+    """ md5 of a string or of the already computed one of a FileContents
+    """
+    if isinstance(contents, FileContents):
+        return contents.md5
+    return md5(contents)
+
+
 def md5sum(file_path):
     return _generic_algorithm_sum(file_path, "md5")
 
@@ -54,6 +65,19 @@ def save(path, content):
         handle.write(content)
 
 
+def save_chunks(path, chunks):
+    """ writes the chunks to path as they are generated
+    """
+    try:
+        os.makedirs(os.path.dirname(path))
+    except:
+        pass
+
+    with open(path, 'wb') as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+
+
 def save_files(path, files):
     for name, content in files.iteritems():
         save(os.path.join(path, name), content)
@@ -65,6 +89,56 @@ def load(path):
         return handle.read()
 
 
+class FileContents(object):
+    """ Contents of a file in disk, with its already known size and md5, to be used
+    instead of a string with the whole contents in a files dict. len() returns its size
+    """
+    def __init__(self, path, size, md5):
+        self.path = path
+        self.size = size
+        self.md5 = md5
+
+    def chunks(self, chunk_size):
+        with open(self.path, "rb") as handle:
+            while True:
+                data = handle.read(chunk_size)
+                if not data:
+                    break
+                yield data
+
+    def __len__(self):
+        return self.size
+
+
+class SpooledContents(FileContents):
+    """ Contents written to a temporary file instead of kept in memory. The size and
+    md5 are computed while writing, so it's not necessary to read it again
+    """
+    def __init__(self, suffix="", folder=None):
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=folder)
+        super(SpooledContents, self).__init__(path, 0, None)
+        self._file = os.fdopen(fd, "wb")
+        self._md5 = hashlib.md5()
+
+    def write(self, data):
+        self._md5.update(data)
+        self.size += len(data)
+        self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        self.md5 = self._md5.hexdigest()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
 def build_files_set(basedir, rel_files):
     '''Builds a file dict keeping the relative path'''
     ret = {}
@@ -144,10 +218,26 @@ def path_exists(path, basedir=None):
     return True
 
 
-def gzopen_without_timestamps(name, mode="r", fileobj=None, compresslevel=9, **kwargs):
+@contextmanager
+def chdir(newdir):
+    """ changes the current directory just for the enclosed block, so it is always
+    restored, also when exceptions are raised
+    """
+    old_path = os.getcwd()
+    os.chdir(newdir)
+    try:
+        yield
+    finally:
+        os.chdir(old_path)
+
+
+def gzopen_without_timestamps(name, mode="r", fileobj=None, compresslevel=9, threads=None,
+                              **kwargs):
     """ !! Method overrided by laso to pass mtime=0 (!=None) to avoid time.time() was 
         setted in Gzip file causing md5 to change. Not possible using the 
         previous tarfile open because arguments are not passed to GzipFile constructor
+        threads: if given, the file is written with a ParallelGzipWriter using those
+        threads. Its output is different from GzipFile, but doesn't depend on the threads
     """
     from tarfile import CompressionError, ReadError
     import tarfile
@@ -162,7 +252,10 @@ def gzopen_without_timestamps(name, mode="r", fileobj=None, compresslevel=9, **k
         raise CompressionError("gzip module is not available")
 
     try:
-        fileobj = gzip.GzipFile(name, mode, compresslevel, fileobj, mtime=0)
+        if threads is not None and mode == "w":
+            fileobj = ParallelGzipWriter(name, fileobj, compresslevel, threads)
+        else:
+            fileobj = gzip.GzipFile(name, mode, compresslevel, fileobj, mtime=0)
     except OSError:
         if fileobj is not None and mode == 'r':
             raise ReadError("not a gzip file")
@@ -182,9 +275,11 @@ def gzopen_without_timestamps(name, mode="r", fileobj=None, compresslevel=9, **k
     return t
 
 
-def tar_extract(fileobj, destination_dir):
+def tar_extract(fileobj, destination_dir, streaming=False):
     '''Extract tar file controlling not absolute paths and fixing the routes
-    if the tar was zipped in windows'''
+    if the tar was zipped in windows.
+    With streaming, fileobj is read sequentially, without seeking, so the members can
+    be extracted while it is being received'''
     def badpath(path, base):
         # joinpath will ignore base if path is absolute
         return not realpath(abspath(joinpath(base, path))).startswith(base)
@@ -200,6 +295,6 @@ def tar_extract(fileobj, destination_dir):
                 finfo.name = finfo.name.replace("\\", "/")
                 yield finfo
 
-    the_tar = tarfile.open(fileobj=fileobj)
+    the_tar = tarfile.open(fileobj=fileobj, mode="r|*" if streaming else "r")
     the_tar.extractall(path=destination_dir, members=safemembers(the_tar))
     the_tar.close()
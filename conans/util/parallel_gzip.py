@@ -0,0 +1,101 @@
+""" gzip writer that compresses in several threads. The data is split in blocks of a
+fixed size, each one compressed independently as a raw deflate stream ended with a sync
+flush, so their concatenation is a single valid deflate stream. zlib releases the GIL
+while compressing, so the blocks are compressed in parallel. The output only depends on
+the data, the compression level and the block size, not on the number of threads
+"""
+from collections import deque
+from multiprocessing.pool import ThreadPool
+import struct
+import zlib
+
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def _compress_block(data, compresslevel, last):
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    flush_mode = zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+    return compressor.compress(data) + compressor.flush(flush_mode)
+
+
+class ParallelGzipWriter(object):
+    """ write-only file-like object, writes the gzip stream of the data written to it to
+    fileobj, which is not closed. The header has mtime=0 as gzopen_without_timestamps
+    """
+    def __init__(self, name, fileobj, compresslevel=9, threads=1, block_size=BLOCK_SIZE):
+        self._fileobj = fileobj
+        self._compresslevel = compresslevel
+        self._block_size = block_size
+        self._threads = max(threads, 1)
+        self._pool = ThreadPool(self._threads) if self._threads > 1 else None
+        self._pending = deque()
+        self._buffer = []
+        self._buffer_size = 0
+        self._crc = zlib.crc32("") & 0xffffffff
+        self._size = 0
+        self._write_header(name)
+
+    def _write_header(self, name):
+        if self._compresslevel == 9:
+            extra_flags = 2
+        elif self._compresslevel == 1:
+            extra_flags = 4
+        else:
+            extra_flags = 0
+        fname = name.encode("latin-1") if isinstance(name, unicode) else name
+        if fname.endswith(".gz"):
+            fname = fname[:-3]
+        # magic, deflate, FNAME flag, mtime=0, extra flags, unknown OS
+        header = "\037\213\010" + ("\010" if fname else "\000") + struct.pack("<L", 0)
+        header += chr(extra_flags) + "\377"
+        if fname:
+            header += fname + "\000"
+        self._fileobj.write(header)
+
+    def write(self, data):
+        if not data:
+            return
+        self._crc = zlib.crc32(data, self._crc) & 0xffffffff
+        self._size += len(data)
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        if self._buffer_size >= self._block_size:
+            data = "".join(self._buffer)
+            blocks = len(data) // self._block_size
+            for index in range(blocks):
+                self._submit(data[index * self._block_size:(index + 1) * self._block_size])
+            rest = data[blocks * self._block_size:]
+            self._buffer = [rest] if rest else []
+            self._buffer_size = len(rest)
+
+    def _submit(self, block, last=False):
+        if self._pool is None:
+            self._fileobj.write(_compress_block(block, self._compresslevel, last))
+            return
+        self._pending.append(self._pool.apply_async(_compress_block,
+                                                    (block, self._compresslevel, last)))
+        # Bounded memory, the finished blocks are written in order
+        while len(self._pending) > 2 * self._threads or (self._pending and
+                                                         self._pending[0].ready()):
+            self._fileobj.write(self._pending.popleft().get())
+
+    def tell(self):
+        return self._size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._fileobj is None:
+            return
+        try:
+            self._submit("".join(self._buffer), last=True)
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().get())
+            self._fileobj.write(struct.pack("<LL", self._crc, self._size & 0xffffffff))
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+            self._fileobj = None